@@ -0,0 +1,57 @@
+# analysis.py
+# Background thread for the heavier analyzers (loudness, ...). The audio
+# callbacks only push() into their rings; this thread calls process() on
+# each of them a few dozen times per second, so neither the audio thread
+# nor the GUI thread runs the filters. process() returns how much it did
+# and is called again until it returns 0.
+# While the input is silent or nobody looks, the engine slows the passes to
+# IDLE_INTERVAL (the rings hold a second of audio, nothing is lost).
+import threading
+
+ANALYSIS_INTERVAL = 0.02  # seconds between two passes over the analyzers
+IDLE_INTERVAL = 0.25      # the same while idle
+
+
+class AnalysisWorker:
+    def __init__(self, interval=ANALYSIS_INTERVAL):
+        self.interval = interval
+        self.analyzers = []
+        self._stop = threading.Event()
+        self._wake = threading.Event()  # cuts a long wait short
+        self._thread = None
+
+    def add(self, analyzer):
+        self.analyzers.append(analyzer)
+        return analyzer
+
+    def set_interval(self, interval):
+        # a shorter interval applies at once, not after the pending wait
+        if interval < self.interval:
+            self._wake.set()
+        self.interval = interval
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            for a in self.analyzers:
+                try:
+                    # process() works in bounded slices, drain everything pending
+                    while a.process() and not self._stop.is_set():
+                        pass
+                except Exception as e:
+                    print(f"Analysis error ({type(a).__name__}):", e)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
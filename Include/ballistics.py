@@ -0,0 +1,184 @@
+# ballistics.py
+# Meter ballistics evaluated per sample on the GUI side: VU (IEC 60268-17)
+# or PPM (IEC 60268-10 type I / II) needles, sample peak hold with a timed
+# decay, and latched clip indicators.
+#
+# Every sample goes through the integrators, in closed form over the whole
+# drained block, and the state carries over to the next block. A reading
+# therefore depends only on the audio up to its last sample, not on the
+# block size, the GUI frame rate or how late a frame was. The display code
+# only reads the finished state (level / hold / clipped).
+#
+#  - VU: linear 2nd-order low-pass of the rectified signal (99 % of a step
+#    in 300 ms, ~1 % overshoot), run through biquad.BlockIIR.
+#  - PPM: the rectified signal charges a 1st-order integrator (attack), whose
+#    maximum then decays exponentially (release). The release is solved in
+#    the log domain, where it is a running maximum of a ramp. The attack is
+#    linear (no diode), calibrated on sines: tone bursts meet the IEC
+#    figures, low tones read a little high from the integrator's ripple
+#    (+0.9 dB at 100 Hz, +1.9 dB at 40 Hz for type I).
+#  - peak hold: the largest sample stays for PEAK_HOLD seconds, then falls
+#    at PEAK_DECAY dB/s unless a sample reaches the falling value.
+import math
+import numpy as np
+
+from biquad import BlockIIR
+
+VU_RISE = 0.3          # seconds to 99 % of a step
+VU_OVERSHOOT = 0.011   # IEC 60268-17: 1 to 1.5 %
+# PPM: (tone burst seconds, its reading in dB below the steady reading, release dB/s)
+PPM = {
+    "ppm1": (0.010, 1.0, 20.0 / 1.5),   # type I (DIN 45406): 10 ms -> -1 dB, 20 dB in 1.5 s
+    "ppm2": (0.010, 2.0, 24.0 / 2.8),   # type II (BBC / EBU): 10 ms -> -2 dB, 24 dB in 2.8 s
+}
+MODES = ("vu",) + tuple(PPM)
+DEFAULT_MODE = "vu"
+PEAK_HOLD = 1.5        # seconds a peak stays up
+PEAK_DECAY = 20.0      # dB/s once the hold is over
+CLIP_LEVEL = 10 ** (-0.01 / 20)  # a sample this close to full scale latches the clip light
+# a steady sine reads its RMS: mean of |sin| (VU) or integrated peak (PPM) -> RMS
+SINE_RMS = math.pi / (2 * math.sqrt(2))
+FLOOR = 1e-10          # -200 dBFS, keeps log() finite
+
+
+def _vu_zeta(overshoot):
+    # damping of a 2nd-order system with this step overshoot
+    k = math.log(overshoot)
+    return -k / math.sqrt(math.pi ** 2 + k * k)
+
+
+def _vu_rise_wn(zeta, target=0.99):
+    # first time (in 1 / natural frequency units) the step response reaches `target`
+    wd = math.sqrt(1 - zeta * zeta)
+    t = np.linspace(0.0, 20.0, 200001)
+    step = 1 - np.exp(-zeta * t) * (np.cos(wd * t) + zeta / wd * np.sin(wd * t))
+    return float(t[np.argmax(step >= target)])
+
+
+def vu_section(samplerate):
+    """VU integrator as one biquad [b0, b1, b2, a1, a2] with unity DC gain,
+    poles impulse-invariant from the analogue 2nd-order response."""
+    zeta = _vu_zeta(VU_OVERSHOOT)
+    wn = _vu_rise_wn(zeta) / VU_RISE
+    r = math.exp(-zeta * wn / samplerate)
+    theta = wn * math.sqrt(1 - zeta * zeta) / samplerate
+    a1, a2 = -2 * r * math.cos(theta), r * r
+    return [1 + a1 + a2, 0.0, 0.0, a1, a2]
+
+
+def ppm_sections(mode, samplerate):
+    # attack integrator: a `burst` s tone reaches `drop` dB under the steady reading
+    burst, drop, _ = PPM[mode]
+    tau = -burst / math.log(1 - 10 ** (-drop / 20))
+    a = math.exp(-1.0 / (tau * samplerate))
+    return [[1 - a, 0.0, 0.0, -a, 0.0]]
+
+
+class Ballistics:
+    def __init__(self, channels, samplerate, max_frames, mode=DEFAULT_MODE,
+                 hold=PEAK_HOLD, decay=PEAK_DECAY):
+        if mode not in MODES:
+            raise ValueError(f"unknown meter mode {mode!r} (expected one of {', '.join(MODES)})")
+        self.channels = int(channels)
+        self.samplerate = samplerate
+        self.mode = mode
+        ch = self.channels
+        sections = [vu_section(samplerate)] if mode == "vu" else ppm_sections(mode, samplerate)
+        self.iir = BlockIIR(sections, ch)
+        self._rect = np.zeros((max_frames, ch))
+        if mode != "vu":
+            # release: log y[n] = max(log a[n], log y[n-1] - fall) per sample
+            self._fall = PPM[mode][2] / 20 * math.log(10) / samplerate
+            self._ramp = -self._fall * np.arange(max_frames - 1, -1, -1.0)[:, None]
+            self._log = np.full(ch, math.log(FLOOR))
+        self.hold_frames = max(1, int(hold * samplerate))
+        self._decay = decay / 20 * math.log(10) / samplerate  # log units per sample
+        # finished state, read by the display
+        self.level = np.zeros(ch)        # needle reading, RMS of the equivalent sine
+        self.hold = np.zeros(ch)         # held sample peak
+        self.clipped = np.zeros(ch, dtype=bool)
+        self.clips = np.zeros(ch, dtype=np.int64)  # clipped samples since reset_clip()
+        self._hold_age = np.full(ch, self.hold_frames, dtype=np.int64)  # samples since the held peak
+
+    def reset(self):
+        self.iir.reset()
+        if self.mode != "vu":
+            self._log[:] = math.log(FLOOR)
+        self.level[:] = 0.0
+        self.hold[:] = 0.0
+        self._hold_age[:] = self.hold_frames
+        self.reset_clip()
+
+    def reset_clip(self):
+        self.clipped[:] = False
+        self.clips[:] = 0
+
+    def process(self, block, taps=None):
+        """Run every sample of `block` (frames x channels, at most max_frames)
+        through the ballistics and refresh level / hold / clipped.
+        `taps`: indices of samples of `block` whose needle reading is returned
+        as well ((len(taps), channels) array), e.g. each report block's end
+        in the offline analysis."""
+        n = block.shape[0]
+        if n == 0:
+            return None
+        rect = self._rect[:n]
+        np.abs(block, out=rect)
+        over = rect >= CLIP_LEVEL
+        self.clips += over.sum(axis=0)
+        self.clipped |= self.clips > 0
+        # longer than the hold time: in pieces, so a hold never ends twice in one piece
+        for start in range(0, n, self.hold_frames):
+            self._peak_hold(rect[start:start + self.hold_frames])
+        self.iir.process(rect, out=rect)
+        read = None
+        if self.mode == "vu":
+            if taps is not None:
+                read = np.maximum(rect[taps], 0.0)
+            np.maximum(rect[-1], 0.0, out=self.level)
+        else:
+            np.maximum(rect, FLOOR, out=rect)
+            np.log(rect, out=rect)
+            rect += self._ramp[-n:]
+            if taps is not None:
+                # reading at t: running maximum up to t, ramp moved to end at t
+                t = np.asarray(taps)[:, None]
+                rise = np.maximum.accumulate(rect, axis=0)[taps] + (n - 1 - t) * self._fall
+                read = np.exp(np.maximum(rise, self._log - (t + 1) * self._fall))
+            np.maximum(rect.max(axis=0), self._log - n * self._fall, out=self._log)
+            np.exp(self._log, out=self.level)
+        self.level *= SINE_RMS
+        if read is not None:
+            read *= SINE_RMS
+        return read
+
+    def _peak_hold(self, mag):
+        # held value at every sample of the block, from the state before it
+        n = mag.shape[0]
+        age = self._hold_age + np.arange(1, n + 1)[:, None]
+        curve = self._held(self.hold, age)
+        reached = mag >= curve
+        hit = reached.any(axis=0)
+        if hit.any():
+            # restart at the largest sample from the first one that reached
+            # the held value (then the last one, for equal samples)
+            first = reached.argmax(axis=0)
+            after = np.where(np.arange(n)[:, None] >= first, mag, 0.0)
+            top = after.max(axis=0)
+            last = n - 1 - (after[::-1] == top).argmax(axis=0)
+            self.hold = np.where(hit, top, self.hold)
+            self._hold_age = np.where(hit, n - 1 - last, self._hold_age + n)
+        else:
+            self._hold_age += n
+
+    def _held(self, value, age):
+        # flat for hold_frames samples, then an exponential fall
+        return value * np.exp(-np.maximum(age - self.hold_frames, 0) * self._decay)
+
+    def at_rest(self, floor):
+        # needles and hold marks all under `floor`: more silence changes nothing visible
+        return bool(self.level.max() < floor and self.held().max() < floor)
+
+    def held(self):
+        # held peak as displayed now (sample peak, linear)
+        return self._held(self.hold, self._hold_age)
@@ -0,0 +1,339 @@
+# batch.py
+# Batch level / loudness check of whole recording directories.
+#
+# Files are cut into segments analysed in parallel by a process pool, with
+# the same code as the live monitor (metering.block_levels, LoudnessMeter).
+# Segment results are exact partial sums (energies, maxima, gating
+# histograms) merged per file; every segment but the first is fed a short
+# pre-roll so the K-weighting filter and the 3 s window start warm.
+# Per-file results are cached by content hash + analysis parameters, so a
+# re-run only analyses files whose audio changed; the cache keeps one entry
+# per file path and forgets files not seen for CACHE_MAX_AGE.
+#
+#     python batch.py /archive/transfers -j 8 --summary summary.json --csv summary.csv
+import os
+import sys
+import json
+import math
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from wavfile import MappedWav
+from metering import block_levels
+from loudness import LoudnessMeter, HOP_SECONDS, integrated_loudness, loudness_range, format_loudness
+from biquad import CHUNK
+
+SEGMENT_SECONDS = 600.0   # audio per task
+PREROLL_SECONDS = 4.0     # > 3 s short-term window + filter settling
+READ_SECONDS = 10.0       # audio converted to float32 at a time
+ANALYSIS_VERSION = 1      # bump when the measurement code changes: invalidates the cache
+HASH_BLOCK = 1 << 22
+CACHE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "audio-monitor", "batch-cache.json")
+CACHE_MAX_AGE = 90 * 86400  # files not seen for this long leave the cache
+EXTENSIONS = (".wav", ".rf64")
+
+
+class ResultCache:
+    """path -> size+mtime+content hash, and content hash+params -> result.
+    A file's entry is replaced when it changes; save() drops the files not
+    seen for `max_age` seconds and the results no file points to any more."""
+
+    def __init__(self, path=CACHE_FILE, max_age=CACHE_MAX_AGE, clock=time.time):
+        self.path = path
+        self.max_age = max_age
+        self.clock = clock
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        self.files = data.get("files", {})  # abspath -> [size|mtime, hash, last seen]
+        self.results = data.get("results", {})
+
+    @staticmethod
+    def stat_key(path):
+        st = os.stat(path)
+        return os.path.abspath(path), f"{st.st_size}|{st.st_mtime_ns}"
+
+    def digest(self, key):
+        # content hash of an unchanged file, or None
+        name, stamp = key
+        entry = self.files.get(name)
+        if entry is None or entry[0] != stamp:
+            return None
+        entry[2] = self.clock()
+        return entry[1]
+
+    def put_digest(self, key, digest):
+        name, stamp = key
+        self.files[name] = [stamp, digest, self.clock()]
+
+    def prune(self):
+        limit = self.clock() - self.max_age
+        self.files = {k: e for k, e in self.files.items() if e[2] >= limit}
+        live = {e[1] for e in self.files.values()}
+        self.results = {k: r for k, r in self.results.items() if k.split("|", 1)[0] in live}
+
+    def save(self):
+        self.prune()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"files": self.files, "results": self.results}, f)
+        os.replace(tmp, self.path)
+
+
+def content_hash(path):
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        while True:
+            buf = f.read(HASH_BLOCK)
+            if not buf:
+                break
+            h.update(buf)
+    return h.hexdigest()
+
+
+def _hash_job(path):
+    # worker side: an unreadable file is reported, not raised, so it does not sink the batch
+    try:
+        return content_hash(path), None
+    except OSError as e:
+        return None, str(e)
+
+
+def _header_job(path):
+    # worker side, like _hash_job: (frames, samplerate, channels) or the error
+    try:
+        wav = MappedWav(path)
+        return (wav.frames, wav.samplerate, wav.channels), None
+    except (OSError, ValueError) as e:
+        return None, str(e)
+
+
+def params_key(params):
+    return json.dumps(dict(params, version=ANALYSIS_VERSION), sort_keys=True)
+
+
+def segments(frames, samplerate, segment_seconds):
+    # boundaries on the loudness hop grid (and whole filter chunks), so the
+    # merged segments see exactly the hops a single pass would
+    hop = int(round(samplerate * HOP_SECONDS))
+    grid = hop * CHUNK // math.gcd(hop, CHUNK)
+    size = max(1, int(segment_seconds * samplerate) // grid) * grid
+    preroll = -(-int(PREROLL_SECONDS * samplerate) // grid) * grid
+    return [(start, min(start + size, frames), min(start, preroll)) for start in range(0, frames, size)] \
+        or [(0, 0, 0)]
+
+
+def analyze_segment(path, start, stop, preroll, loudness=True):
+    """Mergeable measurements of frames [start, stop) of a WAV file."""
+    wav = MappedWav(path)
+    ch = wav.channels
+    energy = np.zeros(ch)
+    peak = np.zeros(ch, dtype=np.float32)
+    rms_b = np.zeros(ch, dtype=np.float32)
+    peak_b = np.zeros(ch, dtype=np.float32)
+    meter = LoudnessMeter(ch, wav.samplerate) if loudness else None
+    if meter is not None and preroll:
+        meter.feed(wav.read(start - preroll, start))
+    if meter is not None:
+        meter.restart_gating()
+        meter.history = []
+    step = int(READ_SECONDS * wav.samplerate) // CHUNK * CHUNK
+    for pos in range(start, stop, step):
+        x = wav.read(pos, min(pos + step, stop))
+        block_levels(x, rms_b, peak_b)  # the live meter's reduction, one block per read
+        np.maximum(peak, peak_b, out=peak)
+        energy += np.einsum('ij,ij->j', x, x, dtype=np.float64)
+        if meter is not None:
+            meter.feed(x)
+    out = {"frames": stop - start, "energy": energy.tolist(), "peak": peak.tolist()}
+    if meter is not None:
+        out.update({
+            "m_count": meter.m_count.tolist(), "m_energy": meter.m_energy.tolist(),
+            "s_count": meter.s_count.tolist(), "s_energy": meter.s_energy.tolist(),
+            "true_peak": meter.peak,
+            "max_momentary": max((h[1]["momentary"] for h in meter.history), default=-math.inf),
+            "max_short_term": max((h[1]["short_term"] for h in meter.history), default=-math.inf),
+        })
+    return out
+
+
+def merge(path, samplerate, channels, parts):
+    # one file's result from its segment results
+    frames = sum(p["frames"] for p in parts)
+    energy = np.sum([p["energy"] for p in parts], axis=0)
+    peak = np.max([p["peak"] for p in parts], axis=0)
+    with np.errstate(divide="ignore"):
+        res = {
+            "file": path, "samplerate": samplerate, "channels": channels,
+            "duration": frames / samplerate,
+            "rms_dbfs": (10 * np.log10(energy / max(frames, 1))).tolist(),
+            "peak_dbfs": (20 * np.log10(peak)).tolist(),
+        }
+    if "m_count" in parts[0]:
+        hist = {k: np.sum([p[k] for p in parts], axis=0) for k in ("m_count", "m_energy", "s_count", "s_energy")}
+        tp = max(p["true_peak"] for p in parts)
+        res.update({
+            "integrated_lufs": integrated_loudness(hist["m_count"], hist["m_energy"]),
+            "lra_lu": loudness_range(hist["s_count"], hist["s_energy"]),
+            "true_peak_dbtp": 20 * math.log10(tp) if tp > 0 else -math.inf,
+            "max_momentary_lufs": max(p["max_momentary"] for p in parts),
+            "max_short_term_lufs": max(p["max_short_term"] for p in parts),
+        })
+    return res
+
+
+def find_files(paths):
+    found = []
+    for p in paths:
+        if os.path.isdir(p):
+            for root, _, names in os.walk(p):
+                found += [os.path.join(root, n) for n in names if n.lower().endswith(EXTENSIONS)]
+        else:
+            found.append(p)
+    return sorted(found)
+
+
+def run_batch(paths, jobs=None, segment_seconds=SEGMENT_SECONDS, loudness=True, cache=None):
+    """Analyse every WAV under `paths`; returns (results, stats)."""
+    files = find_files(paths)
+    params = params_key({"loudness": loudness})
+    stats = {"files": len(files), "cached": 0, "analysed": 0, "failed": 0, "segments": 0,
+             "failures": []}  # [{"file", "error"}]
+
+    def fail(f, error):
+        print(f"failed {f}: {error}", file=sys.stderr)
+        stats["failed"] += 1
+        stats["failures"].append({"file": f, "error": str(error)})
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        # content hashes (only needed for the cache), reusing the ones of
+        # files whose size and mtime did not change
+        hashes = {f: None for f in files}
+        if cache is not None:
+            keys = {}
+            for f in files:
+                try:
+                    keys[f] = ResultCache.stat_key(f)
+                except OSError as e:
+                    fail(f, e)
+                    hashes.pop(f)
+                    continue
+                hashes[f] = cache.digest(keys[f])
+            todo = [f for f in hashes if hashes[f] is None]
+            for f, (digest, error) in zip(todo, pool.map(_hash_job, todo, chunksize=8)):
+                if error is not None:
+                    fail(f, error)
+                    hashes.pop(f)
+                else:
+                    cache.put_digest(keys[f], digest)
+                    hashes[f] = digest
+
+        todo = []
+        for f in hashes:
+            hit = cache.results.get(f"{hashes[f]}|{params}") if cache is not None else None
+            if hit is not None:
+                results[f] = dict(hit, file=f)
+                stats["cached"] += 1
+            else:
+                todo.append(f)
+
+        # headers are read by the workers too: the parent maps no file
+        futures = {}
+        headers = {}
+        for f, (header, error) in zip(todo, pool.map(_header_job, todo, chunksize=8)):
+            if error is not None:
+                fail(f, error)
+                continue
+            headers[f] = header
+            frames, samplerate, _ = header
+            futures[f] = [pool.submit(analyze_segment, f, a, b, pre, loudness)
+                          for a, b, pre in segments(frames, samplerate, segment_seconds)]
+            stats["segments"] += len(futures[f])
+
+        for f, fs in futures.items():
+            try:
+                res = merge(f, *headers[f][1:], [x.result() for x in fs])
+            except Exception as e:
+                fail(f, e)
+                continue
+            results[f] = res
+            stats["analysed"] += 1
+            if cache is not None:
+                cache.results[f"{hashes[f]}|{params}"] = res
+    return [results[f] for f in files if f in results], stats
+
+
+def _finite(v):
+    if isinstance(v, float) and not math.isfinite(v):
+        return None
+    if isinstance(v, list):
+        return [_finite(x) for x in v]
+    return v
+
+
+def write_summary(results, stats, path):
+    with open(path, "w") as f:
+        json.dump({"stats": stats, "files": [{k: _finite(v) for k, v in r.items()} for r in results]},
+                  f, indent=2)
+
+
+def write_csv(results, path):
+    cols = ("file", "duration", "channels", "samplerate", "integrated_lufs", "lra_lu",
+            "true_peak_dbtp", "max_momentary_lufs", "max_short_term_lufs", "rms_dbfs", "peak_dbfs")
+    with open(path, "w") as f:
+        f.write(",".join(cols) + "\n")
+        for r in results:
+            row = []
+            for c in cols:
+                v = r.get(c, "")
+                if isinstance(v, list):
+                    v = " ".join(f"{x:.2f}" for x in v)
+                elif isinstance(v, float):
+                    v = f"{v:.2f}"
+                row.append(f'"{v}"' if c == "file" else str(v))
+            f.write(",".join(row) + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Level / loudness check of WAV files and directories.")
+    parser.add_argument("paths", nargs="+", help="WAV files or directories (searched recursively)")
+    parser.add_argument("-j", "--jobs", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--segment", type=float, default=SEGMENT_SECONDS, help="seconds of audio per task")
+    parser.add_argument("--no-loudness", action="store_true", help="levels only (faster)")
+    parser.add_argument("--summary", help="write the aggregated summary to this JSON file")
+    parser.add_argument("--csv", help="write one line per file to this CSV file")
+    parser.add_argument("--cache", default=CACHE_FILE, help="result cache file")
+    parser.add_argument("--no-cache", action="store_true", help="analyse everything, leave the cache alone")
+    args = parser.parse_args(argv)
+
+    cache = None if args.no_cache else ResultCache(args.cache)
+    t0 = time.perf_counter()
+    results, stats = run_batch(args.paths, args.jobs, args.segment, not args.no_loudness, cache)
+    if cache is not None:
+        cache.save()
+    for r in results:
+        line = f"{r['duration']:8.1f} s  peak {max(r['peak_dbfs'], default=-math.inf):6.1f} dBFS"
+        if "integrated_lufs" in r:
+            line += "  " + format_loudness({"momentary": r["max_momentary_lufs"],
+                                            "short_term": r["max_short_term_lufs"],
+                                            "integrated": r["integrated_lufs"], "lra": r["lra_lu"],
+                                            "true_peak": r["true_peak_dbtp"]})
+        print(f"{line}  {r['file']}")
+    print(f"{stats['files']} files: {stats['analysed']} analysed ({stats['segments']} segments), "
+          f"{stats['cached']} cached, {stats['failed']} failed, in {time.perf_counter() - t0:.1f} s")
+    if args.summary:
+        write_summary(results, stats, args.summary)
+    if args.csv:
+        write_csv(results, args.csv)
+    return 0 if stats["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+# bench.py
+# Offline benchmark of the engine callbacks on the simulated backend.
+# For every (mode, block size, channels, sample rate) it reports the
+# callback time (mean / p99 / max), the transient memory allocated per
+# block, the memory a block leaves allocated (should be 0) and the headroom
+# left before the block deadline.
+# --detector times the click detector (clicks.py) instead: how much of one
+# core it needs to keep up with the input in real time.
+#
+#     python bench.py
+#     python bench.py --blocksizes 64 256 1024 --rates 48000 96000 --json out.json
+#     python bench.py --blocksizes 96 100 --dsp riaa rumble
+#     python bench.py --detector --rates 96000 --channels 2
+import io
+import time
+import sys
+import json
+import contextlib
+import argparse
+import tracemalloc
+import numpy as np
+
+from engine import AudioEngine, FULL_DUPLEX, FALLBACK, MONITOR_ONLY
+from simbackend import SimulatedBackend
+from sampleformat import FLOAT, FORMATS
+from clicks import ClickDetector
+
+# mode -> callback names, in the order their streams are ticked
+CALLBACKS = {
+    FULL_DUPLEX: ("_full_callback",),
+    FALLBACK: ("_in_callback", "_out_callback"),
+    MONITOR_ONLY: ("_monitor_callback",),
+}
+RAW_CALLBACKS = {FULL_DUPLEX: ("_raw_full_callback",), MONITOR_ONLY: ("_raw_monitor_callback",)}
+TRACE_SKIP = 8  # first traced blocks, left out of the net figure (tracemalloc starting up)
+
+
+def _devices(channels, samplerate):
+    return [
+        {'name': 'Bench In', 'max_input_channels': channels, 'max_output_channels': 0,
+         'default_samplerate': float(samplerate)},
+        {'name': 'Bench Out', 'max_input_channels': 0, 'max_output_channels': channels,
+         'default_samplerate': float(samplerate)},
+    ]
+
+
+def open_engine(mode, blocksize, channels, samplerate, signal="noise", fmt=FLOAT, analyzers=True, dsp=()):
+    backend = SimulatedBackend(devices=_devices(channels, samplerate), signal=signal,
+                               speed=None, duplex=(mode == FULL_DUPLEX))
+    engine = AudioEngine(backend=backend, blocksize=blocksize, analyzers=analyzers)
+    engine.sample_format = fmt
+    for name in dsp:
+        engine.dsp[name].set_enabled(True)
+    with contextlib.redirect_stdout(io.StringIO()):  # keep the engine's chatter out of the table
+        started = engine.start(0, None if mode == MONITOR_ONLY else 1)
+    assert started == mode, (started, mode)
+    # the simulated clock runs flat out, so the analysis worker would too and
+    # steal the GIL from the callbacks far more than it does in real time
+    if engine.analysis is not None:
+        engine.analysis.stop()
+    return engine, backend
+
+
+def run_case(mode, blocksize, channels, samplerate, blocks, alloc_blocks, signal="noise", fmt=FLOAT,
+             analyzers=True, dsp=()):
+    engine, backend = open_engine(mode, blocksize, channels, samplerate, signal, fmt, analyzers, dsp)
+    fmt = engine.fmt or FLOAT  # separate streams always run in float32
+    streams = list(backend.streams)
+    # warm up: fill rings, prime the drift controller, grow lazy buffers
+    for _ in range(64):
+        backend.tick()
+        engine.read_levels()
+    for s in streams:
+        s.callback_ns.clear()
+
+    for i in range(blocks):
+        backend.tick()
+        if i % 8 == 0:
+            engine.read_levels()  # the GUI frame clock, roughly
+
+    timings = {s: np.fromiter(s.callback_ns, dtype=np.float64) for s in streams}
+
+    # separate pass: tracemalloc slows everything down, keep it out of the timings
+    tracemalloc.start()
+    for _ in range(alloc_blocks):
+        backend.tick()
+        engine.read_levels()
+    tracemalloc.stop()
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.stop()
+
+    results = []
+    names = CALLBACKS[mode] if fmt == FLOAT else RAW_CALLBACKS[mode]
+    for name, s in zip(names, streams):
+        ns = timings[s]
+        deadline_us = s.deadline * 1e6
+        p99 = float(np.percentile(ns, 99)) / 1e3
+        net = list(s.callback_net)[TRACE_SKIP:]
+        results.append({
+            "callback": name, "mode": mode, "format": fmt, "blocksize": blocksize,
+            "channels": channels, "samplerate": samplerate,
+            "mean_us": float(ns.mean()) / 1e3, "p99_us": p99, "max_us": float(ns.max()) / 1e3,
+            "alloc_bytes": float(np.mean(s.callback_alloc)) if s.callback_alloc else 0.0,
+            # anything a callback keeps is one object or more (>= 16 bytes) per block;
+            # the allocator's own caches add a stray block now and then
+            "net_bytes": float(np.mean(net)) if net else 0.0,
+            "deadline_us": deadline_us,
+            "headroom": 1.0 - p99 / deadline_us,
+        })
+    return results
+
+
+def run_detector(blocksize, channels, samplerate, seconds=30.0, clicks_per_second=5.0):
+    # noise with sparse clicks, pushed one block at a time as the callbacks
+    # do; only the worker side (process()) is timed
+    rng = np.random.default_rng(0)
+    frames = int(seconds * samplerate)
+    audio = rng.normal(0.0, 0.05, (frames, channels)).astype(np.float32)
+    for p in rng.integers(0, frames, int(seconds * clicks_per_second)):
+        audio[p, rng.integers(0, channels)] += 0.5
+    detector = ClickDetector(channels, samplerate)
+    busy = 0.0
+    for start in range(0, frames, blocksize):
+        detector.push(audio[start:start + blocksize])
+        t0 = time.perf_counter()
+        while detector.process():
+            pass
+        busy += time.perf_counter() - t0
+    return {
+        "callback": "click detector", "blocksize": blocksize, "channels": channels,
+        "samplerate": samplerate, "seconds": seconds, "events": detector.log.count,
+        "realtime": seconds / busy, "core": busy / seconds,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the audio callbacks on a simulated backend.")
+    parser.add_argument("--modes", nargs="+", default=[FULL_DUPLEX, FALLBACK, MONITOR_ONLY],
+                        choices=list(CALLBACKS))
+    parser.add_argument("--blocksizes", nargs="+", type=int, default=[64, 256, 1024])
+    parser.add_argument("--channels", nargs="+", type=int, default=[1, 2])
+    parser.add_argument("--rates", nargs="+", type=int, default=[44100, 48000, 96000])
+    parser.add_argument("--blocks", type=int, default=2000, help="timed blocks per case")
+    parser.add_argument("--alloc-blocks", type=int, default=200, help="blocks traced for allocations")
+    parser.add_argument("--signal", default="noise", help="sine, noise, silence or a WAV path")
+    parser.add_argument("--formats", nargs="+", default=[FLOAT], choices=[FLOAT] + list(FORMATS),
+                        help="stream sample formats (integer = raw streams)")
+    parser.add_argument("--levels-only", action="store_true",
+                        help="no loudness / spectrum (like the multi-device workers)")
+    parser.add_argument("--dsp", nargs="+", default=[], choices=["riaa", "rumble", "width"],
+                        help="playback processing stages to enable")
+    parser.add_argument("--detector", action="store_true",
+                        help="time the click detector instead of the callbacks")
+    parser.add_argument("--seconds", type=float, default=30.0, help="audio analyzed per detector case")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    if args.detector:
+        print(f"{'block':>6}{'ch':>4}{'rate':>7}{'events':>8}{'x realtime':>12}{'core':>8}")
+        for bs in args.blocksizes:
+            for ch in args.channels:
+                for sr in args.rates:
+                    r = run_detector(bs, ch, sr, args.seconds)
+                    results.append(r)
+                    print(f"{bs:>6}{ch:>4}{sr:>7}{r['events']:>8}{r['realtime']:>12.0f}{r['core']:>8.1%}",
+                          flush=True)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(results, f, indent=2)
+        return 0
+
+    print(f"{'callback':<22}{'format':>8}{'block':>6}{'ch':>4}{'rate':>7}"
+          f"{'mean us':>10}{'p99 us':>10}{'max us':>10}{'alloc B':>9}{'net B':>7}{'headroom':>10}")
+    for mode in args.modes:
+        for fmt in args.formats:
+            for bs in args.blocksizes:
+                for ch in args.channels:
+                    for sr in args.rates:
+                        for r in run_case(mode, bs, ch, sr, args.blocks, args.alloc_blocks, args.signal,
+                                          fmt, not args.levels_only, args.dsp):
+                            results.append(r)
+                            print(f"{r['callback']:<22}{r['format']:>8}{bs:>6}{ch:>4}{sr:>7}"
+                                  f"{r['mean_us']:>10.1f}{r['p99_us']:>10.1f}{r['max_us']:>10.1f}"
+                                  f"{r['alloc_bytes']:>9.0f}{r['net_bytes']:>7.1f}{r['headroom']:>9.1%}", flush=True)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
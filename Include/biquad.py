@@ -0,0 +1,154 @@
+# biquad.py
+# Biquad cascades that filter whole blocks at once, without a per-sample
+# Python loop.
+#
+# The cascade is turned into one state-space system (A, B, C, D). A block is
+# cut into chunks of `chunk` samples; inside a chunk the output is a fixed
+# matrix product of the chunk and its starting state, and the starting
+# states of all chunks follow from one more matrix product. Everything is a
+# batched matmul over (chunks, samples, channels), exact up to rounding, and
+# the state carries over from one block to the next. A block that is not a
+# whole number of chunks ends with one shorter chunk, solved the same way
+# with matrices precomputed for every possible length.
+import math
+import numpy as np
+
+CHUNK = 32       # samples per chunk
+MAX_CHUNKS = 32  # chunks solved together (block = CHUNK * MAX_CHUNKS frames)
+
+
+def k_weighting(samplerate):
+    """ITU-R BS.1770 K-weighting (high shelf + high pass) as two biquads
+    [b0, b1, b2, a1, a2], for any sample rate."""
+    # stage 1: head-related high shelf
+    f0, gain, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = math.tan(math.pi * f0 / samplerate)
+    vh = 10.0 ** (gain / 20.0)
+    vb = vh ** 0.4996667741545416
+    a0 = 1.0 + k / q + k * k
+    shelf = [(vh + vb * k / q + k * k) / a0, 2.0 * (k * k - vh) / a0,
+             (vh - vb * k / q + k * k) / a0, 2.0 * (k * k - 1.0) / a0,
+             (1.0 - k / q + k * k) / a0]
+    # stage 2: RLB high pass
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = math.tan(math.pi * f0 / samplerate)
+    a0 = 1.0 + k / q + k * k
+    highpass = [1.0, -2.0, 1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]
+    return [shelf, highpass]
+
+
+def state_space(sections):
+    """(A, B, C, D) of a cascade of biquads, transposed direct form II states."""
+    A = np.zeros((0, 0)); B = np.zeros(0); C = np.zeros(0); D = 1.0
+    for b0, b1, b2, a1, a2 in sections:
+        a = np.array([[-a1, 1.0], [-a2, 0.0]])
+        b = np.array([b1 - a1 * b0, b2 - a2 * b0])
+        c = np.array([1.0, 0.0])
+        # feed the cascade so far into this section
+        n = A.shape[0]
+        A2 = np.zeros((n + 2, n + 2))
+        A2[:n, :n] = A
+        A2[n:, :n] = np.outer(b, C)
+        A2[n:, n:] = a
+        A, B = A2, np.concatenate((B, b * D))
+        C = np.concatenate((b0 * C, c))
+        D = b0 * D
+    return A, B, C, D
+
+
+class BlockIIR:
+    def __init__(self, sections, channels, chunk=CHUNK, max_chunks=MAX_CHUNKS):
+        A, B, C, D = state_space(sections)
+        self.A, self.B, self.C, self.D = A, B, C, D
+        self.channels = int(channels)
+        self.chunk = m = int(chunk)
+        self.max_chunks = k = int(max_chunks)
+        s = A.shape[0]
+
+        powers = [np.eye(s)]
+        for _ in range(m):
+            powers.append(A @ powers[-1])
+        # inside a chunk: y = O @ state + T @ x, next state = P @ state + Q @ x
+        self.O = np.stack([C @ powers[n] for n in range(m)])
+        h = np.array([D] + [C @ powers[n] @ B for n in range(m - 1)])  # impulse response
+        idx = np.arange(m)
+        lag = idx[:, None] - idx[None, :]
+        self.T = np.where(lag >= 0, h[np.clip(lag, 0, m - 1)], 0.0)
+        self.P = powers[m]
+        self.Q = np.stack([powers[m - 1 - i] @ B for i in range(m)], axis=1)
+        # across chunks: state_k = P^k @ state_0 + sum_j<k P^(k-1-j) @ (Q @ x_j)
+        ppow = [np.eye(s)]
+        for _ in range(k):
+            ppow.append(self.P @ ppow[-1])
+        self.Pk = np.concatenate(ppow[:k])  # (k*s, s)
+        L = np.zeros((k, s, k, s))
+        for i in range(k):
+            for j in range(i):
+                L[i, :, j, :] = ppow[i - 1 - j]
+        self.L = L.reshape(k * s, k * s)
+        self.order = s
+        self.state = np.zeros((s, self.channels))
+        # scratch for one pass of max_chunks chunks: process() allocates nothing
+        ch = self.channels
+        self._xs = np.zeros((k, m, ch))
+        self._ys = np.zeros((k, m, ch))
+        self._tmp = np.zeros((k, m, ch))
+        self._u = np.zeros((k, s, ch))
+        self._states = np.zeros((k * s, ch))
+        self._cross = np.zeros((k * s, ch))
+        self._next = np.zeros((s, ch))
+        self._qx = np.zeros((s, ch))
+        # last, shorter chunk of r < m samples: (O, T, A^r, Q) cut to r and
+        # scratch for x / y / T @ x, for every r
+        self._tails = [None]
+        for r in range(1, m):
+            Q = np.stack([powers[r - 1 - i] @ B for i in range(r)], axis=1)
+            self._tails.append((self.O[:r].copy(), self.T[:r, :r].copy(), powers[r], Q,
+                                np.zeros((r, ch)), np.zeros((r, ch)), np.zeros((r, ch))))
+
+    def reset(self):
+        self.state[:] = 0.0
+
+    def process(self, x, out=None):
+        """Filter `x` (frames x channels) into `out` (allocated as float64 if
+        None; may be `x` itself) and return it, without allocating."""
+        n = x.shape[0]
+        if out is None:
+            out = np.empty((n, self.channels))
+        m, s, ch = self.chunk, self.order, self.channels
+        full = n // m * m
+        step = m * self.max_chunks
+        for start in range(0, full, step):
+            stop = min(start + step, full)
+            k = (stop - start) // m
+            xs = self._xs[:k]
+            np.copyto(xs, x[start:stop].reshape(k, m, ch))
+            u = self._u[:k]
+            np.matmul(self.Q, xs, out=u)
+            u = u.reshape(k * s, ch)
+            states = self._states[:k * s]
+            cross = self._cross[:k * s]
+            np.matmul(self.Pk[:k * s], self.state, out=states)
+            np.matmul(self.L[:k * s, :k * s], u, out=cross)
+            states += cross
+            states = states.reshape(k, s, ch)
+            ys, tmp = self._ys[:k], self._tmp[:k]
+            np.matmul(self.O, states, out=ys)
+            np.matmul(self.T, xs, out=tmp)
+            ys += tmp
+            np.copyto(out[start:stop].reshape(k, m, ch), ys)
+            np.matmul(self.P, states[-1], out=self._next)
+            self._next += u[-s:]
+            self.state, self._next = self._next, self.state
+        if full < n:
+            O, T, Ar, Q, xr, yr, tmp = self._tails[n - full]
+            np.copyto(xr, x[full:])
+            np.matmul(O, self.state, out=yr)
+            np.matmul(T, xr, out=tmp)
+            yr += tmp
+            np.matmul(Ar, self.state, out=self._next)
+            np.matmul(Q, xr, out=self._qx)
+            self._next += self._qx
+            self.state, self._next = self._next, self.state
+            np.copyto(out[full:], yr)
+        return out
@@ -0,0 +1,156 @@
+# catalog.py
+# Cached catalogue of the audio devices. PortAudio enumeration is slow on
+# systems with many ALSA / JACK / PulseAudio endpoints, so it runs on a
+# background thread, once at startup then every REFRESH_INTERVAL seconds or
+# on request; readers get the last snapshot at once. PortAudio only sees
+# hot-plugged devices after a re-initialization: that is done only on an
+# explicit rescan() and only while no stream is open, the periodic refresh
+# just re-reads the current list.
+#
+# Entries are the backend's device dicts plus 'index' and 'samplerates'
+# (probed once per device). Device indexes can change between two
+# refreshes, device_key() does not.
+import threading
+
+REFRESH_INTERVAL = 10.0  # seconds between two background refreshes
+STANDARD_RATES = (44100, 48000, 88200, 96000, 176400, 192000)
+# sounddevice releases whose private _terminate() / _initialize() are known
+# to re-initialize PortAudio (there is no public API for it); other releases
+# and backends only get a re-query
+REINIT_VERSIONS = ((0, 3), (0, 6))  # [first, last)
+
+
+def _can_reinitialize(sd):
+    try:
+        version = tuple(int(x) for x in sd.__version__.split(".")[:2])
+    except (AttributeError, ValueError):
+        return False
+    return REINIT_VERSIONS[0] <= version < REINIT_VERSIONS[1]
+
+
+def device_key(d):
+    # stable identity of a device across re-enumerations
+    return f"{d.get('hostapi', 0)}:{d['name']}"
+
+
+class DeviceCatalog:
+    def __init__(self, backend, idle=None, interval=REFRESH_INTERVAL):
+        """`backend`: callable returning the sounddevice-like module.
+        `idle`: callable, True when no stream is open (PortAudio may then be
+        re-initialized)."""
+        self._backend = backend
+        self.idle = idle or (lambda: True)
+        self.interval = interval
+        # held around every PortAudio call of the catalogue; the engine also
+        # holds it while opening / closing streams
+        self.lock = threading.RLock()
+        self.devices = []  # snapshot, replaced as a whole
+        self.version = 0   # bumped whenever the list changes
+        self.error = None
+        self._rates = {}   # device key -> supported sample rates
+        self._duplex = {}  # (input key, output key) -> full-duplex stream opened
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+        self._rescan = False  # re-initialize PortAudio on the next refresh
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---- refresh ----
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def refresh(self):
+        # re-enumerate soon, on the background thread
+        self.start()
+        self._wake.set()
+
+    def rescan(self):
+        # like refresh(), but also re-initialize PortAudio so hot-plugged
+        # devices show up (skipped while a stream is open)
+        self._rescan = True
+        self.refresh()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._refresh()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def _refresh(self):
+        try:
+            sd = self._backend()
+            # the engine opens its streams under the same lock: none can
+            # start between the idle() check and the re-initialization
+            with self.lock:
+                rescan, self._rescan = self._rescan, False
+                if rescan and self.idle() and _can_reinitialize(sd):
+                    sd._terminate()
+                    sd._initialize()
+                found = [dict(d, index=i) for i, d in enumerate(sd.query_devices())]
+            for d in found:
+                d['samplerates'] = self._probe_rates(sd, d)
+        except Exception as e:
+            if self.error is None:
+                print("Device enumeration failed:", e)
+            self.error = e
+        else:
+            self.error = None
+            if found != self.devices:
+                self.devices = found
+                self.version += 1
+        finally:
+            self._ready.set()
+
+    def _probe_rates(self, sd, d):
+        key = device_key(d)
+        if key not in self._rates:
+            rates = {int(d['default_samplerate'])}
+            name = "check_input_settings" if d['max_input_channels'] else "check_output_settings"
+            check = getattr(sd, name, None)
+            if check is not None:
+                for rate in STANDARD_RATES:
+                    try:
+                        with self.lock:  # one probe at a time, start() never waits long
+                            check(device=d['index'], samplerate=rate)
+                    except Exception:
+                        continue
+                    rates.add(rate)
+            self._rates[key] = tuple(sorted(rates))
+        return self._rates[key]
+
+    # ---- queries ----
+    def wait(self, timeout=None):
+        """Device list, after the first enumeration if it is still running."""
+        self.start()
+        self._ready.wait(timeout)
+        return self.devices
+
+    def device(self, index, kind=None):
+        # cached equivalent of sd.query_devices(index, kind)
+        devices = self.wait()
+        if not 0 <= index < len(devices):
+            raise ValueError(f"no device with index {index}" + (f" ({self.error})" if self.error else ""))
+        d = devices[index]
+        if kind is not None and d[f"max_{kind}_channels"] == 0:
+            raise ValueError(f"device {index} ({d['name']}) has no {kind} channels")
+        return d
+
+    def duplex(self, in_id, out_id):
+        # True / False once a full-duplex stream was tried on this pair, else None
+        try:
+            return self._duplex.get((device_key(self.device(in_id)), device_key(self.device(out_id))))
+        except ValueError:
+            return None
+
+    def set_duplex(self, in_id, out_id, ok):
+        try:
+            self._duplex[(device_key(self.device(in_id)), device_key(self.device(out_id)))] = ok
+        except ValueError:
+            pass
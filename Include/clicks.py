@@ -0,0 +1,288 @@
+# clicks.py
+# Click / pop / dropout detector on the input tap, on the analysis worker.
+#
+# The second difference of the signal (a steep high-pass: the music's low
+# end drops out, a click stays a sharp spike) is compared, block by block,
+# with a noise floor taken from the same block: the median of its
+# magnitude, which the few samples of a click do not move, and which may
+# only fall at FLOOR_RELEASE (so a dropout or a hard cut to silence does
+# not empty it and flag the music around it). Samples more
+# than THRESHOLD_DB above it are clicks; hits closer than MERGE_MS on one
+# channel make a single event, a pop when it lasts POP_MS or more. Runs of
+# digital zeros between DROPOUT_MIN_MS and DROPOUT_MAX_MS are dropouts
+# (longer ones are silence: a pause, a lifted needle); the steps into and
+# out of such runs are not counted as clicks.
+# All of it is array work over a whole process() slice; the only Python
+# loop is over the channels that hold a run of zeros.
+#
+# Events go into an EventLog (one structured array, EVENT_DTYPE) that any
+# thread can read and that exports to CSV / JSON.
+import os
+import json
+import time
+import numpy as np
+
+from ringbuffer import RingBuffer
+from recorder import RECORD_DIR
+
+BLOCK_SECONDS = 0.02     # noise floor block
+PROCESS_BLOCKS = 16      # most blocks handled per process() call
+THRESHOLD_DB = 20.0      # click: this far above the block's noise floor
+FLOOR_DBFS = -90.0       # lowest floor, so dither alone never triggers
+FLOOR_RELEASE = 200.0    # dB/s the floor may fall by (rises at once)
+MERGE_MS = 1.0           # hits closer than this are one event
+POP_MS = 2.0             # events this long are pops
+ZERO_DBFS = -96.0        # under the 16-bit LSB: a dropped sample
+DROPOUT_MIN_MS = 1.0
+DROPOUT_MAX_MS = 500.0   # longer runs of zeros are silence
+HISTORY = 2              # samples carried over for the second difference
+
+CLICK, POP, DROPOUT = 0, 1, 2
+KINDS = ("click", "pop", "dropout")
+# magnitude: peak in dB above the noise floor (0 for dropouts)
+EVENT_DTYPE = np.dtype([("time", "f8"), ("channel", "u1"), ("kind", "u1"),
+                        ("magnitude", "f4"), ("duration", "f4")])  # seconds, -, -, dB, ms
+LOG_START = 4096
+LOG_MAX = 1 << 20        # 16 MiB of events, later ones are only counted
+
+
+class EventLog:
+    """Append-only event array. The analysis thread appends; readers on
+    other threads take `count` first, so they only see finished rows."""
+
+    def __init__(self, capacity=LOG_START):
+        self._events = np.zeros(capacity, dtype=EVENT_DTYPE)
+        self.count = 0
+        self.lost = 0  # events past LOG_MAX
+        self.totals = np.zeros(len(KINDS), dtype=np.int64)  # per kind, lost ones included
+
+    def append(self, rows):
+        self.totals += np.bincount(rows["kind"], minlength=len(KINDS))
+        n = min(len(rows), LOG_MAX - self.count)
+        self.lost += len(rows) - n
+        if self.count + n > len(self._events):
+            # grown aside and swapped in: a reader holds the old array or the new one
+            size = len(self._events)
+            while size < self.count + n:
+                size *= 2
+            grown = np.zeros(min(size, LOG_MAX), dtype=EVENT_DTYPE)
+            grown[:self.count] = self._events[:self.count]
+            self._events = grown
+        self._events[self.count:self.count + n] = rows[:n]
+        self.count += n
+
+    def events(self):
+        # copy of every logged event, in time order
+        n = self.count
+        return self._events[:n].copy()
+
+    def last(self):
+        n = self.count
+        return self._events[n - 1].copy() if n else None
+
+    def since(self, t):
+        # events logged at or after `t` seconds
+        n = self.count
+        return n - int(np.searchsorted(self._events["time"][:n], t))
+
+
+class ClickDetector:
+    def __init__(self, channels, samplerate, threshold_db=THRESHOLD_DB):
+        self.channels = int(channels)
+        self.samplerate = float(samplerate)
+        self.block = max(64, int(BLOCK_SECONDS * samplerate))
+        self.threshold = 10.0 ** (threshold_db / 20.0)
+        self.floor_min = 10.0 ** (FLOOR_DBFS / 20.0)
+        self._fall = FLOOR_RELEASE * self.block / samplerate / 20 * np.log(10)  # log units per block
+        self.zero = 10.0 ** (ZERO_DBFS / 20.0)
+        self.merge = max(1, int(MERGE_MS / 1000 * samplerate))
+        self.pop = int(POP_MS / 1000 * samplerate)
+        self.dropout = (int(DROPOUT_MIN_MS / 1000 * samplerate), int(DROPOUT_MAX_MS / 1000 * samplerate))
+        ch = self.channels
+        self.ring = RingBuffer(max(int(samplerate), 4 * self.block * PROCESS_BLOCKS), ch)
+        # carried samples + the blocks of one call, contiguous for the difference;
+        # the first HISTORY real frames only serve as history (zeros would make a step)
+        self.work = np.zeros((HISTORY + PROCESS_BLOCKS * self.block, ch), dtype=np.float32)
+        self.have = 0
+        self._diff = np.zeros((PROCESS_BLOCKS * self.block, ch), dtype=np.float32)
+        self.position = HISTORY  # stream frame of the next analyzed sample
+        self._floor = np.full(ch, np.log(self.floor_min))  # log floor of the last block
+        self._last = np.full(ch, -(self.merge + 1), dtype=np.int64)  # last hit per channel
+        # the stream starts "in silence": a first run of zeros is not a dropout
+        self._zero = np.ones(ch, dtype=bool)
+        self._zero_start = np.full(ch, -(self.dropout[1] + 1), dtype=np.int64)
+        self.log = EventLog()
+        self.started = time.time()
+
+    # ---- audio thread ----
+    def push(self, block):
+        self.ring.write(block)
+
+    # ---- analysis thread ----
+    def process(self):
+        """Analyze the whole blocks available. Returns the number of frames
+        consumed from the ring (0 = nothing to do)."""
+        room = self.work.shape[0] - self.have
+        n = min(self.ring.fill, room)
+        if n == 0:
+            return 0
+        self.ring.read_into(self.work[self.have:self.have + n])
+        self.have += n
+        m = max(self.have - HISTORY, 0) // self.block
+        if m == 0:
+            return n
+        frames = m * self.block
+        x = self.work[:HISTORY + frames]
+        zero = np.abs(x) < self.zero
+        clicks, drops = self._clicks(x, zero, frames, m), self._dropouts(zero[HISTORY:])
+        found = [r for r in (clicks, drops) if r is not None]
+        rows = np.concatenate(found) if found else ()
+        if len(rows):
+            self.log.append(rows[np.argsort(rows["time"], kind="stable")])
+
+        # keep the last HISTORY samples and the partial block
+        self.work[:self.have - frames] = self.work[frames:self.have]
+        self.have -= frames
+        self.position += frames
+        return n
+
+    def _clicks(self, x, zero, frames, m):
+        d = self._diff[:frames]
+        np.subtract(x[2:], x[1:-1], out=d)
+        d -= x[1:-1]
+        d += x[:-2]
+        np.abs(d, out=d)
+        blocks = d.reshape(m, self.block, self.channels)
+        # log floor[k] = max(log median[k], log floor[k-1] - fall): a running
+        # maximum of the medians on a falling ramp, as in ballistics.py
+        floor = np.log(np.maximum(np.median(blocks, axis=1), self.floor_min))
+        ramp = np.arange(m)[:, None] * self._fall
+        floor = np.maximum(np.maximum.accumulate(floor + ramp, axis=0) - ramp,
+                           self._floor - ramp - self._fall)
+        self._floor = floor[-1]
+        blocks /= np.exp(floor).astype(np.float32)[:, None, :]  # d now holds the ratio to the floor
+        hits = d > self.threshold
+        # steps into or out of digital silence (2+ zero samples touching the
+        # difference's 3-sample window) are dropout or silence edges, not clicks
+        pair = zero[1:] & zero[:-1]  # pair[p]: x[p] and x[p + 1] are zero
+        if pair.any():
+            near = pair[:frames].copy()
+            near[1:] |= pair[:frames - 1]
+            near |= pair[1:frames + 1]
+            near[:-1] |= pair[2:frames + 1]
+            hits &= ~near
+        # hits in channel-major order, then split into events per channel
+        ch, pos = np.nonzero(hits.T)
+        if len(pos) == 0:
+            return None
+        head = np.ones(len(pos), dtype=bool)
+        head[1:] = (ch[1:] != ch[:-1]) | (pos[1:] - pos[:-1] > self.merge)
+        starts = np.flatnonzero(head)
+        ends = np.append(starts[1:], len(pos)) - 1
+        gch = ch[starts]
+        first = self.position + pos[starts]
+        last = self.position + pos[ends]
+        peak = np.maximum.reduceat(d[pos, ch], starts)
+        # an event running on from the previous call was already logged
+        fresh = first - self._last[gch] > self.merge
+        self._last[gch] = last  # repeated channels: the last event wins
+        length = (last - first + 1)[fresh]
+        rows = np.zeros(int(fresh.sum()), dtype=EVENT_DTYPE)
+        rows["time"] = first[fresh] / self.samplerate
+        rows["channel"] = gch[fresh]
+        rows["kind"] = np.where(length >= self.pop, POP, CLICK)
+        rows["magnitude"] = 20.0 * np.log10(peak[fresh])
+        rows["duration"] = length * (1000.0 / self.samplerate)
+        return rows
+
+    def _dropouts(self, zero):
+        if not self._zero.any() and not zero.any():
+            return None
+        times, chans, lengths = [], [], []
+        lo, hi = self.dropout
+        for c in np.flatnonzero(zero.any(axis=0) | self._zero):
+            col = zero[:, c]
+            edges = np.diff(col.astype(np.int8), prepend=np.int8(self._zero[c]))
+            begin = self.position + np.flatnonzero(edges == 1)
+            if self._zero[c]:
+                begin = np.concatenate(([self._zero_start[c]], begin))
+            end = self.position + np.flatnonzero(edges == -1)
+            length = end - begin[:len(end)]
+            keep = (length >= lo) & (length <= hi)
+            times.append(begin[:len(end)][keep])
+            lengths.append(length[keep])
+            chans.append(np.full(int(keep.sum()), c))
+            self._zero[c] = col[-1]
+            if col[-1]:
+                self._zero_start[c] = begin[-1]
+        length = np.concatenate(lengths)
+        rows = np.zeros(len(length), dtype=EVENT_DTYPE)
+        rows["time"] = np.concatenate(times) / self.samplerate
+        rows["channel"] = np.concatenate(chans)
+        rows["kind"] = DROPOUT
+        rows["duration"] = length * (1000.0 / self.samplerate)
+        return rows
+
+    # ---- any thread ----
+    @property
+    def seconds(self):
+        return self.position / self.samplerate
+
+    def stats(self):
+        # per kind totals, the last minute's event rate and events not kept
+        totals = self.log.totals.copy()
+        return dict(zip(KINDS, totals.tolist()), per_minute=self.log.since(self.seconds - 60.0),
+                    lost=self.log.lost, seconds=self.seconds)
+
+
+def _clock(t):
+    # 185.3 -> "3:05.3"
+    return f"{int(t // 60)}:{t % 60:04.1f}"
+
+
+def format_clicks(detector):
+    st = detector.stats()
+    text = (f"Clics {st['click']}  pops {st['pop']}  coupures {st['dropout']}"
+            f"  ({st['per_minute']}/min)")
+    last = detector.log.last()
+    if last is not None:
+        what = ("clic", "pop", "coupure")[last["kind"]]
+        size = (f"{last['duration']:.0f} ms" if last["kind"] == DROPOUT
+                else f"+{last['magnitude']:.0f} dB")
+        text += f"  dernier : {what} {_clock(last['time'])} voie {last['channel'] + 1} {size}"
+    return text
+
+
+def default_clicks_path():
+    # timestamped CSV next to the recordings
+    os.makedirs(RECORD_DIR, exist_ok=True)
+    return os.path.join(RECORD_DIR, time.strftime("clicks-%Y%m%d-%H%M%S.csv"))
+
+
+def write_csv(events, path):
+    with open(path, "w") as f:
+        f.write("time_s,channel,kind,magnitude_db,duration_ms\n")
+        for e in events:
+            f.write(f"{e['time']:.4f},{e['channel'] + 1},{KINDS[e['kind']]},"
+                    f"{e['magnitude']:.1f},{e['duration']:.2f}\n")
+
+
+def write_json(events, path, started=None, samplerate=None):
+    out = {"started": started, "samplerate": samplerate,
+           "events": [{"time": round(float(e["time"]), 4), "channel": int(e["channel"]) + 1,
+                       "kind": KINDS[e["kind"]], "magnitude_db": round(float(e["magnitude"]), 1),
+                       "duration_ms": round(float(e["duration"]), 2)} for e in events]}
+    with open(path, "w") as f:
+        json.dump(out, f)
+
+
+def export(detector, path):
+    """Write the detector's event log to `path`: JSON for *.json, CSV
+    otherwise (times in seconds from the start of monitoring)."""
+    events = detector.log.events()
+    if path.lower().endswith(".json"):
+        write_json(events, path, time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(detector.started)),
+                   detector.samplerate)
+    else:
+        write_csv(events, path)
+    return len(events)
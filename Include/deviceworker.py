@@ -0,0 +1,44 @@
+# deviceworker.py
+# Worker process of multidevice.py: one engine per input device, levels
+# published into the shared LevelGrid. Kept apart from the GUI modules and
+# free of Qt: it is the main module of every spawned worker.
+import os
+
+from engine import AudioEngine
+from metering import METER_FPS
+from multidevice import LevelGrid, CLIP_RESET, RUNNING, FAILED, STOPPED
+
+
+def run(grid_name, devices, slot, device, blocksize, backend, sample_format, stop, errors):
+    # runs in the worker process: one engine, monitor only, levels only
+    parent = os.getppid()
+    grid = LevelGrid(devices, grid_name)
+    engine = AudioEngine(backend=backend() if backend is not None else None,
+                         blocksize=blocksize, analyzers=False)
+    engine.sample_format = sample_format
+    try:
+        try:
+            engine.start(device, monitor_only=True)
+        except Exception as e:  # EngineError, or no audio backend at all
+            grid.set_state(slot, FAILED)
+            errors.put((slot, str(e)))
+            return
+        grid.set_state(slot, RUNNING, engine.samplerate)
+        resets = grid.grid[slot, CLIP_RESET]
+        # stop with the GUI, or if it died without telling us; the worker
+        # polls at the idle rate while its levels stand still
+        interval = 1.0 / METER_FPS
+        while not stop.wait(interval) and os.getppid() == parent:
+            if grid.grid[slot, CLIP_RESET] != resets:
+                resets = grid.grid[slot, CLIP_RESET]
+                engine.reset_clip()
+            levels = engine.read_channel_levels()
+            if levels is not None:
+                holds, clips = engine.read_hold()
+                grid.publish(slot, levels, engine.meter.peak, holds, clips,
+                             engine.health.xruns(), engine.health.dsp_load())
+            interval = engine.meter_interval() / 1000
+        grid.set_state(slot, STOPPED)
+    finally:
+        engine.stop()
+        grid.close()
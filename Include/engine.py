@@ -0,0 +1,834 @@
+# engine.py
+# Headless audio engine: device selection, stream lifecycle and metering,
+# with no Qt dependency. The GUIs (main.py / debug.py) are thin clients of
+# AudioEngine; `python engine.py` runs it without a display.
+import sys
+import time
+import argparse
+from time import perf_counter_ns
+import numpy as np
+
+from ringbuffer import RingBuffer
+from routing import RoutingPlan, parse_routes
+from metering import LevelMeter, MeterPacer, METER_FPS
+from ballistics import MODES as METER_MODES, DEFAULT_MODE as DEFAULT_METER_MODE
+from resampler import Resampler, DriftController
+from health import HealthMonitor, HealthExporter
+from loudness import LoudnessMeter, format_loudness
+from analysis import AnalysisWorker, ANALYSIS_INTERVAL, IDLE_INTERVAL
+from spectrum import SpectrumAnalyzer
+from clicks import ClickDetector, format_clicks, export as export_clicks
+from recorder import Recorder
+from catalog import DeviceCatalog
+from dsp import DspChain, RUMBLE_HZ
+from netfeed import LevelFeed, FEED_HOST, FEED_RATE
+from mixer import Mixer
+import sampleformat
+from sampleformat import FLOAT, view, to_float, from_float
+
+BLOCKSIZE = 1024
+# GIL switch interval while streams run: the audio thread waits at most this
+# long for Python threads such as the analysis worker (CPython default 5 ms)
+SWITCH_INTERVAL = 0.0005
+RING_BLOCKS = 4  # fallback ring capacity, in blocks (bounds the added latency)
+
+FULL_DUPLEX = "full-duplex"
+FALLBACK = "fallback"
+MONITOR_ONLY = "monitor-only"
+MIX = "mix"
+
+
+class EngineError(Exception):
+    pass
+
+
+def _sounddevice():
+    # imported on first use: PortAudio is only needed once devices are touched
+    import sounddevice
+    return sounddevice
+
+
+class AudioEngine:
+    def __init__(self, backend=None, blocksize=BLOCKSIZE, latency=None, analyzers=True):
+        """`backend` is the sounddevice module or anything exposing the same
+        query_devices / Stream / InputStream / OutputStream API. `latency` is
+        passed to every stream ('low', 'high', seconds, or None = default).
+        `analyzers=False` only meters levels (no loudness / spectrum thread)."""
+        self._backend = backend
+        self.blocksize = blocksize
+        self.latency = latency
+        self.analyzers = analyzers
+        self.health = HealthMonitor()  # xrun counters + callback timings, reset by start()
+        self.volume = 1.0
+        self.mode = None
+        self.full_stream = None
+        self.in_stream = None
+        self.out_stream = None
+        self.ring = None
+        self.src = None
+        self.drift = None
+        self.plan = None
+        self.mixer = None  # sources summed into one bus, see start_mix()
+        self.meter = None
+        self.meter_mode = DEFAULT_METER_MODE  # needle ballistics: vu, ppm1 or ppm2 (next start)
+        self.pacer = MeterPacer()  # consumer polling rate, see meter_interval()
+        self.loudness = None
+        self.spectrum = None
+        self.clicks = None      # click / pop / dropout detector; its log outlives stop() for export
+        self.analysis = None
+        self.recorder = None
+        self.feed = None        # network level feed, see start_feed()
+        self.probe = None       # latency.LatencyProbe replacing the monitored input, see latency.py
+        self.samplerate = None  # input rate of the running streams
+        self._switch_interval = None
+        self.routes = None  # routing spec "in:out[:gain],..." or None for the default
+        # stream sample format: float32, or int16 / int32 / auto for raw streams
+        # in the device's own format (full-duplex and monitor-only)
+        self.sample_format = FLOAT
+        self.fmt = None  # integer format of the running raw streams, None for float32
+        self._raw_out = None
+        # playback processing on the output (RIAA, rumble, width), every stage off by default
+        self.dsp = DspChain()
+        # device list cached and refreshed in the background, see catalog.py
+        self.catalog = DeviceCatalog(lambda: self.sd, idle=lambda: not self.running)
+
+    @property
+    def sd(self):
+        if self._backend is None:
+            self._backend = _sounddevice()
+        return self._backend
+
+    @property
+    def running(self):
+        return self.mode is not None
+
+    # ---- devices ----
+    def devices(self):
+        return [(d['index'], d) for d in self.catalog.wait()]
+
+    def input_devices(self):
+        return [(i, d['name']) for i, d in self.devices() if d['max_input_channels'] > 0]
+
+    def output_devices(self):
+        return [(i, d['name']) for i, d in self.devices() if d['max_output_channels'] > 0]
+
+    def device_name(self, index):
+        try:
+            return self.catalog.device(index)['name']
+        except (ValueError, KeyError, TypeError) as e:
+            raise EngineError(f"Erreur périphérique: {e}")
+
+    def print_devices(self):
+        print("PyAudio/SoundDevice devices:")
+        for i, d in self.devices():
+            rates = "/".join(f"{r / 1000:g}" for r in d['samplerates'])
+            print(f"{i}: {d['name']}  in={d['max_input_channels']} out={d['max_output_channels']} "
+                  f"sr={d['default_samplerate']} ({rates} kHz)")
+
+    def reported_latency(self):
+        """(input, output) latency in seconds as reported by the open
+        streams, or None when stopped."""
+        if self.full_stream is not None:
+            lat = self.full_stream.latency
+            return tuple(lat) if isinstance(lat, (tuple, list)) else (lat, lat)
+        if self.mixer is not None:
+            # bus clock and first output
+            return self.mixer.sources[0].stream.latency, self.mixer.outputs[0].stream.latency
+        if self.in_stream is None:
+            return None
+        out = self.out_stream.latency if self.out_stream is not None else None
+        return self.in_stream.latency, out
+
+    def cpu_load(self):
+        # PortAudio's estimate of the callback load (0..1), worst open stream
+        streams = [self.full_stream, self.in_stream, self.out_stream]
+        if self.mixer is not None:
+            streams += self.mixer.streams
+        loads = [s.cpu_load for s in streams if s is not None]
+        return max(loads) if loads else 0.0
+
+    # ---- metering (consumer side, call from one thread at the frame rate) ----
+    def read_levels(self):
+        """(left, right) needle levels published since the last call, or None
+        if no new audio arrived."""
+        meter = self.meter
+        if meter is None or meter.drain() == 0:
+            return None
+        return meter.stereo_levels(self._meter_gain())
+
+    def read_channel_levels(self):
+        """Per input channel levels (array, 0..1) published since the last
+        call, or None. Same consumer rules as read_levels(), use one or the other."""
+        meter = self.meter
+        if meter is None or meter.drain() == 0:
+            return None
+        return meter.channel_levels(self._meter_gain())
+
+    def read_hold(self):
+        """(held peaks, clipped) per input channel as of the last read_levels() /
+        read_channel_levels() call, or None when stopped. Peaks are on the
+        needle scale, clip flags stay set until reset_clip()."""
+        meter = self.meter
+        if meter is None:
+            return None
+        return meter.hold_levels(self._meter_gain()), meter.clipped
+
+    def meter_interval(self, visible=True):
+        """Milliseconds until the consumer's next meter read: full rate while
+        the last read moved something, the idle rate once the meters settle or
+        while `visible` is False. Also slows the analysis thread during
+        silence or while nothing is shown."""
+        meter = self.meter
+        ms = self.pacer.interval_ms(meter is not None and meter.moving, visible)
+        if self.analysis is not None:
+            rest = not visible or (meter is not None and meter.silent)
+            self.analysis.set_interval(IDLE_INTERVAL if rest else ANALYSIS_INTERVAL)
+        return ms
+
+    def meter_snapshot(self):
+        # the last meter reading, from any thread and without consuming anything (net feed)
+        meter = self.meter
+        return meter.snapshot(self._meter_gain()) if meter is not None else None
+
+    def start_feed(self, **kwargs):
+        """Serve the meters to remote dashboards (see netfeed.LevelFeed for the
+        arguments). Runs until stop_feed(), across stream restarts."""
+        self.stop_feed()
+        self.feed = LevelFeed(self, **kwargs).start()
+        return self.feed
+
+    def stop_feed(self):
+        if self.feed is not None:
+            self.feed.stop()
+            self.feed = None
+
+    def set_meter_mode(self, mode):
+        # needle ballistics, applied at once if a stream is running (consumer thread)
+        if self.meter is not None:
+            self.meter.set_mode(mode)
+        self.meter_mode = mode
+
+    def reset_clip(self):
+        if self.meter is not None:
+            self.meter.reset_clip()
+
+    def read_loudness(self):
+        # latest loudness readings (dict, see loudness.py) or None when stopped
+        return self.loudness.readings if self.loudness is not None else None
+
+    def export_clicks(self, path):
+        # the detected events of the running (or last) session to CSV / JSON, returns their count
+        if self.clicks is None:
+            raise EngineError("Erreur export: aucun événement détecté")
+        try:
+            return export_clicks(self.clicks, path)
+        except OSError as e:
+            raise EngineError(f"Erreur export: {e}")
+
+    def read_spectrogram(self):
+        # spectrogram rows (dB per band of self.spectrum.freqs) since the last call, or None
+        return self.spectrum.read_rows() if self.spectrum is not None else None
+
+    # ---- recording (input tap, written by a background thread) ----
+    def start_recording(self, path, fmt="wav"):
+        """Record the input of the running streams to `path` until
+        stop_recording() or stop()."""
+        if not self.running:
+            raise EngineError("Erreur enregistrement: aucun stream actif")
+        self.stop_recording()
+        try:
+            self.recorder = Recorder(path, self.meter.channels, self.samplerate, fmt)
+        except (OSError, ValueError) as e:
+            raise EngineError(f"Erreur enregistrement: {e}")
+        print(f"Recording to {path} ({fmt})")
+
+    def stop_recording(self):
+        # returns the recorder stats, or None if nothing was recording
+        recorder, self.recorder = self.recorder, None
+        if recorder is None:
+            return None
+        stats = recorder.close()
+        print(f"Recording stopped: {stats['seconds']:.1f} s written, "
+              f"dropped={stats['dropped_frames']} lost={stats['lost_frames']}")
+        return stats
+
+    def _meter_gain(self):
+        # full-duplex shows the post-volume level, like before
+        return self.volume if self.mode == FULL_DUPLEX else 1.0
+
+    def set_routes(self, routes):
+        """Change the routing spec; applied at once if a stream is running."""
+        if self.plan is not None:
+            matrix = self._routing_matrix(routes, self.plan.in_ch, self.plan.out_ch)
+            self.plan.set_matrix(matrix)
+        self.routes = routes
+
+    def _routing_matrix(self, routes, in_ch, out_ch):
+        if not routes:
+            return None
+        try:
+            return parse_routes(routes, in_ch, out_ch)
+        except ValueError as e:
+            raise EngineError(f"Erreur routage: {e}")
+
+    # ---- full-duplex callback (if possible) ----
+    def _full_callback(self, indata, outdata, frames, time, status):
+        t0 = perf_counter_ns()
+        health = self.health.callbacks["full"]
+        if status:
+            health.status(status)
+        try:
+            # defensive: ensure we have some data
+            if indata is None or indata.size == 0:
+                outdata.fill(0)
+                return
+
+            arr = indata
+            if arr.ndim == 1:
+                arr = arr.reshape(-1, 1)
+            # publish samples for the meter, levels are computed on the GUI clock
+            self.meter.push(arr)
+            if self.analysis is not None:
+                self.loudness.push(arr)
+                self.spectrum.push(arr)
+                self.clicks.push(arr)
+            recorder = self.recorder
+            if recorder is not None:
+                recorder.push(arr)
+            probe = self.probe
+            if probe is not None:
+                arr = probe.exchange(arr)
+
+            # upmix / slice / pad straight into outdata (plan built at stream open)
+            self.plan.apply(arr, outdata, self.volume)
+            self.dsp.process(outdata)
+        finally:
+            health.timing(perf_counter_ns() - t0, frames)
+
+    # ---- fallback: separate input callback ----
+    def _in_callback(self, indata, frames, time, status):
+        t0 = perf_counter_ns()
+        health = self.health.callbacks["in"]
+        if status:
+            health.status(status)
+        try:
+            if indata is None or indata.size == 0:
+                return
+            arr = indata
+            if arr.ndim == 1:
+                arr = arr.reshape(-1, 1)
+            self.meter.push(arr)
+            if self.analysis is not None:
+                self.loudness.push(arr)
+                self.spectrum.push(arr)
+                self.clicks.push(arr)
+            recorder = self.recorder
+            if recorder is not None:
+                recorder.push(arr)
+
+            probe = self.probe
+            if probe is not None:
+                arr = probe.exchange(arr)
+
+            # copy frames into the ring (in place, overruns are counted there)
+            self.ring.write(arr)
+        finally:
+            health.timing(perf_counter_ns() - t0, frames)
+
+    # ---- fallback: separate output callback ----
+    def _out_callback(self, outdata, frames, time, status):
+        t0 = perf_counter_ns()
+        health = self.health.callbacks["out"]
+        if status:
+            health.status(status)
+        try:
+            # ratio steered from the ring fill, None while the ring is still priming
+            step = self.drift.update(self.ring.fill)
+            if step is None:
+                outdata.fill(0)
+                return
+            # resample exactly `frames` output frames out of the ring
+            block = self.plan.block(frames)
+            self.src.process(self.ring, block, step)
+            self.plan.apply(block, outdata, self.volume)
+            self.dsp.process(outdata)
+        finally:
+            health.timing(perf_counter_ns() - t0, frames)
+
+    # ---- monitor only: input callback that only feeds the meter ----
+    def _monitor_callback(self, indata, frames, time, status):
+        t0 = perf_counter_ns()
+        health = self.health.callbacks["monitor"]
+        if status:
+            health.status(status)
+        try:
+            if indata is None or indata.size == 0:
+                return
+            arr = indata
+            if arr.ndim == 1:
+                arr = arr.reshape(-1, 1)
+            self.meter.push(arr)
+            if self.analysis is not None:
+                self.loudness.push(arr)
+                self.spectrum.push(arr)
+                self.clicks.push(arr)
+            recorder = self.recorder
+            if recorder is not None:
+                recorder.push(arr)
+        finally:
+            health.timing(perf_counter_ns() - t0, frames)
+
+    # ---- raw streams (native integer format) ----
+    def _raw_taps(self, arr, frames):
+        # the meter queues the integer frames as they are; loudness, spectrum
+        # and the recorder need float32: one conversion, only if one of them runs
+        self.meter.push(arr)
+        recorder = self.recorder
+        if self.analysis is None and recorder is None:
+            return None
+        block = self.plan.block(frames)
+        to_float(arr, block, self.fmt)
+        if self.analysis is not None:
+            self.loudness.push(block)
+            self.spectrum.push(block)
+            self.clicks.push(block)
+        if recorder is not None:
+            recorder.push(block)
+        return block
+
+    def _raw_full_callback(self, indata, outdata, frames, time, status):
+        t0 = perf_counter_ns()
+        health = self.health.callbacks["full"]
+        if status:
+            health.status(status)
+        try:
+            plan = self.plan
+            arr = view(indata, self.fmt, plan.in_ch)
+            block = self._raw_taps(arr, frames)
+            probe = self.probe
+            if self.volume == 1.0 and plan.identity and not self.dsp.active and probe is None:
+                # nothing to change: the input bytes go straight to the output
+                outdata[:] = indata
+                return
+            if block is None:
+                block = plan.block(frames)
+                to_float(arr, block, self.fmt)
+            if probe is not None:
+                block = probe.exchange(block)
+            if frames > self._raw_out.shape[0]:
+                self._raw_out = np.zeros((frames, plan.out_ch), dtype=np.float32)
+            out = self._raw_out[:frames]
+            plan.apply(block, out, self.volume)
+            self.dsp.process(out)
+            from_float(out, view(outdata, self.fmt, plan.out_ch), self.fmt)
+        finally:
+            health.timing(perf_counter_ns() - t0, frames)
+
+    def _raw_monitor_callback(self, indata, frames, time, status):
+        t0 = perf_counter_ns()
+        health = self.health.callbacks["monitor"]
+        if status:
+            health.status(status)
+        try:
+            self._raw_taps(view(indata, self.fmt, self.plan.in_ch), frames)
+        finally:
+            health.timing(perf_counter_ns() - t0, frames)
+
+    # ---- lifecycle ----
+    def start(self, in_id, out_id=None, monitor_only=False, fallback=False):
+        """Open the streams and return the mode that was started. Raises
+        EngineError (message ready for display) if nothing could be opened.
+        `fallback=True` skips full-duplex and opens separate streams."""
+        self.catalog.wait()
+        # the catalogue must not re-initialize PortAudio while streams open
+        with self.catalog.lock:
+            return self._start(in_id, out_id, monitor_only, fallback)
+
+    def _start(self, in_id, out_id, monitor_only, fallback):
+        if self.running:
+            self.stop()
+        self.health.reset()
+        if out_id is None:
+            monitor_only = True
+        sd = self.sd
+
+        try:
+            in_info = self.catalog.device(in_id, 'input')
+            in_ch = in_info['max_input_channels']
+            sr = int(in_info['default_samplerate'] or 44100)
+            print(f"Selected in={in_id} ({in_info['name']}) ch={in_ch} sr={sr}")
+            if monitor_only:
+                out_ch, out_sr = in_ch, sr
+            else:
+                out_info = self.catalog.device(out_id, 'output')
+                out_ch = out_info['max_output_channels']
+                out_sr = int(out_info['default_samplerate'] or sr)
+                print(f"Selected out={out_id} ({out_info['name']}) ch={out_ch} sr={out_sr}")
+        except Exception as e:
+            print("query_devices error:", e)
+            raise EngineError(f"Erreur query_devices: {e}")
+
+        self.samplerate = sr
+        for role in ("full", "in", "monitor"):
+            self.health[role].configure(sr)
+        self.health["out"].configure(out_sr)
+
+        # channel routing + scratch buffers, shared by every callback below
+        matrix = self._routing_matrix(self.routes, in_ch, out_ch)
+        self.plan = RoutingPlan(in_ch, out_ch, self.blocksize, matrix)
+        self.fmt = None
+        if self.sample_format != FLOAT:
+            self.fmt = sampleformat.choose(sd, self.sample_format, in_id, in_ch,
+                                           None if monitor_only else out_id, out_ch, sr)
+            if self.fmt is None:
+                print(f"Format {self.sample_format} refused by the device, using float32")
+            else:
+                self._raw_out = np.zeros((self.blocksize, out_ch), dtype=np.float32)
+        self._start_taps(in_ch, sr)
+
+        if monitor_only:
+            print("Monitor only mode: no output stream will be opened.")
+            try:
+                if self.fmt is not None:
+                    self.in_stream = sd.RawInputStream(device=in_id, channels=in_ch, samplerate=sr,
+                                    blocksize=self.blocksize, latency=self.latency, dtype=self.fmt,
+                                    callback=self._raw_monitor_callback)
+                else:
+                    self.in_stream = sd.InputStream(device=in_id, channels=in_ch, samplerate=sr,
+                                    blocksize=self.blocksize, latency=self.latency, dtype='float32',
+                                    callback=self._monitor_callback)
+                self.in_stream.start()
+                self.mode = MONITOR_ONLY
+                print(f"Input stream started (monitor only, {self.fmt or FLOAT})")
+                return self.mode
+            except Exception as e:
+                print("Input stream failed:", e)
+                self.stop()
+                raise EngineError(f"Erreur ouverture input stream: {e}")
+
+        # Try full-duplex stream first, unless this pair already refused it
+        try:
+            if self.catalog.duplex(in_id, out_id) is False:
+                raise EngineError("already failed on this device pair")
+            if fallback:
+                raise EngineError("separate streams requested")
+            print("Trying full-duplex stream...")
+            self.dsp.configure(out_ch, sr, self.blocksize)
+            if self.fmt is not None:
+                stream, dtype, callback = sd.RawStream, self.fmt, self._raw_full_callback
+            else:
+                stream, dtype, callback = sd.Stream, 'float32', self._full_callback
+            self.full_stream = stream(
+                device=(in_id, out_id),
+                samplerate=sr,
+                blocksize=self.blocksize,
+                latency=self.latency,
+                dtype=dtype,
+                channels=(in_ch, out_ch),
+                callback=callback
+            )
+            self.full_stream.start()
+            self.catalog.set_duplex(in_id, out_id, True)
+            self.mode = FULL_DUPLEX
+            print(f"Full-duplex started ({self.fmt or FLOAT})")
+            return self.mode
+        except Exception as e:
+            print("Full-duplex failed:", e)
+            if not isinstance(e, EngineError):
+                self.catalog.set_duplex(in_id, out_id, False)
+            self.full_stream = None
+            # fallback to separate streams
+        try:
+            print("Falling back to separate input/output streams...")
+            if self.fmt is not None:
+                # the ring and the resampler work in float32
+                print("Separate streams run in float32")
+                self.fmt = None
+                self.meter = LevelMeter(in_ch, sr, mode=self.meter_mode)
+            self.dsp.configure(out_ch, out_sr, self.blocksize)
+            # each device runs at its native rate, the output side resamples
+            # and compensates clock drift from the ring fill level
+            ratio = sr / out_sr
+            capacity = int(RING_BLOCKS * self.blocksize * max(1.0, ratio))
+            self.ring = RingBuffer(capacity, in_ch)
+            self.src = Resampler(in_ch, ratio, self.blocksize)
+            self.drift = DriftController(ratio, capacity // 2, capacity)
+            self.in_stream = sd.InputStream(device=in_id, channels=in_ch, samplerate=sr,
+                                            blocksize=self.blocksize, latency=self.latency, dtype='float32',
+                                            callback=self._in_callback)
+            self.out_stream = sd.OutputStream(device=out_id, channels=out_ch, samplerate=out_sr,
+                                              blocksize=self.blocksize, latency=self.latency, dtype='float32',
+                                              callback=self._out_callback)
+            self.in_stream.start()
+            self.out_stream.start()
+            self.mode = FALLBACK
+            print("Separate streams started")
+            return self.mode
+        except Exception as e:
+            print("Fallback streams failed:", e)
+            # cleanup partial
+            self.stop()
+            raise EngineError(f"Erreur ouverture streams: {e}")
+
+    def _start_taps(self, channels, samplerate):
+        # meter + analysis thread of a new session, on the monitored signal
+        self.meter = LevelMeter(channels, samplerate, mode=self.meter_mode, fmt=self.fmt)
+        self.pacer.reset()
+        if self._switch_interval is None:
+            self._switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(SWITCH_INTERVAL)
+
+        # loudness, spectrum and clicks run on their own thread, fed from the same input tap as the meter
+        if self.analyzers:
+            self.loudness = LoudnessMeter(channels, samplerate)
+            self.spectrum = SpectrumAnalyzer(channels, samplerate)
+            self.clicks = ClickDetector(channels, samplerate)
+            self.analysis = AnalysisWorker()
+            self.analysis.add(self.loudness)
+            self.analysis.add(self.spectrum)
+            self.analysis.add(self.clicks)
+            self.analysis.start()
+
+    def start_mix(self, sources, outputs):
+        """Sum several input devices into one bus and play the bus on several
+        output devices, each on its own stream (see mixer.py). `sources` /
+        `outputs`: [device] or [(device, gain dB)]; the first source clocks
+        the bus. Returns MIX, raises EngineError like start()."""
+        self.catalog.wait()
+        with self.catalog.lock:
+            return self._start_mix(sources, outputs)
+
+    def _start_mix(self, sources, outputs):
+        if self.running:
+            self.stop()
+        self.health.reset()
+        try:
+            specs = []
+            for items, kind, key in ((sources, 'input', 'max_input_channels'),
+                                     (outputs, 'output', 'max_output_channels')):
+                spec = []
+                for item in items:
+                    device, gain = item if isinstance(item, tuple) else (item, 0.0)
+                    info = self.catalog.device(device, kind)
+                    spec.append((device, info[key], int(info['default_samplerate'] or 44100), gain))
+                    print(f"Mix {kind} {device} ({info['name']}) ch={info[key]} gain={gain:+g} dB")
+                specs.append(spec)
+            self.mixer = Mixer(self, specs[0], specs[1], self.blocksize)
+        except Exception as e:
+            print("Mixer setup error:", e)
+            self.mixer = None
+            raise EngineError(f"Erreur mixage: {e}")
+
+        mixer = self.mixer
+        self.samplerate = mixer.samplerate
+        self.fmt = None  # the bus runs in float32
+        self.dsp.configure(mixer.bus_channels, mixer.samplerate, self.blocksize)
+        self._start_taps(mixer.bus_channels, mixer.samplerate)
+        try:
+            mixer.open(self.sd, self.latency)
+        except Exception as e:
+            print("Mixer streams failed:", e)
+            self.stop()
+            raise EngineError(f"Erreur ouverture streams: {e}")
+        self.mode = MIX
+        print(f"Mixer started: {len(mixer.sources)} sources -> {mixer.bus_channels}-channel bus "
+              f"-> {len(mixer.outputs)} outputs")
+        return self.mode
+
+    def stop(self):
+        if self.running:
+            print(f"Health: xruns={self.health.xruns()}")
+            if self.dsp.active:
+                print(f"DSP chain: {self.dsp.report()}")
+        self.stop_recording()
+        if self.ring is not None:
+            print("Fallback ring stats:", self.ring.stats())
+            print(f"Drift correction: {self.drift.ppm():+.1f} ppm")
+        if self.mixer is not None:
+            for st in self.mixer.stats():
+                print(f"Mix output {st['device']}: ring fill {st['fill']}/{st['capacity']}, "
+                      f"underruns {st['underruns']}, overruns {st['overruns']}, drift {st['drift_ppm']:+.1f} ppm")
+        with self.catalog.lock:
+            for s in (self.full_stream, self.in_stream, self.out_stream):
+                if s is not None:
+                    try:
+                        s.stop(); s.close()
+                    except Exception:
+                        pass
+            if self.mixer is not None:
+                self.mixer.close()
+        if self.analysis is not None:
+            self.analysis.stop()
+            print(format_clicks(self.clicks))
+        if self._switch_interval is not None:
+            sys.setswitchinterval(self._switch_interval)
+            self._switch_interval = None
+        self.mode = None
+        self.probe = None
+        self.full_stream = None
+        self.in_stream = None
+        self.out_stream = None
+        self.ring = None
+        self.src = None
+        self.drift = None
+        self.plan = None
+        self.mixer = None
+        self.fmt = None
+        self._raw_out = None
+        self.meter = None
+        self.loudness = None
+        self.spectrum = None
+        self.analysis = None
+        self.samplerate = None
+
+
+def _bar(level, width=30):
+    n = int(round(max(0.0, min(level, 1.0)) * width))
+    return "#" * n + "." * (width - n)
+
+
+def _mix_item(text):
+    # "ID" or "ID:gain dB" for --mix-input / --mix-output
+    device, _, gain = text.partition(":")
+    return (int(device), float(gain)) if gain else int(device)
+
+
+def main(argv=None):
+    from tuning import PROFILES, DEFAULT_PROFILE, apply_stored  # tuning imports this module
+    parser = argparse.ArgumentParser(description="Headless audio monitor: prints input levels.")
+    parser.add_argument("-l", "--list", action="store_true", help="list devices and exit")
+    parser.add_argument("-i", "--input", type=int, help="input device index")
+    parser.add_argument("-o", "--output", type=int, help="output device index (omit for monitor only)")
+    parser.add_argument("-v", "--volume", type=float, default=100.0, help="output volume in %% (0-200)")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between level lines")
+    parser.add_argument("--fps", type=float, default=METER_FPS, help="meter polling rate (slower while the levels are steady)")
+    parser.add_argument("-b", "--blocksize", type=int, help="block size (default: tuned value for --profile)")
+    parser.add_argument("-p", "--profile", choices=tuple(PROFILES), default=DEFAULT_PROFILE,
+                        help="tuning profile (block size and latency)")
+    parser.add_argument("-r", "--routes", help='routing "in:out[:gain],...", 0-based (default: 1:1, mono to all)')
+    parser.add_argument("--format", choices=(FLOAT, sampleformat.AUTO) + tuple(sampleformat.FORMATS),
+                        default=FLOAT, help="stream sample format; integer formats open raw streams "
+                                            "(no float conversion, passthrough at 100%% volume)")
+    parser.add_argument("--ballistics", choices=METER_MODES, default=DEFAULT_METER_MODE,
+                        help="level needle ballistics: VU or PPM type I / II")
+    parser.add_argument("--loudness", action="store_true", help="add EBU R128 loudness and true peak to each line")
+    parser.add_argument("--clicks", action="store_true", help="add the click / pop / dropout counts to each line")
+    parser.add_argument("--clicks-log", help="write the detected clicks to this CSV (or .json) file on exit")
+    parser.add_argument("--riaa", action="store_true", help="RIAA de-emphasis on the output (flat phono preamp)")
+    parser.add_argument("--rumble", type=float, nargs="?", const=RUMBLE_HZ,
+                        help=f"rumble high-pass on the output, corner in Hz (default {RUMBLE_HZ:g})")
+    parser.add_argument("--width", type=float, help="output stereo width in %% (0 = mono, 100 = unchanged, 200 max)")
+    parser.add_argument("--record", help="record the input to this file")
+    parser.add_argument("--record-format", choices=("wav", "rf64", "flac"), default="wav",
+                        help="32-bit float WAV (RF64 past 4 GiB), forced RF64, or 24-bit FLAC (needs flac)")
+    parser.add_argument("--feed-tcp", type=int, metavar="PORT", help="stream the meters to TCP clients on this port")
+    parser.add_argument("--feed-ws", type=int, metavar="PORT", help="same, to WebSocket clients")
+    parser.add_argument("--feed-udp", type=int, metavar="PORT", help="same, to UDP subscribers")
+    parser.add_argument("--feed-host", default=FEED_HOST, help="address the feed listens on (0.0.0.0: whole network)")
+    parser.add_argument("--feed-rate", type=float, default=FEED_RATE, help="feed frames per second")
+    parser.add_argument("--feed-batch", type=int, default=1, help="frames per feed message")
+    parser.add_argument("--mix-input", type=_mix_item, action="append", default=[], metavar="ID[:dB]",
+                        help="mix another input device into the bus (repeatable)")
+    parser.add_argument("--mix-output", type=_mix_item, action="append", default=[], metavar="ID[:dB]",
+                        help="also play the bus on this output device (repeatable)")
+    parser.add_argument("--export", help="write health metrics to this file periodically")
+    parser.add_argument("--export-format", choices=("prom", "json"), default="prom")
+    parser.add_argument("--export-interval", type=float, default=10.0, help="seconds between exports")
+    args = parser.parse_args(argv)
+
+    engine = AudioEngine()
+    if args.list or args.input is None:
+        engine.print_devices()
+        return 0
+
+    if args.blocksize:
+        engine.blocksize = args.blocksize
+    else:
+        try:
+            apply_stored(engine, args.input, args.output, args.profile)
+        except EngineError as e:
+            print(e, file=sys.stderr)
+            return 1
+
+    engine.volume = max(0.0, min(args.volume, 200.0)) / 100.0
+    engine.routes = args.routes
+    engine.meter_mode = args.ballistics
+    engine.sample_format = args.format
+    if args.riaa:
+        engine.dsp["riaa"].set_enabled(True)
+    if args.rumble is not None:
+        engine.dsp["rumble"].freq = args.rumble
+        engine.dsp["rumble"].set_enabled(True)
+    if args.width is not None:
+        engine.dsp["width"].width = max(0.0, min(args.width, 200.0)) / 100.0
+        engine.dsp["width"].set_enabled(True)
+    try:
+        if args.mix_input or args.mix_output:
+            outputs = ([args.output] if args.output is not None else []) + args.mix_output
+            mode = engine.start_mix([args.input] + args.mix_input, outputs)
+        else:
+            mode = engine.start(args.input, args.output)
+    except EngineError as e:
+        print(e, file=sys.stderr)
+        return 1
+    print(f"Engine running ({mode}), Ctrl+C to stop.")
+    print("Reported latency: " + ", ".join(f"{name} {x * 1000:.1f} ms" for name, x in
+                                          zip(("input", "output"), engine.reported_latency()) if x is not None))
+    if args.record:
+        try:
+            engine.start_recording(args.record, args.record_format)
+        except EngineError as e:
+            print(e, file=sys.stderr)
+            engine.stop()
+            return 1
+    if args.feed_tcp is not None or args.feed_ws is not None or args.feed_udp is not None:
+        try:
+            engine.start_feed(host=args.feed_host, tcp=args.feed_tcp, ws=args.feed_ws, udp=args.feed_udp,
+                              rate=args.feed_rate, batch=args.feed_batch)
+        except OSError as e:
+            print("Level feed failed:", e, file=sys.stderr)
+            engine.stop()
+            return 1
+    exporter = None
+    if args.export:
+        exporter = HealthExporter(engine, args.export, args.export_format, args.export_interval)
+        exporter.start()
+
+    # keep the highest level seen between two printed lines
+    peak_l = peak_r = 0.0
+    next_print = time.monotonic() + args.interval
+    engine.pacer.fps = args.fps
+    engine.pacer.idle_fps = min(engine.pacer.idle_fps, args.fps)
+    try:
+        while True:
+            time.sleep(engine.meter_interval() / 1000)
+            levels = engine.read_levels()
+            if levels is not None:
+                peak_l, peak_r = max(peak_l, levels[0]), max(peak_r, levels[1])
+            if time.monotonic() >= next_print:
+                print(f"L {_bar(peak_l)} {peak_l:5.2f}   R {_bar(peak_r)} {peak_r:5.2f}"
+                      f"   DSP {engine.health.dsp_load():4.0%}  xruns {engine.health.xruns()}"
+                      + ("   CLIP" if engine.meter.clipped.any() else "")
+                      + (f"   {format_loudness(engine.read_loudness())}" if args.loudness else "")
+                      + (f"   {format_clicks(engine.clicks)}" if args.clicks else ""), flush=True)
+                peak_l = peak_r = 0.0
+                next_print += args.interval
+    except KeyboardInterrupt:
+        pass
+    finally:
+        try:
+            if exporter is not None:
+                exporter.stop()
+        finally:
+            engine.stop_feed()
+            engine.stop()
+        if args.clicks_log:
+            try:
+                print(f"{engine.export_clicks(args.clicks_log)} events written to {args.clicks_log}")
+            except EngineError as e:
+                print(e, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
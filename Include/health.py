@@ -0,0 +1,224 @@
+# health.py
+# Realtime health counters for the audio callbacks.
+#
+# Each callback owns one CallbackHealth and is its only writer: status flags
+# and timings land in preallocated NumPy arrays, no lock, no print(), no
+# allocation. Readers (GUI, CLI, exporter) take snapshots whenever they like;
+# a snapshot may be one callback stale, never torn in a harmful way.
+import os
+import json
+import time
+import threading
+import numpy as np
+
+FLAGS = ("input_underflow", "input_overflow", "output_underflow",
+         "output_overflow", "priming_output")
+XRUN_FLAGS = FLAGS[:4]  # priming_output is not a glitch
+ROLES = ("full", "in", "out", "monitor")
+
+# load histogram: callback time as a fraction of the block deadline,
+# LOAD_BIN wide bins from 0 to LOAD_BINS * LOAD_BIN, the last bin catches the rest
+LOAD_BIN = 0.02
+LOAD_BINS = 100
+
+# indices into CallbackHealth.totals
+CALLS, BUSY_NS, DEADLINE_NS, MAX_NS = range(4)
+
+
+class CallbackHealth:
+    def __init__(self, role):
+        self.role = role
+        self.samplerate = 0.0
+        self.flags = np.zeros(len(FLAGS), dtype=np.int64)
+        self.totals = np.zeros(4, dtype=np.int64)
+        self.histogram = np.zeros(LOAD_BINS, dtype=np.int64)
+        self._ns_per_frame = 0.0
+
+    def configure(self, samplerate):
+        self.samplerate = float(samplerate)
+        self._ns_per_frame = 1e9 / self.samplerate
+
+    def reset(self):
+        self.flags[:] = 0
+        self.totals[:] = 0
+        self.histogram[:] = 0
+
+    # ---- audio thread ----
+    def status(self, status):
+        # only called when status is truthy
+        flags = self.flags
+        if status.input_underflow:
+            flags[0] += 1
+        if status.input_overflow:
+            flags[1] += 1
+        if status.output_underflow:
+            flags[2] += 1
+        if status.output_overflow:
+            flags[3] += 1
+        if status.priming_output:
+            flags[4] += 1
+
+    def timing(self, elapsed_ns, frames):
+        deadline_ns = int(frames * self._ns_per_frame)
+        totals = self.totals
+        totals[CALLS] += 1
+        totals[BUSY_NS] += elapsed_ns
+        totals[DEADLINE_NS] += deadline_ns
+        if elapsed_ns > totals[MAX_NS]:
+            totals[MAX_NS] = elapsed_ns
+        if deadline_ns > 0:
+            self.histogram[min(int(elapsed_ns / deadline_ns / LOAD_BIN), LOAD_BINS - 1)] += 1
+
+    # ---- readers ----
+    def xruns(self):
+        return int(self.flags[:4].sum())
+
+    def load_percentile(self, q):
+        # upper edge of the bin holding the q-th percentile, as a load fraction
+        counts = self.histogram.copy()
+        total = counts.sum()
+        if total == 0:
+            return 0.0
+        i = int(np.searchsorted(np.cumsum(counts), q * total))
+        return (min(i, LOAD_BINS - 1) + 1) * LOAD_BIN
+
+    def snapshot(self):
+        totals = self.totals.copy()
+        return {
+            "flags": dict(zip(FLAGS, (int(v) for v in self.flags))),
+            "xruns": self.xruns(),
+            "calls": int(totals[CALLS]),
+            "busy_ns": int(totals[BUSY_NS]),
+            "deadline_ns": int(totals[DEADLINE_NS]),
+            "max_ns": int(totals[MAX_NS]),
+            "load_p50": self.load_percentile(0.5),
+            "load_p99": self.load_percentile(0.99),
+            "histogram": self.histogram.tolist(),
+        }
+
+
+class HealthMonitor:
+    """All callbacks of one engine, plus a recent DSP-load reading."""
+
+    def __init__(self):
+        self.callbacks = {role: CallbackHealth(role) for role in ROLES}
+        self._last = {}  # role -> (busy_ns, deadline_ns) at the previous dsp_load() call
+
+    def __getitem__(self, role):
+        return self.callbacks[role]
+
+    def add(self, role):
+        # extra callback (mixer devices), kept across resets
+        if role not in self.callbacks:
+            self.callbacks[role] = CallbackHealth(role)
+        return self.callbacks[role]
+
+    def reset(self):
+        # only while no stream is running
+        for cb in self.callbacks.values():
+            cb.reset()
+        self._last = {}
+
+    def xruns(self):
+        return sum(cb.xruns() for cb in self.callbacks.values())
+
+    def dsp_load(self):
+        """Worst callback load (time spent / block time) since the previous
+        call, 0..1+. Call from a single reader."""
+        worst = 0.0
+        for role, cb in self.callbacks.items():
+            busy, deadline = int(cb.totals[BUSY_NS]), int(cb.totals[DEADLINE_NS])
+            last_busy, last_deadline = self._last.get(role, (0, 0))
+            self._last[role] = (busy, deadline)
+            if deadline > last_deadline:
+                worst = max(worst, (busy - last_busy) / (deadline - last_deadline))
+        return worst
+
+    def snapshot(self):
+        return {
+            "timestamp": time.time(),
+            "xruns": self.xruns(),
+            "callbacks": {role: cb.snapshot() for role, cb in self.callbacks.items()
+                          if cb.totals[CALLS] > 0},
+        }
+
+
+def prometheus_text(snapshot, prefix="audio_monitor"):
+    lines = [
+        f"# HELP {prefix}_status_flags_total PortAudio status flags reported to the callback.",
+        f"# TYPE {prefix}_status_flags_total counter",
+    ]
+    cbs = snapshot["callbacks"]
+    for role, s in cbs.items():
+        for flag, v in s["flags"].items():
+            lines.append(f'{prefix}_status_flags_total{{callback="{role}",flag="{flag}"}} {v}')
+    lines += [f"# HELP {prefix}_callbacks_total Callbacks run.",
+              f"# TYPE {prefix}_callbacks_total counter"]
+    lines += [f'{prefix}_callbacks_total{{callback="{r}"}} {s["calls"]}' for r, s in cbs.items()]
+    lines += [f"# HELP {prefix}_callback_seconds_total Time spent inside the callback.",
+              f"# TYPE {prefix}_callback_seconds_total counter"]
+    lines += [f'{prefix}_callback_seconds_total{{callback="{r}"}} {s["busy_ns"] / 1e9:.9f}' for r, s in cbs.items()]
+    lines += [f"# HELP {prefix}_deadline_seconds_total Audio time covered by the callbacks.",
+              f"# TYPE {prefix}_deadline_seconds_total counter"]
+    lines += [f'{prefix}_deadline_seconds_total{{callback="{r}"}} {s["deadline_ns"] / 1e9:.9f}' for r, s in cbs.items()]
+    lines += [f"# HELP {prefix}_callback_max_seconds Slowest callback.",
+              f"# TYPE {prefix}_callback_max_seconds gauge"]
+    lines += [f'{prefix}_callback_max_seconds{{callback="{r}"}} {s["max_ns"] / 1e9:.9f}' for r, s in cbs.items()]
+    lines += [f"# HELP {prefix}_callback_load Callback time as a fraction of the block deadline.",
+              f"# TYPE {prefix}_callback_load histogram"]
+    for role, s in cbs.items():
+        cumulative = np.cumsum(s["histogram"])
+        for i, c in enumerate(cumulative[:-1]):
+            lines.append(f'{prefix}_callback_load_bucket{{callback="{role}",le="{(i + 1) * LOAD_BIN:.2f}"}} {c}')
+        lines.append(f'{prefix}_callback_load_bucket{{callback="{role}",le="+Inf"}} {s["calls"]}')
+        lines.append(f'{prefix}_callback_load_count{{callback="{role}"}} {s["calls"]}')
+        lines.append(f'{prefix}_callback_load_sum{{callback="{role}"}} '
+                     f'{(s["busy_ns"] / s["deadline_ns"] * s["calls"]) if s["deadline_ns"] else 0:.6f}')
+    return "\n".join(lines) + "\n"
+
+
+class HealthExporter:
+    """Background thread writing the engine's health to `path` every
+    `interval` seconds, as Prometheus text ('prom', for node_exporter's
+    textfile collector) or JSON ('json'). Writes are atomic (tmp + rename)."""
+
+    def __init__(self, engine, path, fmt="prom", interval=10.0):
+        if fmt not in ("prom", "json"):
+            raise ValueError(f"unknown export format: {fmt}")
+        self.engine = engine
+        self.path = path
+        self.fmt = fmt
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def write(self):
+        snap = self.engine.health.snapshot()
+        text = prometheus_text(snap) if self.fmt == "prom" else json.dumps(snap, indent=2)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(text)
+        os.replace(tmp, self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                print("Health export failed:", e)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        # last snapshot; like _run, a failed write is reported, not raised
+        try:
+            self.write()
+        except OSError as e:
+            print("Health export failed:", e)
@@ -0,0 +1,343 @@
+# latency.py
+# Round-trip latency measurement through the monitoring path. A loopback
+# cable (or the simulated one) connects an output to an input; the probe
+# takes the place of the monitored input in the engine callbacks, so the
+# test signal goes through exactly what the music goes through (routing,
+# volume, DSP, and in the fallback the ring and the resampler) and what
+# comes back on the inputs is recorded in the same callback.
+#
+# Each run plays one MLS burst (or an exponential sweep) after a short
+# silence; the capture is cross-correlated with the burst by FFT. The
+# correlation peak (interpolated between samples) gives the latency, the
+# peaks of the burst's pieces taken separately give the clock drift
+# between the two ends (MLS only: a log sweep turns a rate error into a
+# time shift, so it cannot tell them apart). N runs give the spread.
+#
+#     python latency.py -i 3 -o 5 --runs 10 [--mode both] [--signal sweep]
+#     python latency.py --sim --mode both        # simulated loopback
+import sys
+import json
+import math
+import time
+import argparse
+import numpy as np
+
+from engine import AudioEngine, EngineError, MONITOR_ONLY, FULL_DUPLEX, FALLBACK
+
+SIGNALS = ("mls", "sweep")
+DEFAULT_SIGNAL = "mls"
+RUNS = 5
+PROBE_LEVEL = 0.25       # burst amplitude (-12 dBFS)
+MLS_ORDER = 15           # 32767 samples, 0.68 s at 48 kHz
+SWEEP_SECONDS = 0.7
+SWEEP_BAND = (20.0, 20000.0)
+FADE_SECONDS = 0.01      # sweep fade in / out
+LEAD_SECONDS = 0.3       # silence before each burst: the previous one dies out
+WARMUP_SECONDS = 2.0     # more before the first: streams prime, the fallback's drift control settles
+MAX_LATENCY = 0.5        # seconds recorded after the burst
+SEGMENTS = 8             # burst pieces timed separately for the drift
+SEARCH = 64              # frames around the latency where a piece is looked for
+MIN_PEAK = 8.0           # correlation peak / median |correlation|: below, no loopback found
+RUN_TIMEOUT = 5.0        # a run that takes longer than this times its length failed
+# Fibonacci LFSR taps of a primitive polynomial per MLS order
+MLS_TAPS = {10: (10, 7), 11: (11, 9), 12: (12, 11, 10, 4), 13: (13, 12, 11, 8), 14: (14, 13, 12, 2),
+            15: (15, 14), 16: (16, 15, 13, 4), 17: (17, 14), 18: (18, 11)}
+
+
+def mls(order=MLS_ORDER):
+    # maximum length sequence of +-1, 2**order - 1 samples
+    taps = MLS_TAPS[order]
+    state = [1] * order
+    out = np.empty(2 ** order - 1, dtype=np.float32)
+    for i in range(out.size):
+        bit = 0
+        for t in taps:
+            bit ^= state[t - 1]
+        out[i] = state[-1]
+        state = [bit] + state[:-1]
+    return out * 2.0 - 1.0
+
+
+def log_sweep(seconds, samplerate, f1=SWEEP_BAND[0], f2=SWEEP_BAND[1]):
+    # exponential sine sweep with raised-cosine fades, f2 kept under Nyquist
+    f2 = min(f2, 0.45 * samplerate)
+    t = np.arange(int(seconds * samplerate)) / samplerate
+    k = math.log(f2 / f1)
+    sweep = np.sin(2 * math.pi * f1 * seconds / k * (np.exp(t * k / seconds) - 1.0))
+    fade = min(int(FADE_SECONDS * samplerate), t.size // 2)
+    ramp = 0.5 - 0.5 * np.cos(np.pi * np.arange(fade) / fade)
+    sweep[:fade] *= ramp
+    sweep[-fade:] *= ramp[::-1]
+    return sweep.astype(np.float32)
+
+
+def test_signal(kind, samplerate):
+    if kind == "mls":
+        return mls()
+    if kind == "sweep":
+        return log_sweep(SWEEP_SECONDS, samplerate)
+    raise ValueError(f"unknown test signal {kind!r} (expected one of {', '.join(SIGNALS)})")
+
+
+def correlate(capture, reference):
+    """Cross-correlation of every capture channel (frames x channels) with
+    `reference`, for lags 0 .. frames - 1 (channels x lags), by FFT."""
+    frames = capture.shape[0]
+    n = 1 << int(frames + reference.size - 1).bit_length()
+    spec = np.fft.rfft(capture, n, axis=0) * np.conj(np.fft.rfft(reference, n))[:, None]
+    return np.fft.irfft(spec, n, axis=0)[:frames].T
+
+
+def bandwidth(x):
+    # RMS (Gabor) bandwidth in cycles per sample: how sharply x can be timed
+    power = np.abs(np.fft.rfft(x)) ** 2
+    f = np.fft.rfftfreq(x.size)
+    return math.sqrt(float((f * f * power).sum() / max(power.sum(), 1e-30)))
+
+
+def _peak(mag):
+    # (fractional lag, integer lag) of the largest value, parabolic interpolation
+    i = int(np.argmax(mag))
+    if 0 < i < mag.size - 1:
+        a, b, c = mag[i - 1:i + 2]
+        den = a - 2 * b + c
+        if den != 0:
+            return i + 0.5 * (a - c) / den, i
+    return float(i), i
+
+
+def analyze(capture, reference, lead, samplerate, drift=True):
+    """Latency and drift of one run. `capture` (frames x channels) starts
+    with the run, the burst was played from frame `lead`. Returns a dict, or
+    None if no channel shows the burst. Drift in ppm, positive when the
+    latency grows during the burst (None if `drift` is False)."""
+    mag = np.abs(correlate(capture, reference))
+    ratio = mag.max(axis=1) / np.maximum(np.median(mag, axis=1), 1e-20)
+    ch = int(np.argmax(ratio))
+    if ratio[ch] < MIN_PEAK:
+        return None
+    lag, at = _peak(mag[ch])
+    lag -= lead
+    result = {"latency_frames": float(lag), "latency_ms": float(lag / samplerate * 1000.0),
+              "drift_ppm": None, "channel": ch, "peak_ratio": float(ratio[ch])}
+    if not drift:
+        return result
+    # drift: every piece of the burst found again near the overall latency;
+    # narrow-band pieces (the start of a sweep) time poorly and weigh less
+    piece = reference.size // SEGMENTS
+    starts, lags, weights = [], [], []
+    for k in range(SEGMENTS):
+        s = k * piece
+        lo = max(at + s - SEARCH, 0)
+        window = capture[lo:at + s + piece + SEARCH, ch:ch + 1]
+        if window.shape[0] < piece:
+            break
+        pl, _ = _peak(np.abs(correlate(window, reference[s:s + piece])[0]))
+        starts.append(s)
+        lags.append(lo + pl - s)
+        weights.append(bandwidth(reference[s:s + piece]))
+    if len(starts) >= 2:
+        result["drift_ppm"] = float(np.polyfit(starts, lags, 1, w=weights)[0] * 1e6)
+    return result
+
+
+def summarize(values):
+    v = np.asarray(values, dtype=np.float64)
+    return {"min": float(v.min()), "median": float(np.median(v)), "mean": float(v.mean()),
+            "max": float(v.max()), "std": float(v.std())}
+
+
+class LatencyProbe:
+    """Audio-thread side of one run: exchange() records the input block
+    and hands back the test signal in its place. Everything is allocated
+    up front; the capture is complete once `done`."""
+
+    def __init__(self, reference, channels, lead, tail, max_frames):
+        self.lead = lead
+        self.total = lead + reference.size + tail
+        self.played = np.zeros(self.total, dtype=np.float32)
+        self.played[lead:lead + reference.size] = reference * PROBE_LEVEL
+        self.capture = np.zeros((self.total, channels), dtype=np.float32)
+        self.out = np.zeros((max_frames, channels), dtype=np.float32)
+        self.pos = 0
+
+    @property
+    def done(self):
+        return self.pos >= self.total
+
+    def exchange(self, block):
+        n = block.shape[0]
+        pos = self.pos
+        if n > self.out.shape[0]:
+            self.out = np.zeros((n, self.out.shape[1]), dtype=np.float32)
+        out = self.out[:n]
+        got = max(0, min(n, self.total - pos))
+        self.capture[pos:pos + got] = block[:got]
+        out[:got] = self.played[pos:pos + got, None]
+        out[got:] = 0.0
+        self.pos = pos + n
+        return out
+
+
+class LatencyTest:
+    """Non-blocking measurement, like tuning.BlockSizeTuner: call start()
+    then poll() regularly until it returns the result dict. The engine is
+    (re)started on the device pair and stopped at the end."""
+
+    def __init__(self, engine, in_id, out_id, runs=RUNS, signal=DEFAULT_SIGNAL, fallback=False,
+                 clock=time.monotonic):
+        self.engine = engine
+        self.in_id = in_id
+        self.out_id = out_id
+        self.runs = runs
+        self.signal = signal
+        self.fallback = fallback
+        self.clock = clock
+        self.results = []  # per run: analyze() dict, or None when the burst was not found
+        self.result = None
+        self.mode = None
+        self.reference = None
+        self.probe = None
+
+    def start(self):
+        self.mode = self.engine.start(self.in_id, self.out_id, fallback=self.fallback)
+        if self.mode == MONITOR_ONLY:
+            self.engine.stop()
+            raise EngineError("Mesure de latence : une sortie est nécessaire.")
+        self.samplerate = self.engine.samplerate
+        self.reported = self.engine.reported_latency()
+        self.reference = test_signal(self.signal, self.samplerate)
+        self._next_run()
+
+    def _next_run(self):
+        sr = self.samplerate
+        lead = LEAD_SECONDS + (0.0 if self.results else WARMUP_SECONDS)
+        self.probe = LatencyProbe(self.reference, self.engine.meter.channels, int(lead * sr),
+                                  int(MAX_LATENCY * sr), self.engine.blocksize)
+        self.deadline = self.clock() + RUN_TIMEOUT * self.probe.total / sr
+        self.engine.probe = self.probe
+
+    def progress(self):
+        return len(self.results), self.runs
+
+    def poll(self):
+        if self.result is not None:
+            return self.result
+        probe = self.probe
+        if not probe.done:
+            if self.clock() < self.deadline:
+                return None
+            print("Latency: run timed out (stream stalled?)")
+            found = None
+        else:
+            found = analyze(probe.capture, self.reference, probe.lead, self.samplerate,
+                            drift=self.signal == "mls")
+        self.engine.probe = None
+        self.results.append(found)
+        if found is None:
+            print(f"Latency: run {len(self.results)}: burst not found (loopback connected? volume up?)")
+        else:
+            drift = found["drift_ppm"]
+            print(f"Latency: run {len(self.results)}: {found['latency_ms']:.2f} ms "
+                  f"({found['latency_frames']:.1f} frames, input {found['channel'] + 1})"
+                  + (f", drift {drift:+.1f} ppm" if drift is not None else ""))
+        if len(self.results) < self.runs:
+            self._next_run()
+            return None
+        self._finish()
+        return self.result
+
+    def _finish(self):
+        engine = self.engine
+        ok = [r for r in self.results if r is not None]
+        drifts = [r["drift_ppm"] for r in ok if r["drift_ppm"] is not None]
+        self.result = {
+            "mode": self.mode, "signal": self.signal, "samplerate": self.samplerate,
+            "blocksize": engine.blocksize, "latency_setting": engine.latency,
+            "reported_ms": [None if x is None else x * 1000.0 for x in self.reported],
+            "runs": self.results, "failed": len(self.results) - len(ok),
+            "latency_ms": summarize([r["latency_ms"] for r in ok]) if ok else None,
+            "drift_ppm": summarize(drifts) if drifts else None,
+        }
+        engine.stop()
+
+
+def format_reported(reported):
+    # the streams' own latency figures, (input, output) seconds
+    if reported is None:
+        return ""
+    parts = [f"{name} {x * 1000:.1f} ms" for name, x in zip(("entrée", "sortie"), reported) if x is not None]
+    return "Latence annoncée : " + ", ".join(parts)
+
+
+def format_result(result):
+    # one-line summary for a status bar
+    lat = result["latency_ms"]
+    if lat is None:
+        return f"Latence ({result['mode']}) : aucun retour détecté"
+    announced = " + ".join(f"{x:.1f}" for x in result["reported_ms"] if x is not None)
+    text = (f"Latence ({result['mode']}, bloc {result['blocksize']}) : médiane {lat['median']:.2f} ms "
+            f"[{lat['min']:.2f}–{lat['max']:.2f}, σ {lat['std']:.2f}], annoncée {announced} ms")
+    if result["drift_ppm"] is not None:
+        text += f", dérive {result['drift_ppm']['median']:+.1f} ppm"
+    return text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the round-trip latency of a device pair "
+                                                 "(connect an output to an input with a cable).")
+    parser.add_argument("-i", "--input", type=int, help="input device index")
+    parser.add_argument("-o", "--output", type=int, help="output device index")
+    parser.add_argument("-n", "--runs", type=int, default=RUNS, help="measurements per mode")
+    parser.add_argument("--signal", choices=SIGNALS, default=DEFAULT_SIGNAL, help="test signal")
+    parser.add_argument("--mode", choices=("auto", "fallback", "both"), default="auto",
+                        help="auto: the mode the monitor would pick; both: full-duplex then separate streams")
+    parser.add_argument("-b", "--blocksize", type=int, help="block size (default: the engine's)")
+    parser.add_argument("--latency", help="stream latency: low, high or seconds")
+    parser.add_argument("--sim", action="store_true", help="simulated loopback instead of a sound card")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args(argv)
+
+    backend = None
+    if args.sim:
+        from simbackend import SimulatedBackend
+        backend = SimulatedBackend(signal="loopback", speed=1.0)
+        in_id, out_id = 2, 2
+    elif args.input is None or args.output is None:
+        parser.error("-i and -o are required (or --sim)")
+    else:
+        in_id, out_id = args.input, args.output
+    engine = AudioEngine(backend=backend, analyzers=False)
+    if args.blocksize:
+        engine.blocksize = args.blocksize
+    if args.latency is not None:
+        try:
+            engine.latency = float(args.latency)
+        except ValueError:
+            engine.latency = args.latency
+
+    results = []
+    for fallback in {"auto": (False,), "fallback": (True,), "both": (False, True)}[args.mode]:
+        test = LatencyTest(engine, in_id, out_id, args.runs, args.signal, fallback)
+        try:
+            test.start()
+        except EngineError as e:
+            print(e, file=sys.stderr)
+            return 1
+        if args.mode == "both" and not fallback and test.mode != FULL_DUPLEX:
+            print("Full-duplex is not available on this pair, measuring separate streams only")
+        while test.poll() is None:
+            time.sleep(0.05)
+        r = test.result
+        results.append(r)
+        print(format_result(r))
+        if args.mode == "both" and test.mode == FALLBACK:
+            break
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0 if all(r["latency_ms"] is not None for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+# loudness.py
+# EBU R128 / ITU-R BS.1770 loudness and true-peak metering.
+#
+# Like LevelMeter, push() only copies the block into a ring on the audio
+# thread; process() runs elsewhere (the engine's analysis worker), K-weights
+# whatever arrived with a block biquad cascade and updates momentary (400 ms),
+# short-term (3 s) and integrated loudness, loudness range and the 4x
+# oversampled true peak. Gating uses histograms, so integrated loudness and
+# LRA cost the same after ten seconds or ten hours.
+import math
+import numpy as np
+
+from ringbuffer import RingBuffer
+from biquad import BlockIIR, k_weighting, CHUNK
+
+HOP_SECONDS = 0.1      # momentary / short-term update rate
+MOMENTARY_HOPS = 4     # 400 ms
+SHORT_TERM_HOPS = 30   # 3 s
+ABSOLUTE_GATE = -70.0  # LUFS
+RELATIVE_GATE = -10.0  # LU, integrated loudness
+LRA_GATE = -20.0       # LU, loudness range (EBU Tech 3342)
+HIST_STEP = 0.1        # LU per histogram bin, from ABSOLUTE_GATE up
+HIST_BINS = 1000       # -70 .. +30 LUFS
+
+PROCESS_FRAMES = 4096  # most frames handled per process() call (keeps GIL holds short)
+
+TP_FACTOR = 4   # true-peak oversampling
+TP_TAPS = 12    # taps per phase (48-tap interpolator, as in BS.1770 annex 2)
+
+SURROUND_51 = (1.0, 1.0, 1.0, 0.0, 1.41, 1.41)  # L R C LFE Ls Rs
+
+
+def lufs(mean_square):
+    return -0.691 + 10.0 * math.log10(mean_square) if mean_square > 0 else -math.inf
+
+
+def _bin(loudness):
+    return min(int((loudness - ABSOLUTE_GATE) / HIST_STEP), HIST_BINS - 1)
+
+
+def _gate_bin(count, energy, gate):
+    # first bin above the relative gate, from the blocks above the absolute gate
+    total = count.sum()
+    if total == 0:
+        return None
+    threshold = lufs(energy.sum() / total) + gate
+    return _bin(threshold) if threshold >= ABSOLUTE_GATE else 0
+
+
+# The gating works on (count, summed mean square) histograms of 400 ms / 3 s
+# blocks, so histograms of consecutive parts of a programme simply add up.
+def integrated_loudness(count, energy):
+    first = _gate_bin(count, energy, RELATIVE_GATE)
+    if first is None:
+        return -math.inf
+    total = count[first:].sum()
+    return lufs(energy[first:].sum() / total) if total else -math.inf
+
+
+def loudness_range(count, energy):
+    first = _gate_bin(count, energy, LRA_GATE)
+    if first is None:
+        return -math.inf
+    cdf = np.cumsum(count[first:])
+    if cdf[-1] == 0:
+        return -math.inf
+    lo = np.searchsorted(cdf, 0.10 * cdf[-1], side="right")
+    hi = np.searchsorted(cdf, 0.95 * cdf[-1], side="left")
+    return float(hi - lo) * HIST_STEP
+
+
+def format_loudness(r):
+    # one line for labels and the CLI, "--" while a value is not available yet
+    def f(v):
+        return f"{v:5.1f}" if v > -math.inf else "  -- "
+    return (f"M {f(r['momentary'])}  S {f(r['short_term'])}  I {f(r['integrated'])} LUFS"
+            f"  LRA {f(r['lra'])} LU  TP {f(r['true_peak'])} dBTP")
+
+
+class TruePeak:
+    """4x polyphase interpolator; one matmul per block gives every phase.
+    Works channel-major internally: NumPy's max is much faster along a
+    contiguous axis than across a handful of interleaved channels."""
+
+    def __init__(self, channels, max_frames, factor=TP_FACTOR, taps=TP_TAPS):
+        self.channels = int(channels)
+        self.taps = int(taps)
+        n = np.arange(factor * taps)
+        center = (factor * taps - 1) / 2.0
+        h = np.sinc((n - center) / factor) * np.kaiser(factor * taps, 6.0)
+        # phase p, tap k multiplies x[m - k]
+        h = h.reshape(taps, factor).T
+        self.h = (h / h.sum(axis=1, keepdims=True)).astype(np.float32)
+        self.max_frames = int(max_frames)
+        self.work = np.zeros((self.channels, self.taps - 1 + self.max_frames), dtype=np.float32)
+        self.stack = np.zeros((self.taps, self.channels, self.max_frames), dtype=np.float32)
+        self.up = np.zeros((factor, self.channels, self.max_frames), dtype=np.float32)
+        self.peak = np.zeros(self.channels, dtype=np.float32)
+
+    def process(self, block):
+        """Largest interpolated |sample| per channel in `block` (also kept in `peak`)."""
+        self.peak[:] = 0.0
+        hist = self.taps - 1
+        for start in range(0, block.shape[0], self.max_frames):
+            x = block[start:start + self.max_frames]
+            n = x.shape[0]
+            self.work[:, hist:hist + n] = x.T
+            stack = self.stack[:, :, :n]
+            for k in range(self.taps):
+                stack[k] = self.work[:, hist - k:hist - k + n]
+            up = self.up[:, :, :n]
+            np.matmul(self.h, stack.reshape(self.taps, -1), out=up.reshape(up.shape[0], -1))
+            np.abs(up, out=up)
+            np.maximum(self.peak, up.max(axis=2).max(axis=0), out=self.peak)
+            self.work[:, :hist] = self.work[:, n:n + hist]
+        return self.peak
+
+
+class LoudnessMeter:
+    def __init__(self, channels, samplerate, weights=None):
+        self.channels = int(channels)
+        self.samplerate = float(samplerate)
+        if weights is None:
+            weights = SURROUND_51 if self.channels == 6 else (1.0,) * self.channels
+        self.weights = np.asarray(weights, dtype=np.float64)
+        # a second of audio: the worker drains it many times per second
+        capacity = max(int(samplerate), 8192)
+        self.ring = RingBuffer(capacity, self.channels)
+        self.scratch = np.zeros((PROCESS_FRAMES, self.channels), dtype=np.float32)
+        self.filtered = np.zeros((PROCESS_FRAMES, self.channels))
+        self.kfilter = BlockIIR(k_weighting(samplerate), self.channels)
+        self.true_peak = TruePeak(self.channels, PROCESS_FRAMES)
+        self.hop = int(round(samplerate * HOP_SECONDS))
+        self.reset()
+
+    def reset(self):
+        self.kfilter.reset()
+        self._acc = 0.0        # weighted energy of the hop being filled
+        self._acc_n = 0
+        self.hops = np.zeros(SHORT_TERM_HOPS)  # mean square of the last hops, ring
+        self.hop_count = 0
+        # gating histograms: block count and summed mean square per 0.1 LU bin
+        self.m_count = np.zeros(HIST_BINS, dtype=np.int64)
+        self.m_energy = np.zeros(HIST_BINS)
+        self.s_count = np.zeros(HIST_BINS, dtype=np.int64)
+        self.s_energy = np.zeros(HIST_BINS)
+        self.peak = 0.0
+        self.frames = 0  # consumed since reset()
+        # offline analysis sets a list here to get (end frame, readings) per hop
+        self.history = None
+        # replaced as a whole, readers on other threads never see half an update
+        self.readings = {"momentary": -math.inf, "short_term": -math.inf, "integrated": -math.inf,
+                         "lra": -math.inf, "true_peak": -math.inf}
+
+    def restart_gating(self):
+        """Forget the gating histograms, peak and history but keep the filter
+        state and the last hops, e.g. after a pre-roll before a file segment."""
+        for h in (self.m_count, self.m_energy, self.s_count, self.s_energy):
+            h[:] = 0
+        self.peak = 0.0
+        if self.history is not None:
+            self.history = []
+
+    # ---- audio thread ----
+    def push(self, block):
+        self.ring.write(block)
+
+    # ---- analysis thread ----
+    def process(self):
+        """Consume up to PROCESS_FRAMES frames (whole filter chunks) from the
+        ring. Returns the frame count, call again while it is not 0."""
+        n = min(self.ring.fill, PROCESS_FRAMES) // CHUNK * CHUNK
+        if n == 0:
+            return 0
+        block = self.scratch[:n]
+        self.ring.read_into(block)
+        self._consume(block)
+        return n
+
+    def feed(self, block):
+        """Offline use: measure `block` directly, without the ring. Frames past
+        the last whole filter chunk are ignored; feed multiples of CHUNK."""
+        end = block.shape[0] // CHUNK * CHUNK
+        for start in range(0, end, PROCESS_FRAMES):
+            self._consume(block[start:min(start + PROCESS_FRAMES, end)])
+
+    def _consume(self, block):
+        n = block.shape[0]
+        self.peak = max(self.peak, float(self.true_peak.process(block).max()))
+
+        z = self.kfilter.process(block, self.filtered[:n])
+        np.square(z, out=z)
+        energy = z @ self.weights  # channel-weighted, per frame
+        pos = 0
+        while pos < n:
+            take = min(self.hop - self._acc_n, n - pos)
+            self._acc += float(energy[pos:pos + take].sum())
+            self._acc_n += take
+            pos += take
+            self.frames += take
+            if self._acc_n == self.hop:
+                self._hop_done(self._acc / self.hop)
+                self._acc = 0.0
+                self._acc_n = 0
+
+    def _hop_done(self, mean_square):
+        self.hops[self.hop_count % SHORT_TERM_HOPS] = mean_square
+        self.hop_count += 1
+        r = dict(self.readings)
+        if self.hop_count >= MOMENTARY_HOPS:
+            idx = (self.hop_count - 1 - np.arange(MOMENTARY_HOPS)) % SHORT_TERM_HOPS
+            ms = float(self.hops[idx].mean())
+            r["momentary"] = lufs(ms)
+            if r["momentary"] >= ABSOLUTE_GATE:
+                b = _bin(r["momentary"])
+                self.m_count[b] += 1
+                self.m_energy[b] += ms
+            r["integrated"] = integrated_loudness(self.m_count, self.m_energy)
+        if self.hop_count >= SHORT_TERM_HOPS:
+            ms = float(self.hops.mean())
+            r["short_term"] = lufs(ms)
+            if r["short_term"] >= ABSOLUTE_GATE:
+                b = _bin(r["short_term"])
+                self.s_count[b] += 1
+                self.s_energy[b] += ms
+            r["lra"] = loudness_range(self.s_count, self.s_energy)
+        r["true_peak"] = 20.0 * math.log10(self.peak) if self.peak > 0 else -math.inf
+        self.readings = r
+        if self.history is not None:
+            self.history.append((self.frames, r))
@@ -0,0 +1,173 @@
+# metering.py
+# Level metering split in two halves:
+#  - push() runs in the audio callback and only copies samples into a
+#    preallocated lock-free ring (no reductions, no Qt events);
+#  - drain() runs on the GUI frame clock, empties the ring, computes every
+#    channel's RMS / peak in one vectorized pass and runs the samples through
+#    the needle ballistics (ballistics.py); widgets only display the result.
+# Silent blocks are not integrated once the needles are at rest, and
+# `moving` tells the displays whether anything changed on screen, so they
+# can poll at IDLE_FPS (MeterPacer) until the signal comes back.
+import math
+import numpy as np
+
+from ringbuffer import RingBuffer
+from ballistics import Ballistics, DEFAULT_MODE
+from sampleformat import FORMATS, to_float
+
+METER_FPS = 30      # default GUI refresh rate of the meters
+IDLE_FPS = 10       # meter polling while nothing moves or the window is hidden
+LEVEL_SCALE = 10.0  # historical needle calibration: level = rms * 10
+SILENCE = 10 ** (-90 / 20)  # peak below -90 dBFS: nothing to show
+STEADY = 0.002      # needle / bar change under a pixel on any meter
+SETTLE_FRAMES = 15  # frames without movement before slowing down
+
+
+def block_levels(blocks, rms, peak):
+    """RMS and peak of every channel of `blocks` (..., frames, channels) into
+    `rms` / `peak` (..., channels): one reduction per array, no channel loop.
+    Shared by the live meter and the offline analysis."""
+    n = blocks.shape[-2]
+    np.sqrt(np.einsum('...ij,...ij->...j', blocks, blocks) / n, out=rms)
+    # max along a contiguous axis: far faster than across interleaved channels
+    mag = np.ascontiguousarray(np.swapaxes(np.abs(blocks), -1, -2))
+    np.max(mag, axis=-1, out=peak)
+
+
+class LevelMeter:
+    def __init__(self, channels, samplerate, fps=METER_FPS, mode=DEFAULT_MODE, fmt=None):
+        """`fmt`: integer format of the pushed blocks (sampleformat.FORMATS),
+        None for float32. Integer frames are queued as they are and only
+        converted by drain(), off the audio thread."""
+        self.channels = int(channels)
+        self.fmt = fmt
+        # room for a few frames' worth of audio at the idle rate, so neither
+        # a late GUI tick nor the slow polling loses anything
+        capacity = max(int(3 * samplerate / min(fps, IDLE_FPS)), 4096)
+        self.ring = RingBuffer(capacity, self.channels, FORMATS[fmt][0] if fmt else np.float32)
+        self.scratch = np.zeros((capacity, self.channels), dtype=np.float32)
+        self.raw = np.zeros((capacity, self.channels), dtype=self.ring.buffer.dtype) if fmt else None
+        self.rms = np.zeros(self.channels, dtype=np.float32)
+        self.peak = np.zeros(self.channels, dtype=np.float32)
+        self.levels = np.zeros(self.channels, dtype=np.float32)
+        self.holds = np.zeros(self.channels, dtype=np.float32)
+        self.samplerate = samplerate
+        self.ballistics = Ballistics(self.channels, samplerate, capacity, mode)
+        self.moving = False  # the last drain() changed something visible
+        self.silent = False  # the last drain() was skipped: silence on needles at rest
+        self._shown = np.zeros((2, self.channels))  # levels / holds at the last movement
+        self._clips = 0
+
+    # ---- audio thread ----
+    def push(self, block):
+        self.ring.write(block)
+
+    # ---- GUI thread ----
+    def drain(self):
+        """Consume everything published since the last call and refresh
+        `rms` / `peak` and the ballistics. Returns the number of frames
+        consumed (0 = no new data, levels left untouched)."""
+        n = self.ring.fill
+        self.moving = False
+        if n == 0:
+            return 0
+        block = self.scratch[:n]
+        if self.fmt:
+            raw = self.raw[:n]
+            self.ring.read_into(raw)
+            to_float(raw, block, self.fmt)
+        else:
+            self.ring.read_into(block)
+        block_levels(block, self.rms, self.peak)
+        b = self.ballistics
+        self.silent = bool(self.peak.max() < SILENCE) and b.at_rest(SILENCE)
+        if not self.silent:
+            # (silence on needles already at zero: nothing to integrate)
+            b.process(block)
+            shown = self._shown.copy()
+            np.minimum(b.level * LEVEL_SCALE, 1.0, out=shown[0])
+            np.minimum(b.held() * (LEVEL_SCALE / math.sqrt(2)), 1.0, out=shown[1])
+            if np.abs(shown - self._shown).max() > STEADY:
+                self._shown = shown
+                self.moving = True
+        clips = int(b.clips.sum())
+        if clips != self._clips:  # a clip light went on or was reset
+            self._clips = clips
+            self.moving = True
+        return n
+
+    def stereo_levels(self, gain=1.0):
+        # needle positions (0..1) for a two-needle meter, mono is duplicated
+        level = self.ballistics.level
+        l = float(level[0])
+        r = float(level[1]) if self.channels >= 2 else l
+        return (min(l * LEVEL_SCALE, 1.0) * gain,
+                min(r * LEVEL_SCALE, 1.0) * gain)
+
+    def channel_levels(self, gain=1.0):
+        # every channel's bar position (0..1), same calibration as the needles
+        np.multiply(self.ballistics.level, LEVEL_SCALE, out=self.levels)
+        np.minimum(self.levels, 1.0, out=self.levels)
+        self.levels *= gain
+        return self.levels
+
+    def hold_levels(self, gain=1.0):
+        # held sample peaks on the needle scale: a steady sine holds at its own level
+        np.multiply(self.ballistics.held(), LEVEL_SCALE / math.sqrt(2), out=self.holds)
+        np.minimum(self.holds, 1.0, out=self.holds)
+        self.holds *= gain
+        return self.holds
+
+    def snapshot(self, gain=1.0):
+        """Copies of (levels, holds, peaks, clipped) as of the last drain(),
+        for readers on other threads: the consumer's buffers are not touched."""
+        b = self.ballistics
+        levels = np.minimum(b.level * LEVEL_SCALE, 1.0).astype(np.float32) * gain
+        holds = np.minimum(b.held() * (LEVEL_SCALE / math.sqrt(2)), 1.0).astype(np.float32) * gain
+        return levels, holds, self.peak.copy(), b.clipped.copy()
+
+    def set_mode(self, mode):
+        # new needle ballistics, starting from rest (GUI thread, like drain())
+        self.ballistics = Ballistics(self.channels, self.samplerate, self.scratch.shape[0], mode)
+        self._shown[:] = 0.0
+        self._clips = 0
+
+    @property
+    def clipped(self):
+        # per channel, latched until reset_clip()
+        return self.ballistics.clipped
+
+    def reset_clip(self):
+        self.ballistics.reset_clip()
+
+
+class MeterPacer:
+    """Polling rate of a meter display: `fps` while something moves on
+    screen, `idle_fps` once nothing has moved for `settle` frames or while
+    the display is hidden. The first moving frame restores the full rate."""
+
+    def __init__(self, fps=METER_FPS, idle_fps=IDLE_FPS, settle=SETTLE_FRAMES):
+        self.fps = fps
+        self.idle_fps = idle_fps
+        self.settle = settle
+        self.quiet = 0  # frames since the last movement
+
+    def reset(self):
+        self.quiet = 0
+
+    @property
+    def idle(self):
+        return self.quiet >= self.settle
+
+    def update(self, moving, visible=True):
+        # rate for the next frame
+        if not visible:
+            self.quiet = self.settle
+        elif moving:
+            self.quiet = 0
+        elif self.quiet < self.settle:
+            self.quiet += 1
+        return self.idle_fps if self.idle else self.fps
+
+    def interval_ms(self, moving, visible=True):
+        return int(1000 / self.update(moving, visible))
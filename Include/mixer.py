@@ -0,0 +1,217 @@
+# mixer.py
+# Mixer bus: several input devices summed into one bus, the bus sent to
+# several output devices (two turntables into one monitor, one source to
+# headphones and speakers...). Every device runs its own stream:
+#
+#  - the first source is the bus clock: its callback mixes one bus block
+#    per input block, in one pass (every source mapped onto the bus
+#    channels into its row of a preallocated stack, then a single matmul
+#    by the source gains), runs the engine taps and the DSP chain on the
+#    bus and queues it for every output;
+#  - the other sources only queue their input in a ring, resampled to the
+#    bus clock on the way out (their own rate, their own drift);
+#  - each output pulls from its own ring at its own clock, with its own
+#    resampler and drift controller, like the separate-stream fallback.
+#
+# One source and one output is the engine's fallback path again.
+from time import perf_counter_ns
+import numpy as np
+
+from ringbuffer import RingBuffer
+from routing import RoutingPlan
+from resampler import Resampler, DriftController
+
+RING_BLOCKS = 4  # ring capacity per source / output, in blocks (bounds the added latency)
+
+
+def _db_gain(db):
+    return 10.0 ** (db / 20.0)
+
+
+class MixSource:
+    def __init__(self, device, channels, samplerate, bus_channels, bus_rate, blocksize, gain_db=0.0,
+                 clock=False):
+        self.device = device
+        self.channels = int(channels)
+        self.samplerate = samplerate
+        self.gain_db = gain_db
+        self.stream = None
+        self.health = None
+        # onto the bus channels (mono feeds every bus channel)
+        self.plan = RoutingPlan(self.channels, bus_channels, blocksize)
+        if clock:
+            # the bus clock itself: mixed straight from its callback, no ring
+            self.ring = self.src = self.drift = None
+            return
+        ratio = samplerate / bus_rate
+        capacity = int(RING_BLOCKS * blocksize * max(1.0, ratio))
+        self.ring = RingBuffer(capacity, self.channels)
+        self.src = Resampler(self.channels, ratio, blocksize)
+        self.drift = DriftController(ratio, capacity // 2, capacity)
+
+
+class MixOutput:
+    def __init__(self, device, channels, samplerate, bus_channels, bus_rate, blocksize, gain_db=0.0):
+        self.device = device
+        self.channels = int(channels)
+        self.samplerate = samplerate
+        self.gain_db = gain_db
+        self.gain = _db_gain(gain_db)
+        self.stream = None
+        self.health = None
+        self.plan = RoutingPlan(bus_channels, self.channels, blocksize)
+        ratio = bus_rate / samplerate
+        capacity = int(RING_BLOCKS * blocksize * max(1.0, ratio))
+        self.ring = RingBuffer(capacity, bus_channels)
+        self.src = Resampler(bus_channels, ratio, blocksize)
+        self.drift = DriftController(ratio, capacity // 2, capacity)
+
+
+class Mixer:
+    def __init__(self, engine, sources, outputs, blocksize):
+        """`sources` / `outputs`: [(device, channels, samplerate, gain dB)],
+        the first source clocks the bus. Streams are opened by open()."""
+        if not sources or not outputs:
+            raise ValueError("the mixer needs at least one source and one output")
+        self.engine = engine
+        self.blocksize = blocksize
+        self.bus_channels = max(ch for _, ch, _, _ in sources)
+        self.samplerate = sources[0][2]
+        args = (self.bus_channels, self.samplerate, blocksize)
+        self.sources = [MixSource(d, ch, sr, *args, gain_db=g, clock=k == 0)
+                        for k, (d, ch, sr, g) in enumerate(sources)]
+        self.outputs = [MixOutput(d, ch, sr, *args, gain_db=g) for d, ch, sr, g in outputs]
+        for k, s in enumerate(self.sources):
+            s.health = engine.health.add("in" if k == 0 else f"in{k + 1}")
+            s.health.configure(s.samplerate)
+        for k, o in enumerate(self.outputs):
+            o.health = engine.health.add("out" if k == 0 else f"out{k + 1}")
+            o.health.configure(o.samplerate)
+        # every source's block on the bus channels, one flat row per source
+        # so the rows of a shorter block stay contiguous views
+        self.stack = np.zeros((len(self.sources), blocksize * self.bus_channels), dtype=np.float32)
+        self.bus = np.zeros(blocksize * self.bus_channels, dtype=np.float32)
+        self._gains = np.zeros(len(self.sources), dtype=np.float32)
+        self._set_gains()
+
+    # ---- control (any thread) ----
+    def _set_gains(self):
+        # replaced as a whole: the bus pass sees the old or the new vector
+        gains = np.array([_db_gain(s.gain_db) for s in self.sources], dtype=np.float32)
+        self._gains = gains
+
+    def set_source_gain(self, index, db):
+        self.sources[index].gain_db = db
+        self._set_gains()
+
+    def set_output_gain(self, index, db):
+        o = self.outputs[index]
+        o.gain_db = db
+        o.gain = _db_gain(db)
+
+    def stats(self):
+        # per output: ring fill / overruns / underruns and drift correction
+        return [dict(o.ring.stats(), device=o.device, drift_ppm=o.drift.ppm()) for o in self.outputs]
+
+    @property
+    def streams(self):
+        return [x.stream for x in self.sources + self.outputs if x.stream is not None]
+
+    def open(self, sd, latency):
+        # outputs first (silent until their ring primes), the bus clock last
+        for o in self.outputs:
+            o.stream = sd.OutputStream(device=o.device, channels=o.channels, samplerate=o.samplerate,
+                                       blocksize=self.blocksize, latency=latency, dtype='float32',
+                                       callback=lambda outdata, frames, time, status, o=o:
+                                       self._out_callback(o, outdata, frames, status))
+        for k, s in enumerate(self.sources):
+            callback = self._bus_callback if k == 0 else (
+                lambda indata, frames, time, status, s=s: self._source_callback(s, indata, frames, status))
+            s.stream = sd.InputStream(device=s.device, channels=s.channels, samplerate=s.samplerate,
+                                      blocksize=self.blocksize, latency=latency, dtype='float32',
+                                      callback=callback)
+        for x in self.outputs + self.sources[1:] + self.sources[:1]:
+            x.stream.start()
+
+    def close(self):
+        for s in self.streams:
+            try:
+                s.stop(); s.close()
+            except Exception:
+                pass
+        for x in self.sources + self.outputs:
+            x.stream = None
+
+    # ---- audio threads ----
+    def _source_callback(self, source, indata, frames, status):
+        t0 = perf_counter_ns()
+        if status:
+            source.health.status(status)
+        try:
+            source.ring.write(indata)
+        finally:
+            source.health.timing(perf_counter_ns() - t0, frames)
+
+    def _bus_callback(self, indata, frames, time, status):
+        t0 = perf_counter_ns()
+        master = self.sources[0]
+        health = master.health
+        if status:
+            health.status(status)
+        try:
+            ch = self.bus_channels
+            if frames > self.blocksize:
+                self._grow(frames)
+            stack = self.stack[:, :frames * ch]
+            master.plan.apply(indata, stack[0].reshape(frames, ch), 1.0)
+            for k in range(1, len(self.sources)):
+                s = self.sources[k]
+                row = stack[k].reshape(frames, ch)
+                # resampled to the bus clock, silence while its ring primes
+                step = s.drift.update(s.ring.fill)
+                if step is None:
+                    row.fill(0)
+                    continue
+                block = s.plan.block(frames)
+                s.src.process(s.ring, block, step)
+                s.plan.apply(block, row, 1.0)
+            # the whole bus in one product: gains (sources) @ stack (sources x samples)
+            flat = self.bus[:frames * ch]
+            np.matmul(self._gains, stack, out=flat)
+            bus = flat.reshape(frames, ch)
+
+            engine = self.engine
+            engine.meter.push(bus)
+            if engine.analysis is not None:
+                engine.loudness.push(bus)
+                engine.spectrum.push(bus)
+                engine.clicks.push(bus)
+            recorder = engine.recorder
+            if recorder is not None:
+                recorder.push(bus)
+            engine.dsp.process(bus)
+            for o in self.outputs:
+                o.ring.write(bus)
+        finally:
+            health.timing(perf_counter_ns() - t0, frames)
+
+    def _out_callback(self, output, outdata, frames, status):
+        t0 = perf_counter_ns()
+        if status:
+            output.health.status(status)
+        try:
+            step = output.drift.update(output.ring.fill)
+            if step is None:
+                outdata.fill(0)
+                return
+            block = output.plan.block(frames)
+            output.src.process(output.ring, block, step)
+            output.plan.apply(block, outdata, self.engine.volume * output.gain)
+        finally:
+            output.health.timing(perf_counter_ns() - t0, frames)
+
+    def _grow(self, frames):
+        # the host changed the block size: rare, allocate once more
+        self.blocksize = frames
+        self.stack = np.zeros((len(self.sources), frames * self.bus_channels), dtype=np.float32)
+        self.bus = np.zeros(frames * self.bus_channels, dtype=np.float32)
@@ -0,0 +1,532 @@
+# monitorwindow.py
+# The monitor window both front ends are built on: device lists (with the
+# optional second input / output of the mixer bus), volume, playback
+# processing, ballistics, meters, start / stop, recording, rack view,
+# tuning profile and latency test, routing, monitor only, loudness, health
+# and click lines. main.py and debug.py only pick a title and size;
+# debug.py also turns on the spectrum view (SPECTRUM), a diagnostic tool
+# that costs an FFT thread and a tall widget.
+import os
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QLabel, QSlider, QComboBox, QHBoxLayout, QPushButton,
+    QCheckBox, QSpinBox, QLineEdit, QSizePolicy
+)
+from PyQt6.QtCore import Qt, QTimer
+
+from catalog import device_key
+from engine import AudioEngine, EngineError, FULL_DUPLEX, FALLBACK, MONITOR_ONLY, MIX, METER_MODES
+from metering import METER_FPS
+from loudness import format_loudness
+from recorder import default_record_path
+from clicks import format_clicks, default_clicks_path
+from vumeter import StereoVuMeter, MeterBank
+from tuning import PROFILES, DEFAULT_PROFILE, BlockSizeTuner, apply_stored
+from latency import LatencyTest, format_result, format_reported
+
+DEVICE_POLL_MS = 250  # how often the device lists look for a new catalogue
+DEVICE_IDLE_MS = 1000  # the same once the first list is shown
+HEALTH_MS = 500       # health line refresh
+HEALTH_IDLE_MS = 2000  # the same while the meters are idle
+
+STATUS_TEXT = {
+    FULL_DUPLEX: "Full-duplex stream actif.",
+    FALLBACK: "Streams séparés actifs (fallback).",
+    MONITOR_ONLY: "Input stream actif (monitor only).",
+    MIX: "Mixage actif (un stream par périphérique).",
+}
+METER_MODE_TEXT = {"vu": "VU (300 ms)", "ppm1": "PPM type I (DIN)", "ppm2": "PPM type II (BBC)"}
+NO_DEVICE = "—"  # second input / output not used
+
+
+class MonitorWindow(QWidget):
+    TITLE = "Audio monitor app"
+    SIZE = (480, 420)
+    SPECTRUM = False  # spectrum + waterfall of the input
+
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle(self.TITLE)
+        self.resize(*self.SIZE)
+
+        layout = QVBoxLayout()
+
+        # liste des périphériques (on affiche index: name pour éviter les collisions)
+        self.engine = AudioEngine()
+
+        hl = QHBoxLayout()
+        hl.addWidget(QLabel("Entrée :"))
+        self.input_box = QComboBox()
+        hl.addWidget(self.input_box)
+        hl.addWidget(QLabel("Sortie :"))
+        self.output_box = QComboBox()
+        hl.addWidget(self.output_box)
+        self.refresh_btn = QPushButton("⟳"); self.refresh_btn.setToolTip("Actualiser la liste des périphériques")
+        self.refresh_btn.clicked.connect(self.engine.catalog.rescan)
+        hl.addWidget(self.refresh_btn)
+        layout.addLayout(hl)
+
+        # optional second source mixed in (with its gain) and second output fed the same mix
+        hl_mix = QHBoxLayout()
+        hl_mix.addWidget(QLabel("+ Entrée :"))
+        self.input2_box = QComboBox(); self.input2_box.addItem(NO_DEVICE, None)
+        hl_mix.addWidget(self.input2_box)
+        self.gain2_box = QSpinBox(); self.gain2_box.setRange(-40, 12); self.gain2_box.setSuffix(" dB")
+        self.gain2_box.valueChanged.connect(self.change_gain2)
+        hl_mix.addWidget(self.gain2_box)
+        hl_mix.addWidget(QLabel("+ Sortie :"))
+        self.output2_box = QComboBox(); self.output2_box.addItem(NO_DEVICE, None)
+        hl_mix.addWidget(self.output2_box)
+        layout.addLayout(hl_mix)
+
+        # volume
+        self.label = QLabel("Volume: 100%"); self.label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.label)
+        self.slider = QSlider(Qt.Orientation.Horizontal)
+        self.slider.setRange(0,200); self.slider.setValue(100); self.slider.valueChanged.connect(self.change_volume)
+        layout.addWidget(self.slider)
+
+        # traitement de sortie : RIAA (préampli phono plat), filtre anti-rumble, largeur stéréo
+        hl_dsp = QHBoxLayout()
+        self.riaa_box = QCheckBox("RIAA"); self.riaa_box.toggled.connect(self.engine.dsp["riaa"].set_enabled)
+        hl_dsp.addWidget(self.riaa_box)
+        self.rumble_box = QCheckBox("Anti-rumble"); self.rumble_box.toggled.connect(self.engine.dsp["rumble"].set_enabled)
+        hl_dsp.addWidget(self.rumble_box)
+        self.width_label = QLabel("Largeur: 100%")
+        hl_dsp.addWidget(self.width_label)
+        self.width_slider = QSlider(Qt.Orientation.Horizontal)
+        self.width_slider.setRange(0,200); self.width_slider.setValue(100); self.width_slider.valueChanged.connect(self.change_width)
+        hl_dsp.addWidget(self.width_slider)
+        layout.addLayout(hl_dsp)
+
+        # balistique des aiguilles / barres
+        hl_meter = QHBoxLayout()
+        hl_meter.addWidget(QLabel("Balistique :"))
+        self.meter_box = QComboBox()
+        for mode in METER_MODES:
+            self.meter_box.addItem(METER_MODE_TEXT[mode], mode)
+        self.meter_box.currentIndexChanged.connect(
+            lambda _: self.engine.set_meter_mode(self.meter_box.currentData()))
+        hl_meter.addWidget(self.meter_box)
+        hl_meter.addWidget(QLabel("(clic sur le VU-mètre : efface CLIP)"))
+        hl_meter.addStretch(1)
+        layout.addLayout(hl_meter)
+
+        # VU meter: the meters (and the spectrum) are the only widgets that grow vertically
+        self.vu = StereoVuMeter()
+        self.vu.clipReset.connect(self.engine.reset_clip)  # click: clear the clip lights
+        self.vu.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        layout.addWidget(self.vu, 1)
+        # more than two input channels: one bar per channel instead of the needles
+        self.bank = MeterBank()
+        self.bank.clipReset.connect(self.engine.reset_clip)
+        self.bank.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.bank.hide()
+        layout.addWidget(self.bank, 1)
+
+        self.spectro = None
+        if self.SPECTRUM:
+            from spectrumview import SpectrumView
+            self.spectro = SpectrumView()
+            self.spectro.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+            layout.addWidget(self.spectro, 1)
+
+        # start/stop
+        self.btn = QPushButton("▶️ Démarrer"); self.btn.clicked.connect(self.toggle_stream)
+        layout.addWidget(self.btn)
+
+        # record what is monitored (timestamped WAV in ~/Music/audio-monitor)
+        self.rec_btn = QPushButton("⏺️ Enregistrer"); self.rec_btn.clicked.connect(self.toggle_recording)
+        self.rec_btn.setEnabled(False)
+        layout.addWidget(self.rec_btn)
+
+        # every input device at once, one process per device, in a separate window
+        self.multi_btn = QPushButton("Tous les périphériques"); self.multi_btn.clicked.connect(self.open_multi)
+        layout.addWidget(self.multi_btn)
+        self.multi = None
+
+        # latency profile + auto-tuning of the block size for the selected pair
+        hl_tune = QHBoxLayout()
+        hl_tune.addWidget(QLabel("Profil :"))
+        self.profile_box = QComboBox()
+        for name, p in PROFILES.items():
+            self.profile_box.addItem(p["label"], name)
+        self.profile_box.setCurrentIndex(list(PROFILES).index(DEFAULT_PROFILE))
+        hl_tune.addWidget(self.profile_box)
+        self.tune_btn = QPushButton("Auto-réglage"); self.tune_btn.clicked.connect(self.auto_tune)
+        hl_tune.addWidget(self.tune_btn)
+        # round trip through a loopback cable from the output to the input, see latency.py
+        self.latency_btn = QPushButton("Mesurer la latence"); self.latency_btn.clicked.connect(self.measure_latency)
+        hl_tune.addWidget(self.latency_btn)
+        layout.addLayout(hl_tune)
+
+        # input -> output routing, applied live (empty = mono to all / 1:1)
+        hl_route = QHBoxLayout()
+        hl_route.addWidget(QLabel("Routage :"))
+        self.routes = QLineEdit(); self.routes.setPlaceholderText("entrée:sortie[:gain],…  ex. 0:0,1:1,0:2:0.5")
+        self.routes.editingFinished.connect(self.change_routes)
+        hl_route.addWidget(self.routes)
+        layout.addLayout(hl_route)
+
+        # status
+        hl_status = QHBoxLayout()
+        self.status = QLabel("Sélectionne entrée + sortie puis Démarrer")
+        hl_status.addWidget(self.status, 1)
+        self.monitor_only = QCheckBox("Monitor only (no output)")
+        self.monitor_only.toggled.connect(self.switch_to_monitor_only)
+        hl_status.addWidget(self.monitor_only)
+        layout.addLayout(hl_status)
+        self.loud_label = QLabel("M   --   S   --   I   --  LUFS  LRA   --  LU  TP   --  dBTP"); layout.addWidget(self.loud_label)
+        self.health = QLabel("DSP: -- | xruns: 0"); layout.addWidget(self.health)
+
+        # clicks / pops / dropouts found on the monitored signal, exported as CSV
+        hl_clicks = QHBoxLayout()
+        self.clicks_label = QLabel("Clics --"); hl_clicks.addWidget(self.clicks_label, 1)
+        self.clicks_btn = QPushButton("Exporter les clics"); self.clicks_btn.clicked.connect(self.export_clicks)
+        self.clicks_btn.setEnabled(False)
+        hl_clicks.addWidget(self.clicks_btn)
+        layout.addLayout(hl_clicks)
+
+        self.setLayout(layout)
+
+        for w in (self.input_box, self.output_box, self.slider, self.btn, self.rec_btn,
+                  self.label, self.status, self.health, self.loud_label):
+            w.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
+
+        # meter frame clock: drains the meter once per frame, whatever the block rate
+        self.meter_timer = QTimer(self)
+        self.meter_timer.setInterval(1000 // METER_FPS)
+        self.meter_timer.timeout.connect(self._update_meter)
+        if self.spectro is not None:
+            self.meter_timer.timeout.connect(self._update_spectrum)
+        self._shown_loudness = None
+        self._redraw = True  # draw the next reading even if nothing moved (new gain, new widget)
+
+        # callback health, refreshed twice a second (less often while idle)
+        self.health_timer = QTimer(self)
+        self.health_timer.setInterval(HEALTH_MS)
+        self._shown_health = None
+        self.health_timer.timeout.connect(self._update_health)
+
+        # device lists follow the engine's catalogue, enumerated in the background
+        self._devices_version = 0  # version 0 = still enumerating, nothing to show
+        self.device_timer = QTimer(self)
+        self.device_timer.setInterval(DEVICE_POLL_MS)
+        self.device_timer.timeout.connect(self._sync_devices)
+        self.device_timer.start()
+        self.engine.catalog.start()
+
+        self.tuner = None
+        self.tune_timer = QTimer(self)
+        self.tune_timer.setInterval(100)
+        self.tune_timer.timeout.connect(self._poll_tuner)
+
+        self.latency_test = None
+        self.latency_timer = QTimer(self)
+        self.latency_timer.setInterval(100)
+        self.latency_timer.timeout.connect(self._poll_latency)
+
+    # ---- controls ----
+    def switch_to_monitor_only(self, checked):
+        # no output stream: no volume, and nothing to mix into (the bus needs an output)
+        for w in (self.output_box, self.input2_box, self.gain2_box, self.output2_box, self.slider):
+            w.setEnabled(not checked)
+        if checked:
+            self.engine.volume = 1.0
+            self.slider.setValue(100)
+            self.label.setText("Volume: 100% (monitor only)")
+        else:
+            self.change_volume(self.slider.value())
+
+    def change_width(self, v):
+        # 0 % = mono, 100 % = untouched (stage off)
+        stage = self.engine.dsp["width"]
+        stage.width = v / 100.0
+        stage.set_enabled(v != 100)
+        self.width_label.setText(f"Largeur: {v}%")
+
+    def change_gain2(self, db):
+        # second source level in the mix, applied at once
+        if self.engine.mixer is not None and len(self.engine.mixer.sources) > 1:
+            self.engine.mixer.set_source_gain(1, db)
+
+    def change_volume(self, v):
+        self.engine.volume = v / 100.0
+        self._redraw = True
+        self.label.setText(f"Volume: {v}%")
+
+    def change_routes(self):
+        try:
+            self.engine.set_routes(self.routes.text().strip() or None)
+        except EngineError as e:
+            self.status.setText(str(e))
+
+    # ---- meters ----
+    def _update_meter(self):
+        # the meter is drained even while hidden (clip lights, level feed),
+        # the widgets are only touched when something moved on screen
+        shown = self.isVisible() and not self.isMinimized()
+        self._draw_meter(shown)
+        if not shown:
+            self._redraw = True  # catch up on whatever moved meanwhile
+        self.meter_timer.setInterval(self.engine.meter_interval(shown))
+        # (setInterval restarts a running timer: only when the rate changes, or it never fires)
+        health_ms = HEALTH_IDLE_MS if self.engine.pacer.idle else HEALTH_MS
+        if self.health_timer.interval() != health_ms:
+            self.health_timer.setInterval(health_ms)
+
+    def _draw_meter(self, shown):
+        loud = self.engine.read_loudness()
+        if shown and loud is not None and loud is not self._shown_loudness:
+            # a new dict every 100 ms hop, no need to redo the text in between
+            self._shown_loudness = loud
+            self.loud_label.setText(format_loudness(loud))
+        if self.bank.isVisible():
+            levels = self.engine.read_channel_levels()
+            if levels is not None and shown and (self.engine.meter.moving or self._redraw):
+                self._redraw = False
+                self.bank.setLevels(levels)
+                self.bank.setHold(*self.engine.read_hold())
+            return
+        levels = self.engine.read_levels()
+        if levels is not None and shown and (self.engine.meter.moving or self._redraw):
+            self._redraw = False
+            self.vu.setLevels(*levels)
+            holds, clips = self.engine.read_hold()
+            r = min(1, len(holds) - 1)  # mono: both needles show channel 1
+            self.vu.setHold(holds[0], holds[r], clips[0], clips[r])
+
+    def _update_spectrum(self):
+        rows = self.engine.read_spectrogram()
+        if rows is not None:
+            self.spectro.addRows(rows)
+
+    def _show_meters(self):
+        self._redraw = True
+        channels = self.engine.meter.channels
+        self.vu.setVisible(channels <= 2)
+        self.bank.setVisible(channels > 2)
+        if channels > 2:
+            self.bank.setChannels(channels)
+        if self.spectro is not None and self.engine.spectrum is not None:
+            self.spectro.setBands(self.engine.spectrum.freqs)
+
+    def _update_health(self):
+        h = self.engine.health
+        text = f"DSP: {h.dsp_load():.0%} | xruns: {h.xruns()}"
+        recorder = self.engine.recorder
+        if recorder is not None:
+            st = recorder.stats()
+            text += f" | REC {st['seconds']:.0f} s, pertes: {st['dropped_frames'] + st['lost_frames']}"
+        if self.engine.dsp.active and self.engine.mode != MONITOR_ONLY:
+            text += f" | {self.engine.dsp.report()}"
+        if text != self._shown_health:
+            self._shown_health = text
+            self.health.setText(text)
+        if self.engine.clicks is not None and self.engine.running:
+            text = format_clicks(self.engine.clicks)
+            if text != self.clicks_label.text():
+                self.clicks_label.setText(text)
+
+    # ---- recording / export ----
+    def export_clicks(self):
+        try:
+            path = default_clicks_path()
+            n = self.engine.export_clicks(path)
+        except (EngineError, OSError) as e:
+            self.status.setText(str(e))
+            return
+        self.status.setText(f"Clics exportés : {os.path.basename(path)} ({n} événements)")
+
+    def toggle_recording(self):
+        if self.engine.recorder is not None:
+            st = self.engine.stop_recording()
+            self.rec_btn.setText("⏺️ Enregistrer")
+            self.status.setText(f"Enregistré : {os.path.basename(st['path'])} ({st['seconds']:.0f} s, "
+                                f"pertes : {st['dropped_frames'] + st['lost_frames']})")
+            return
+        try:
+            self.engine.start_recording(default_record_path())
+        except EngineError as e:
+            self.status.setText(str(e))
+            return
+        self.rec_btn.setText("⏹️ Arrêter l'enregistrement")
+
+    def open_multi(self):
+        # the devices are opened by the worker processes: release ours first
+        if self.engine.running:
+            self.toggle_stream()
+        if self.multi is None:
+            from multiview import MultiMonitor
+            self.multi = MultiMonitor(engine=self.engine)
+        self.multi.show()
+        self.multi.raise_()
+        if not self.multi.monitor.running:
+            self.multi.toggle()
+
+    # ---- devices ----
+    def _sync_devices(self):
+        catalog = self.engine.catalog
+        if catalog.version == self._devices_version:
+            return
+        self._devices_version = catalog.version
+        self.device_timer.setInterval(DEVICE_IDLE_MS)  # enumerated: hot-plugs can wait a second
+        devices = catalog.devices
+        inputs = [d for d in devices if d['max_input_channels'] > 0]
+        outputs = [d for d in devices if d['max_output_channels'] > 0]
+        self._sync_box(self.input_box, inputs)
+        self._sync_box(self.output_box, outputs)
+        self._sync_box(self.input2_box, inputs, first=1)
+        self._sync_box(self.output2_box, outputs, first=1)
+        self.engine.print_devices()
+
+    def _sync_box(self, box, devices, first=0):
+        # update the list in place: the selected device stays selected even if its index moved
+        # (`first` leading items, e.g. NO_DEVICE, are left alone)
+        current = box.currentData()
+        keys = [device_key(d) for d in devices]
+        box.blockSignals(True)
+        for pos in reversed(range(first, box.count())):
+            if box.itemData(pos) not in keys:
+                box.removeItem(pos)
+        for pos, (key, d) in enumerate(zip(keys, devices), first):
+            text = f"{d['index']}: {d['name']}"
+            found = box.findData(key)
+            if found != pos:
+                if found >= 0:
+                    box.removeItem(found)
+                box.insertItem(pos, text, key)
+            elif box.itemText(pos) != text:
+                box.setItemText(pos, text)
+        if current is not None and box.findData(current) >= 0:
+            box.setCurrentIndex(box.findData(current))
+        box.blockSignals(False)
+
+    def _parse_index(self, text):
+        # "12: Device name"
+        try:
+            return int(text.split(":", 1)[0])
+        except Exception:
+            return None
+
+    def _selected_devices(self):
+        # parse devices
+        in_id = self._parse_index(self.input_box.currentText())
+        out_id = self._parse_index(self.output_box.currentText())
+        if in_id is None or out_id is None:
+            self.status.setText("Erreur: impossible de parser périphériques.")
+            return None
+        if self.monitor_only.isChecked():
+            out_id = None
+        return in_id, out_id
+
+    # ---- tuning / latency ----
+    def auto_tune(self):
+        if self.engine.running:
+            self.toggle_stream()
+        devices = self._selected_devices()
+        if devices is None:
+            return
+        self.tuner = BlockSizeTuner(self.engine, *devices, profile=self.profile_box.currentData())
+        self.btn.setEnabled(False)
+        self.tune_btn.setEnabled(False)
+        self.tuner.start()
+        self.tune_timer.start()
+
+    def _poll_tuner(self):
+        result = self.tuner.poll()
+        if result is None:
+            done, total = self.tuner.progress()
+            self.status.setText(f"Réglage… bloc {self.tuner.current}, latence {self.tuner.current_latency} ({done + 1}/{total})")
+            return
+        self.tune_timer.stop()
+        self.tuner = None
+        self.btn.setEnabled(True)
+        self.tune_btn.setEnabled(True)
+        self.status.setText(f"Réglé : bloc {result['blocksize']}, latence {result['latency']}")
+
+    def measure_latency(self):
+        if self.engine.running:
+            self.toggle_stream()
+        devices = self._selected_devices()
+        if devices is None:
+            return
+        self.latency_test = LatencyTest(self.engine, *devices)
+        try:
+            apply_stored(self.engine, *devices, self.profile_box.currentData())
+            self.latency_test.start()
+        except EngineError as e:
+            self.latency_test = None
+            self.status.setText(str(e))
+            return
+        self.btn.setEnabled(False)
+        self.tune_btn.setEnabled(False)
+        self.latency_btn.setEnabled(False)
+        self.latency_timer.start()
+
+    def _poll_latency(self):
+        result = self.latency_test.poll()
+        if result is None:
+            done, total = self.latency_test.progress()
+            self.status.setText(f"Mesure de latence ({self.latency_test.mode})… {done + 1}/{total}")
+            return
+        self.latency_timer.stop()
+        self.latency_test = None
+        self.btn.setEnabled(True)
+        self.tune_btn.setEnabled(True)
+        self.latency_btn.setEnabled(True)
+        self.status.setText(format_result(result))
+
+    # ---- streams ----
+    def toggle_stream(self):
+        if self.engine.running:
+            self.stop_streams()
+            self.btn.setText("▶️ Démarrer")
+            self.status.setText("Arrêté.")
+            self.monitor_only.setEnabled(True)
+            return
+
+        devices = self._selected_devices()
+        if devices is None:
+            return
+        in_id, out_id = devices
+        in2 = out2 = None
+        if out_id is not None:
+            in2 = self._parse_index(self.input2_box.currentText())
+            out2 = self._parse_index(self.output2_box.currentText())
+
+        if self.multi is not None and self.multi.monitor.running:
+            self.multi.toggle()  # the rack view holds the devices
+        try:
+            apply_stored(self.engine, in_id, out_id, self.profile_box.currentData())
+            self.engine.routes = self.routes.text().strip() or None
+            if in2 is None and out2 is None:
+                mode = self.engine.start(in_id, out_id)
+            else:
+                sources = [in_id] + ([(in2, float(self.gain2_box.value()))] if in2 is not None else [])
+                mode = self.engine.start_mix(sources, [out_id] + ([out2] if out2 is not None else []))
+        except EngineError as e:
+            self.status.setText(str(e))
+            return
+        self._show_meters()
+        self.meter_timer.start(1000 // METER_FPS)  # full rate until the meters settle
+        self.health_timer.start()
+        self.rec_btn.setEnabled(True)
+        self.clicks_btn.setEnabled(self.engine.clicks is not None)
+        self.btn.setText("⏹️ Arrêter")
+        self.status.setText(f"{STATUS_TEXT[mode]} {format_reported(self.engine.reported_latency())}")
+        self.monitor_only.setEnabled(False)
+
+    def stop_streams(self):
+        self.meter_timer.stop()
+        self.health_timer.stop()
+        self.engine.stop()
+        if self.engine.clicks is not None:
+            self.clicks_label.setText(format_clicks(self.engine.clicks))  # the session's totals
+        self.rec_btn.setEnabled(False)
+        self.rec_btn.setText("⏺️ Enregistrer")
+
+    def closeEvent(self, event):
+        if self.multi is not None:
+            self.multi.close()
+        self.engine.catalog.stop()
+        super().closeEvent(event)
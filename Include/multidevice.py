@@ -0,0 +1,203 @@
+# multidevice.py
+# Several input devices monitored at once, one worker process per device.
+# Each worker owns its streams, its meter and its own GIL, so a busy
+# callback on one interface cannot delay another. Workers publish levels,
+# peaks and health counters into one multiprocessing.shared_memory grid
+# (a row per device); the GUI reads the whole grid with a single copy per
+# frame: no pickling, pipes or queues on the hot path.
+#
+# Every row is guarded by a sequence number (odd while the worker writes
+# it); a row caught mid-update keeps the values of the previous frame. The
+# only field the GUI writes is CLIP_RESET, a counter the worker watches.
+# The workers run deviceworker.py, which never imports Qt or the GUI.
+import sys
+import queue
+import contextlib
+import numpy as np
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+from engine import BLOCKSIZE
+from sampleformat import FLOAT
+
+MAX_CHANNELS = 64   # per device; extra channels are not shown
+JOIN_TIMEOUT = 3.0  # seconds a worker gets to close its streams
+
+# row layout (float64): header fields, then levels, peaks, peak holds and
+# clip flags, MAX_CHANNELS each
+SEQ, STATE, CHANNELS, SAMPLERATE, XRUNS, DSP_LOAD, CLIP_RESET = range(7)
+HEADER = 7
+LEVELS = HEADER
+PEAKS = HEADER + MAX_CHANNELS
+HOLDS = HEADER + 2 * MAX_CHANNELS
+CLIPS = HEADER + 3 * MAX_CHANNELS
+ROW = HEADER + 4 * MAX_CHANNELS
+
+STARTING, RUNNING, FAILED, STOPPED = range(4)
+
+
+class LevelGrid:
+    """Shared (devices x ROW) float64 array. The creator owns the segment
+    and unlinks it in close(); workers attach with the segment name."""
+
+    def __init__(self, devices, name=None):
+        self.devices = int(devices)
+        size = self.devices * ROW * 8
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.grid = np.ndarray((self.devices, ROW), dtype=np.float64, buffer=self.shm.buf)
+        if self.owner:
+            self.grid.fill(0.0)
+        # reader side: last consistent copy of every row
+        self.snapshot = np.zeros((self.devices, ROW))
+        self.view = np.zeros((self.devices, ROW))
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    # ---- worker side ----
+    def publish(self, slot, levels, peaks, holds, clips, xruns, dsp_load):
+        row = self.grid[slot]
+        n = min(len(levels), MAX_CHANNELS)
+        row[SEQ] += 1
+        row[STATE] = RUNNING
+        row[CHANNELS] = n
+        row[XRUNS] = xruns
+        row[DSP_LOAD] = dsp_load
+        row[LEVELS:LEVELS + n] = levels[:n]
+        row[PEAKS:PEAKS + n] = peaks[:n]
+        row[HOLDS:HOLDS + n] = holds[:n]
+        row[CLIPS:CLIPS + n] = clips[:n]
+        row[SEQ] += 1
+
+    def set_state(self, slot, state, samplerate=None):
+        row = self.grid[slot]
+        row[SEQ] += 1
+        row[STATE] = state
+        if samplerate is not None:
+            row[SAMPLERATE] = samplerate
+        row[SEQ] += 1
+
+    # ---- GUI side ----
+    def reset_clip(self, slot):
+        self.grid[slot, CLIP_RESET] += 1
+
+    def read(self):
+        """(devices x ROW) array of the latest consistent rows; the same
+        array is refreshed in place by every call."""
+        seq = self.grid[:, SEQ].copy()
+        np.copyto(self.snapshot, self.grid)
+        ok = (seq == self.grid[:, SEQ]) & (seq % 2 == 0)
+        self.view[ok] = self.snapshot[ok]
+        return self.view
+
+    def close(self):
+        del self.grid
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+@contextlib.contextmanager
+def _spawn_main(module):
+    # a spawned child first re-imports the parent's __main__: from the GUI
+    # that is PyQt6 and the whole window. Children started in this block
+    # import the Qt-free `module` instead (they look it up by name when
+    # Process.start() runs, in this thread).
+    main = sys.modules["__main__"]
+    sys.modules["__main__"] = module
+    try:
+        yield
+    finally:
+        sys.modules["__main__"] = main
+
+
+class MultiDeviceMonitor:
+    """Start one monitoring process per input device and expose their
+    levels through a LevelGrid. `backend` is an optional picklable factory
+    returning the backend each worker should use (default: sounddevice).
+    `sample_format` is the workers' stream format (see AudioEngine)."""
+
+    def __init__(self, devices, blocksize=BLOCKSIZE, backend=None, sample_format=FLOAT):
+        self.devices = list(devices)
+        self.blocksize = blocksize
+        self.backend = backend
+        self.sample_format = sample_format
+        # spawn: never fork a process that already runs Qt and audio threads
+        self.ctx = mp.get_context("spawn")
+        self.grid = None
+        self.stop_event = None
+        self.errors = None
+        self.procs = []
+
+    @property
+    def running(self):
+        return self.grid is not None
+
+    def start(self):
+        if self.running:
+            self.stop()
+        self.grid = LevelGrid(len(self.devices))
+        self.stop_event = self.ctx.Event()
+        self.errors = self.ctx.Queue()
+        import deviceworker
+        with _spawn_main(deviceworker):
+            for slot, device in enumerate(self.devices):
+                p = self.ctx.Process(target=deviceworker.run, daemon=True,
+                                     args=(self.grid.name, len(self.devices), slot, device, self.blocksize,
+                                           self.backend, self.sample_format, self.stop_event, self.errors))
+                p.start()
+                self.procs.append(p)
+        print(f"Multi-device monitor: {len(self.procs)} worker processes")
+
+    def read(self):
+        # (devices x ROW) array, see the row layout above; None when stopped
+        return self.grid.read() if self.grid is not None else None
+
+    def poll_errors(self):
+        # [(slot, message)] reported by workers that could not open their device
+        out = []
+        while self.errors is not None:
+            try:
+                out.append(self.errors.get_nowait())
+            except queue.Empty:
+                break
+        return out
+
+    def reset_clip(self, slot):
+        # ask one worker to clear its clip lights
+        if self.grid is not None:
+            self.grid.reset_clip(slot)
+
+    def stop(self):
+        if not self.running:
+            return
+        self.stop_event.set()
+        for p in self.procs:
+            p.join(JOIN_TIMEOUT)
+            if p.is_alive():
+                print(f"Worker {p.pid} did not stop, terminating")
+                p.terminate()
+                p.join()
+        self.procs = []
+        self.errors.close()
+        self.errors = None
+        self.grid.close()
+        self.grid = None
+
+
+def channel_levels(row):
+    # (levels, peaks) views of one grid row
+    n = int(row[CHANNELS])
+    return row[LEVELS:LEVELS + n], row[PEAKS:PEAKS + n]
+
+
+def channel_holds(row):
+    # (peak holds, clipped) of one grid row
+    n = int(row[CHANNELS])
+    return row[HOLDS:HOLDS + n], row[CLIPS:CLIPS + n] > 0
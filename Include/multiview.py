@@ -0,0 +1,153 @@
+# multiview.py
+# Rack view: every input device at once, one meter strip per device, each
+# device monitored by its own process (see multidevice.py). The window reads
+# the shared level grid once per frame, and less often while no bar moves
+# or the window is hidden.
+#
+#     python multiview.py            # every input device
+#     python multiview.py 2 5 7      # these device indexes
+import sys
+import math
+import numpy as np
+from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout, QGridLayout, QLabel, QPushButton
+from PyQt6.QtCore import Qt, QTimer
+
+from engine import AudioEngine, BLOCKSIZE
+from metering import METER_FPS, STEADY, MeterPacer
+from multidevice import MultiDeviceMonitor, channel_levels, channel_holds, STATE, CHANNELS, SAMPLERATE, \
+    XRUNS, DSP_LOAD, LEVELS, ROW, STARTING, RUNNING, FAILED, STOPPED
+from vumeter import MeterBank
+
+STATE_TEXT = {STARTING: "démarrage…", RUNNING: "actif", FAILED: "erreur", STOPPED: "arrêté"}
+
+
+def _db(x):
+    return 20 * math.log10(x) if x > 0 else -math.inf
+
+
+class DeviceStrip(QWidget):
+    # one device: name, bars, state / peak / health line
+    def __init__(self, title):
+        super().__init__()
+        layout = QVBoxLayout()
+        layout.setContentsMargins(2, 2, 2, 2)
+        self.title = QLabel(title); self.title.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.title)
+        self.bank = MeterBank()
+        layout.addWidget(self.bank)
+        self.info = QLabel(STATE_TEXT[STARTING]); layout.addWidget(self.info)
+        self.setLayout(layout)
+        self._info = None
+
+    def setRow(self, row):
+        state = int(row[STATE])
+        levels, peaks = channel_levels(row)
+        if state == RUNNING and len(levels):
+            if len(levels) != self.bank.channels:
+                self.bank.setChannels(len(levels))
+            self.bank.setLevels(levels)
+            self.bank.setHold(*channel_holds(row))
+            info = (f"{row[SAMPLERATE] / 1000:g} kHz | crête {_db(float(peaks.max())):6.1f} dBFS | "
+                    f"DSP {row[DSP_LOAD]:.0%} | xruns {int(row[XRUNS])}")
+        else:
+            info = STATE_TEXT[state]
+        if info != self._info:  # the text is redone only when it changes
+            self._info = info
+            self.info.setText(info)
+
+
+class MultiMonitor(QWidget):
+    def __init__(self, devices=None, blocksize=BLOCKSIZE, backend=None, engine=None):
+        """`devices`: [(index, name)], default every input device of `engine`."""
+        super().__init__()
+        self.setWindowTitle("Vinyl Monitor (multi)")
+        engine = engine or AudioEngine()
+        self.device_list = devices if devices is not None else engine.input_devices()
+        self.monitor = MultiDeviceMonitor([i for i, _ in self.device_list], blocksize, backend)
+
+        layout = QVBoxLayout()
+        grid = QGridLayout()
+        cols = max(1, math.ceil(math.sqrt(len(self.device_list))))
+        self.strips = []
+        for k, (i, name) in enumerate(self.device_list):
+            strip = DeviceStrip(f"{i}: {name}")
+            strip.bank.clipReset.connect(lambda slot=k: self.monitor.reset_clip(slot))
+            grid.addWidget(strip, k // cols, k % cols)
+            self.strips.append(strip)
+        layout.addLayout(grid)
+
+        self.btn = QPushButton("▶️ Démarrer"); self.btn.clicked.connect(self.toggle)
+        layout.addWidget(self.btn)
+        self.status = QLabel(f"{len(self.device_list)} périphériques d'entrée"); layout.addWidget(self.status)
+        self.setLayout(layout)
+
+        self.meter_timer = QTimer(self)
+        self.meter_timer.setInterval(1000 // METER_FPS)
+        self.meter_timer.timeout.connect(self._update_meters)
+        self.pacer = MeterPacer()
+        self._shown = None  # grid as last drawn
+
+    def _update_meters(self):
+        rows = self.monitor.read()
+        if rows is None:
+            return
+        shown = self.isVisible() and not self.isMinimized()
+        if shown:
+            # a strip is redrawn when its state, rate or xruns changed, its
+            # DSP load by a displayed percent, or a bar by about a pixel
+            if self._shown is None:
+                moved = np.ones(len(rows), dtype=bool)
+            else:
+                diff = np.abs(rows - self._shown)
+                moved = ((diff[:, LEVELS:ROW].max(axis=1) > STEADY) | (diff[:, DSP_LOAD] >= 0.005)
+                         | (diff[:, [STATE, CHANNELS, SAMPLERATE, XRUNS]].max(axis=1) > 0))
+            for strip, row, m in zip(self.strips, rows, moved):
+                if m:
+                    strip.setRow(row)
+            if self._shown is None:
+                self._shown = rows.copy()
+            else:
+                self._shown[moved] = rows[moved]
+        else:
+            moved = (False,)
+            self._shown = None  # redraw everything once shown again
+        self.meter_timer.setInterval(int(1000 / self.pacer.update(any(moved), shown)))
+        for slot, message in self.monitor.poll_errors():
+            self.status.setText(f"{self.device_list[slot][1]} : {message}")
+
+    def toggle(self):
+        if self.monitor.running:
+            self.stop()
+            self.btn.setText("▶️ Démarrer")
+            self.status.setText("Arrêté.")
+            return
+        if not self.device_list:
+            self.status.setText("Aucun périphérique d'entrée.")
+            return
+        self.monitor.start()
+        self.pacer.reset()
+        self._shown = None
+        self.meter_timer.start(1000 // METER_FPS)  # full rate until the meters settle
+        self.btn.setText("⏹️ Arrêter")
+        self.status.setText(f"{len(self.device_list)} processus de monitoring actifs.")
+
+    def stop(self):
+        self.meter_timer.stop()
+        self.monitor.stop()
+
+    def closeEvent(self, event):
+        self.stop()
+        super().closeEvent(event)
+
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    engine = AudioEngine()
+    devices = engine.input_devices()
+    if len(sys.argv) > 1:
+        wanted = {int(a) for a in sys.argv[1:]}
+        devices = [d for d in devices if d[0] in wanted]
+    win = MultiMonitor(devices, engine=engine)
+    win.show()
+    win.toggle()
+    sys.exit(app.exec())
@@ -0,0 +1,334 @@
+# netfeed.py
+# Level feed for remote dashboards: an asyncio server on its own thread
+# streams the meters (per-channel levels, peak holds, peaks, clip lights),
+# the loudness readings and the xrun count as compact binary messages to
+# any number of TCP, WebSocket and UDP subscribers.
+#
+# The feed never touches the audio thread and never drains the meter: it
+# samples the state the GUI / CLI consumer left after its last read (the
+# same values setLevels() gets). Every tick one frame is encoded; `batch`
+# frames make one message, framed once per transport and shared by every
+# client. A slow client only ever gets the newest message: older ones are
+# dropped while its socket drains.
+#
+#     python netfeed.py [host] port      # print a TCP feed (test client)
+#
+# Message (little-endian): "AMLF", u8 version, u8 0, u16 frame count, then
+# per frame: u32 seq, f64 unix time, u64 xruns, u64 clip mask, u16 channels,
+# f32 momentary / short-term / integrated LUFS, LRA, true peak (-inf = n/a),
+# then f32 levels[channels], holds[channels], peaks[channels]. Levels and
+# holds are needle positions (0..1), peaks linear sample peaks.
+# TCP: each message prefixed by its u32 length. WebSocket: one binary frame
+# per message. UDP: send any datagram to subscribe for UDP_TTL seconds.
+import sys
+import time
+import math
+import base64
+import struct
+import asyncio
+import hashlib
+import threading
+import numpy as np
+
+FEED_HOST = "127.0.0.1"
+FEED_RATE = 20.0     # frames per second
+UDP_TTL = 10.0       # seconds a UDP subscription lasts without a new datagram
+MAX_CHANNELS = 64    # clip mask width
+VERSION = 1
+MAGIC = b"AMLF"
+MESSAGE = struct.Struct("<4sBBH")
+FRAME = struct.Struct("<IdQQH5f")
+LENGTH = struct.Struct("<I")
+LOUDNESS_KEYS = ("momentary", "short_term", "integrated", "lra", "true_peak")
+WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+WS_MAX_REQUEST = 8192  # bytes of handshake a WebSocket client may send
+WS_MAX_FRAME = 64 * 1024  # largest client frame payload; bigger ones close with 1009
+
+
+def encode_frame(seq, xruns, levels, holds, peaks, clipped, loudness=None, now=None):
+    ch = min(len(levels), MAX_CHANNELS)
+    mask = 0
+    for c in np.flatnonzero(np.asarray(clipped)[:ch]):
+        mask |= 1 << int(c)
+    loud = [loudness[k] if loudness is not None else -math.inf for k in LOUDNESS_KEYS]
+    head = FRAME.pack(seq & 0xFFFFFFFF, time.time() if now is None else now, xruns, mask, ch, *loud)
+    body = np.concatenate((levels[:ch], holds[:ch], peaks[:ch])).astype("<f4")
+    return head + body.tobytes()
+
+
+def encode_message(frames):
+    return MESSAGE.pack(MAGIC, VERSION, 0, len(frames)) + b"".join(frames)
+
+
+def decode_message(data):
+    """[frame dict] of one message (for clients and tests)."""
+    magic, version, _, count = MESSAGE.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a level feed message")
+    frames, pos = [], MESSAGE.size
+    for _ in range(count):
+        seq, t, xruns, mask, ch, *loud = FRAME.unpack_from(data, pos)
+        pos += FRAME.size
+        values = np.frombuffer(data, dtype="<f4", count=3 * ch, offset=pos)
+        pos += 12 * ch
+        frames.append({"seq": seq, "time": t, "xruns": xruns, "channels": ch,
+                       "clipped": [bool(mask >> c & 1) for c in range(ch)],
+                       "loudness": dict(zip(LOUDNESS_KEYS, loud)),
+                       "levels": values[:ch], "holds": values[ch:2 * ch], "peaks": values[2 * ch:]})
+    return frames
+
+
+def ws_frame_header(n):
+    # server -> client binary frame, unmasked
+    if n < 126:
+        return bytes((0x82, n))
+    if n < 1 << 16:
+        return bytes((0x82, 126)) + struct.pack(">H", n)
+    return bytes((0x82, 127)) + struct.pack(">Q", n)
+
+
+class _Client:
+    def __init__(self, kind, writer):
+        self.kind = kind      # "tcp" or "ws": which framing of the message it gets
+        self.writer = writer
+        self.latest = None    # newest message not sent yet
+        self.ready = asyncio.Event()
+        self.dropped = 0
+        self.task = asyncio.current_task()  # the connection handler
+
+
+class _UdpFeed(asyncio.DatagramProtocol):
+    def __init__(self, loop):
+        self.loop = loop
+        self.transport = None
+        self.subscribers = {}  # addr -> expiry (loop time)
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self.subscribers[addr] = self.loop.time() + UDP_TTL
+
+    def send(self, message):
+        now = self.loop.time()
+        for addr, expiry in list(self.subscribers.items()):
+            if expiry < now:
+                del self.subscribers[addr]
+            else:
+                self.transport.sendto(message, addr)  # a full socket buffer drops it, as UDP should
+
+
+class LevelFeed:
+    def __init__(self, engine, host=FEED_HOST, tcp=None, ws=None, udp=None, rate=FEED_RATE, batch=1):
+        """Serve `engine`'s meters on the given ports (None = transport off)."""
+        if tcp is None and ws is None and udp is None:
+            raise ValueError("no feed port given")
+        self.engine = engine
+        self.host = host
+        self.ports = {"tcp": tcp, "ws": ws, "udp": udp}
+        self.rate = float(rate)
+        self.batch = max(1, int(batch))
+        self.clients = set()
+        self.seq = 0
+        self.error = None
+        self._loop = None
+        self._stopping = None
+        self._started = threading.Event()
+        self._thread = None
+
+    # ---- control (any thread) ----
+    def start(self):
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._main()), daemon=True)
+        self._thread.start()
+        self._started.wait()
+        if self.error is not None:
+            self._thread.join()
+            raise self.error
+        return self
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._stopping.set)
+        self._thread.join()
+        self._thread = None
+
+    # ---- frames ----
+    def frame(self):
+        # one frame from the engine's last meter reading
+        engine = self.engine
+        snap = engine.meter_snapshot()
+        if snap is None:
+            levels = holds = peaks = np.zeros(0, dtype=np.float32)
+            clipped = ()
+        else:
+            levels, holds, peaks, clipped = snap
+        self.seq += 1
+        return encode_frame(self.seq, engine.health.xruns(), levels, holds, peaks, clipped,
+                            engine.read_loudness())
+
+    # ---- asyncio thread ----
+    async def _main(self):
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        self._stopping = asyncio.Event()
+        servers, udp = [], None
+        try:
+            if self.ports["tcp"] is not None:
+                servers.append(await asyncio.start_server(self._serve_tcp, self.host, self.ports["tcp"]))
+            if self.ports["ws"] is not None:
+                servers.append(await asyncio.start_server(self._serve_ws, self.host, self.ports["ws"],
+                                                          limit=WS_MAX_REQUEST))
+            if self.ports["udp"] is not None:
+                transport, udp = await loop.create_datagram_endpoint(
+                    lambda: _UdpFeed(loop), local_addr=(self.host, self.ports["udp"]))
+        except OSError as e:
+            self.error = e
+            for s in servers:
+                s.close()
+            self._started.set()
+            return
+        print("Level feed:", ", ".join(f"{k} {self.host}:{p}" for k, p in self.ports.items() if p is not None),
+              f"({self.rate:g} frames/s)")
+        self._started.set()
+        try:
+            await self._tick(udp)
+        finally:
+            for s in servers:
+                s.close()
+            # closing the sockets ends every session (its reader sees EOF)
+            sessions = [c.task for c in self.clients]
+            for client in list(self.clients):
+                client.writer.close()
+            if sessions:
+                await asyncio.wait(sessions, timeout=1.0)
+            if udp is not None:
+                udp.transport.close()
+
+    async def _tick(self, udp):
+        period = 1.0 / self.rate
+        frames = []
+        next_t = time.monotonic()
+        while not self._stopping.is_set():
+            frames.append(self.frame())
+            if len(frames) >= self.batch:
+                self._broadcast(encode_message(frames), udp)
+                frames = []
+            next_t += period
+            try:
+                await asyncio.wait_for(self._stopping.wait(), max(0.0, next_t - time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+
+    def _broadcast(self, message, udp):
+        # one framing per transport, the same bytes for every client
+        framed = {"tcp": LENGTH.pack(len(message)) + message,
+                  "ws": ws_frame_header(len(message)) + message}
+        for client in self.clients:
+            if client.latest is not None:
+                client.dropped += 1
+            client.latest = framed[client.kind]
+            client.ready.set()
+        if udp is not None:
+            udp.send(message)
+
+    async def _send(self, client):
+        # newest message only: whatever arrived while drain() waited replaced the rest
+        try:
+            while True:
+                await client.ready.wait()
+                client.ready.clear()
+                data, client.latest = client.latest, None
+                client.writer.write(data)
+                await client.writer.drain()
+        except ConnectionError:
+            return
+
+    async def _session(self, client, reader_task):
+        self.clients.add(client)
+        sender = asyncio.ensure_future(self._send(client))
+        try:
+            await asyncio.wait((sender, reader_task), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self.clients.discard(client)
+            sender.cancel()
+            reader_task.cancel()
+            client.writer.close()
+
+    async def _serve_tcp(self, reader, writer):
+        # nothing is expected from the client: the session ends at EOF
+        await self._session(_Client("tcp", writer), asyncio.ensure_future(reader.read()))
+
+    async def _serve_ws(self, reader, writer):
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            writer.close()
+            return
+        key = None
+        for line in request.split(b"\r\n")[1:]:
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"sec-websocket-key":
+                key = value.strip()
+        if key is None:
+            writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+            writer.close()
+            return
+        accept = base64.b64encode(hashlib.sha1(key + WS_GUID).digest())
+        writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                     b"Connection: Upgrade\r\nSec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+        await self._session(_Client("ws", writer), asyncio.ensure_future(self._ws_read(reader, writer)))
+
+    async def _ws_read(self, reader, writer):
+        # client frames: answer pings, stop on close, ignore the rest;
+        # an oversized frame closes the connection before its payload is read
+        try:
+            while True:
+                b0, b1 = await reader.readexactly(2)
+                n = b1 & 0x7F
+                if n == 126:
+                    n = struct.unpack(">H", await reader.readexactly(2))[0]
+                elif n == 127:
+                    n = struct.unpack(">Q", await reader.readexactly(8))[0]
+                if n > WS_MAX_FRAME:
+                    writer.write(b"\x88\x02" + struct.pack(">H", 1009))  # message too big
+                    return
+                mask = await reader.readexactly(4) if b1 & 0x80 else None
+                payload = await reader.readexactly(n)
+                if mask is not None:
+                    payload = (np.frombuffer(payload, np.uint8)
+                               ^ np.resize(np.frombuffer(mask, np.uint8), n)).tobytes()
+                opcode = b0 & 0x0F
+                if opcode == 0x8:
+                    writer.write(b"\x88\x00")
+                    return
+                if opcode == 0x9 and n < 126:
+                    writer.write(bytes((0x8A, n)) + payload)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return
+
+
+def _print_feed(host, port):
+    # minimal TCP client: one line per received frame
+    import socket
+    with socket.create_connection((host, port)) as sock:
+        f = sock.makefile("rb")
+        while True:
+            head = f.read(LENGTH.size)
+            if len(head) < LENGTH.size:
+                return
+            for fr in decode_message(f.read(LENGTH.unpack(head)[0])):
+                levels = " ".join(f"{v:4.2f}" for v in fr["levels"])
+                print(f"#{fr['seq']} [{levels}] xruns {fr['xruns']}"
+                      + (" CLIP" if any(fr["clipped"]) else ""), flush=True)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    try:
+        _print_feed(args[0] if len(args) > 1 else FEED_HOST, int(args[-1]))
+    except (IndexError, ValueError):
+        print("usage: python netfeed.py [host] port", file=sys.stderr)
+        sys.exit(2)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,167 @@
+# offline.py
+# Offline analysis of a WAV file with the live metering code, as fast as the
+# CPU allows. The file is memory-mapped and read in large chunks; each chunk
+# is cut into report blocks (one live meter frame by default) measured with
+# a single vectorized RMS / peak reduction, and fed to the same
+# Ballistics (needle level at each block end) and LoudnessMeter the engine
+# runs.
+#
+#     python offline.py take.wav --json report.json
+#     python offline.py archive.wav --block 1.0 --csv report.csv
+import sys
+import json
+import math
+import time
+import argparse
+import numpy as np
+
+from wavfile import MappedWav
+from metering import block_levels, METER_FPS, LEVEL_SCALE
+from ballistics import Ballistics, DEFAULT_MODE, MODES
+from loudness import LoudnessMeter
+from biquad import CHUNK
+
+BLOCK_SECONDS = 1.0 / METER_FPS  # default report block: one live meter frame
+CHUNK_SECONDS = 10.0             # audio converted to float32 at a time
+
+
+def _db(x):
+    with np.errstate(divide="ignore"):
+        return 20.0 * np.log10(x)
+
+
+def analyze(path, block_seconds=BLOCK_SECONDS, loudness=True, mode=DEFAULT_MODE):
+    """Per-block RMS / peak / needle level (and momentary / short-term
+    loudness) of a WAV file, plus whole-file figures. The needle is the live
+    meter's (`mode` ballistics) read at each block end. Returns a report dict
+    holding NumPy arrays, see write_json / write_csv."""
+    wav = MappedWav(path)
+    sr, ch = wav.samplerate, wav.channels
+    block = max(1, int(round(block_seconds * sr)))
+    chunk = block * max(1, int(CHUNK_SECONDS * sr) // block)
+    nblocks = -(-wav.frames // block)
+    rms = np.zeros((nblocks, ch), dtype=np.float32)
+    peak = np.zeros((nblocks, ch), dtype=np.float32)
+    level = np.zeros((nblocks, ch), dtype=np.float32)
+    energy = np.zeros(ch)  # whole-file sum of squares
+    needles = Ballistics(ch, sr, chunk, mode)
+
+    meter = LoudnessMeter(ch, sr) if loudness else None
+    if meter is not None:
+        meter.history = []
+    carry = np.zeros((0, ch), dtype=np.float32)  # frames short of a filter chunk
+
+    for start, x in wav.chunks(chunk):
+        i = start // block
+        full = x.shape[0] // block
+        block_levels(x[:full * block].reshape(full, block, ch), rms[i:i + full], peak[i:i + full])
+        if full * block < x.shape[0]:  # short last block
+            block_levels(x[full * block:], rms[i + full], peak[i + full])
+        energy += np.einsum('ij,ij->j', x, x, dtype=np.float64)
+        ends = np.minimum(np.arange(block, x.shape[0] + block, block), x.shape[0]) - 1
+        level[i:i + len(ends)] = needles.process(x, ends)
+        if meter is not None:
+            if carry.shape[0]:
+                x = np.concatenate((carry, x))
+            meter.feed(x)
+            carry = x[x.shape[0] // CHUNK * CHUNK:]
+
+    ends = np.minimum((np.arange(nblocks) + 1) * block, wav.frames)
+    report = {
+        "file": str(path), "samplerate": sr, "channels": ch, "frames": wav.frames,
+        "duration": wav.duration, "block_seconds": block / sr,
+        "time": ends / sr,
+        "rms_dbfs": _db(rms), "peak_dbfs": _db(peak), "level": np.minimum(level * LEVEL_SCALE, 1.0),
+        "summary": {
+            "rms_dbfs": _db(np.sqrt(energy / max(wav.frames, 1))).tolist(),
+            "peak_dbfs": _db(peak.max(axis=0)).tolist() if nblocks else [],
+        },
+    }
+    if meter is not None:
+        # loudness at each block end = readings of the last hop completed by then
+        hop_ends = np.array([h[0] for h in meter.history], dtype=np.int64)
+        m = np.array([-math.inf] + [h[1]["momentary"] for h in meter.history])
+        s = np.array([-math.inf] + [h[1]["short_term"] for h in meter.history])
+        idx = np.searchsorted(hop_ends, ends, side="right")
+        report["momentary_lufs"] = m[idx]
+        report["short_term_lufs"] = s[idx]
+        r = meter.readings
+        report["summary"].update({
+            "integrated_lufs": r["integrated"], "lra_lu": r["lra"], "true_peak_dbtp": r["true_peak"],
+            "max_momentary_lufs": float(m.max()), "max_short_term_lufs": float(s.max()),
+        })
+    return report
+
+
+def _finite(v):
+    # JSON has no infinities: silence is reported as null
+    if isinstance(v, float):
+        return v if math.isfinite(v) else None
+    if isinstance(v, list):
+        return [_finite(x) for x in v]
+    return v
+
+
+def write_json(report, path):
+    out = {}
+    for k, v in report.items():
+        if isinstance(v, np.ndarray):
+            v = np.round(v.astype(np.float64), 3).tolist()
+        elif isinstance(v, dict):
+            v = {kk: _finite(vv) for kk, vv in v.items()}
+        out[k] = _finite(v)
+    with open(path, "w") as f:
+        json.dump(out, f)
+
+
+def write_csv(report, path):
+    ch = report["channels"]
+    cols = [report["time"][:, None], report["rms_dbfs"], report["peak_dbfs"], report["level"]]
+    names = ["time_s"] + [f"{k}_{c + 1}" for k in ("rms_dbfs", "peak_dbfs", "level") for c in range(ch)]
+    for k in ("momentary_lufs", "short_term_lufs"):
+        if k in report:
+            cols.append(report[k][:, None])
+            names.append(k)
+    np.savetxt(path, np.hstack(cols), fmt="%.3f", delimiter=",", header=",".join(names), comments="")
+
+
+def format_summary(report):
+    s = report["summary"]
+    lines = [f"{report['file']}: {report['duration']:.1f} s, {report['channels']} ch, {report['samplerate']} Hz"]
+    lines.append("  RMS  " + " ".join(f"{v:6.1f}" for v in s["rms_dbfs"]) + " dBFS")
+    lines.append("  peak " + " ".join(f"{v:6.1f}" for v in s["peak_dbfs"]) + " dBFS")
+    if "integrated_lufs" in s:
+        lines.append(f"  I {s['integrated_lufs']:.1f} LUFS  LRA {s['lra_lu']:.1f} LU  "
+                     f"TP {s['true_peak_dbtp']:.1f} dBTP  max M {s['max_momentary_lufs']:.1f}  "
+                     f"max S {s['max_short_term_lufs']:.1f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure a WAV file with the live metering pipeline.")
+    parser.add_argument("file", help="WAV / RF64 file")
+    parser.add_argument("--block", type=float, default=BLOCK_SECONDS, help="report block length in seconds")
+    parser.add_argument("--csv", help="write the per-block report to this CSV file")
+    parser.add_argument("--json", help="write the report to this JSON file")
+    parser.add_argument("--no-loudness", action="store_true", help="levels only (faster)")
+    parser.add_argument("--ballistics", choices=MODES, default=DEFAULT_MODE, help="needle ballistics of the level column")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    try:
+        report = analyze(args.file, args.block, loudness=not args.no_loudness, mode=args.ballistics)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - t0
+    print(format_summary(report))
+    print(f"  analysed in {elapsed:.2f} s ({report['duration'] / max(elapsed, 1e-9):.0f}x real time)")
+    if args.csv:
+        write_csv(report, args.csv)
+    if args.json:
+        write_json(report, args.json)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
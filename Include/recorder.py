@@ -0,0 +1,192 @@
+# recorder.py
+# Record-to-disk tap. push() runs in the audio callback and only copies the
+# block into a preallocated RingBuffer; a writer thread drains the ring in
+# large batches to a 32-bit float WAV file (upgraded to RF64 past 4 GiB) or,
+# if the `flac` command-line encoder is installed, to 24-bit FLAC. A slow
+# disk only fills the ring: frames that do not fit are dropped and counted,
+# the callback never waits, and memory stays at the ring size however long
+# the session runs.
+import os
+import time
+import struct
+import shutil
+import threading
+import subprocess
+import numpy as np
+
+from ringbuffer import RingBuffer
+
+RECORD_BUFFER_SECONDS = 10.0  # ring size: how long a disk stall can last without losing audio
+WRITE_BATCH_SECONDS = 1.0     # largest single write
+WRITE_INTERVAL = 0.25         # seconds between two drains
+FORMATS = ("wav", "rf64", "flac")
+RECORD_DIR = os.path.join(os.path.expanduser("~"), "Music", "audio-monitor")
+
+# WAVE_FORMAT_EXTENSIBLE sub-format GUID for IEEE float
+_FLOAT_GUID = struct.pack("<IHH8s", 3, 0, 0x10, b"\x80\x00\x00\xaa\x00\x38\x9b\x71")
+_MAX_32 = 0xFFFFFFFF
+RF64_THRESHOLD = _MAX_32  # RIFF size above which close() switches to RF64
+
+
+def default_record_path(fmt="wav"):
+    # timestamped file in RECORD_DIR, created on demand
+    os.makedirs(RECORD_DIR, exist_ok=True)
+    ext = "flac" if fmt == "flac" else "wav"
+    return os.path.join(RECORD_DIR, time.strftime(f"rec-%Y%m%d-%H%M%S.{ext}"))
+
+
+def flac_available():
+    return shutil.which("flac") is not None
+
+
+class WavWriter:
+    """32-bit float WAV; the header reserves a JUNK chunk so close() can turn
+    the file into RF64 (EBU Tech 3306) if the data outgrew 32-bit sizes."""
+
+    def __init__(self, path, channels, samplerate, rf64=False):
+        self.f = open(path, "wb")
+        self.channels = channels
+        self.rf64 = rf64
+        self.frames = 0
+        if channels > 2:
+            fmt = struct.pack("<HHIIHHHHI16s", 0xFFFE, channels, samplerate, samplerate * channels * 4,
+                              channels * 4, 32, 22, 32, 0, _FLOAT_GUID)
+        else:
+            fmt = struct.pack("<HHIIHHH", 3, channels, samplerate, samplerate * channels * 4,
+                              channels * 4, 32, 0)
+        header = b"RIFF" + b"\0" * 4 + b"WAVE"
+        header += b"JUNK" + struct.pack("<I", 28) + b"\0" * 28  # becomes ds64
+        header += b"fmt " + struct.pack("<I", len(fmt)) + fmt
+        self._fact_at = len(header) + 8
+        header += b"fact" + struct.pack("<I", 4) + b"\0" * 4
+        self._data_at = len(header) + 4
+        header += b"data" + b"\0" * 4
+        self.header_size = len(header)
+        self.f.write(header)
+
+    def write(self, block):
+        self.f.write(memoryview(block))
+        self.frames += block.shape[0]
+
+    def close(self):
+        data = self.frames * self.channels * 4
+        riff = self.header_size - 8 + data
+        f = self.f
+        if self.rf64 or riff > RF64_THRESHOLD:
+            f.seek(0)
+            f.write(b"RF64" + struct.pack("<I", _MAX_32) + b"WAVE")
+            f.write(b"ds64" + struct.pack("<I", 28) + struct.pack("<QQQI", riff, data, self.frames, 0))
+            fact, size = min(self.frames, _MAX_32), _MAX_32
+        else:
+            f.seek(4)
+            f.write(struct.pack("<I", riff))
+            fact, size = self.frames, data
+        f.seek(self._fact_at)
+        f.write(struct.pack("<I", fact))
+        f.seek(self._data_at)
+        f.write(struct.pack("<I", size))
+        f.close()
+
+
+class FlacWriter:
+    """Pipes 24-bit little-endian PCM into the `flac` encoder."""
+
+    def __init__(self, path, channels, samplerate, max_frames):
+        if not flac_available():
+            raise OSError("flac encoder not found (install the 'flac' command)")
+        self.proc = subprocess.Popen(
+            ["flac", "--silent", "--force", "--force-raw-format", "--endian=little", "--sign=signed",
+             f"--channels={channels}", "--bps=24", f"--sample-rate={samplerate}", "-o", path, "-"],
+            stdin=subprocess.PIPE)
+        self.frames = 0
+        self._scaled = np.zeros((max_frames, channels), dtype=np.float32)
+        self._ints = np.zeros((max_frames, channels), dtype=np.int32)
+        self._packed = np.zeros((max_frames, channels, 3), dtype=np.uint8)
+
+    def write(self, block):
+        n = block.shape[0]
+        scaled, ints, packed = self._scaled[:n], self._ints[:n], self._packed[:n]
+        np.multiply(block, 8388607.0, out=scaled)
+        np.clip(scaled, -8388608.0, 8388607.0, out=scaled)
+        np.copyto(ints, scaled, casting="unsafe")
+        # low three bytes of each little-endian int32
+        np.copyto(packed, ints.view(np.uint8).reshape(n, -1, 4)[:, :, :3])
+        self.proc.stdin.write(memoryview(packed))
+        self.frames += n
+
+    def close(self):
+        self.proc.stdin.close()
+        if self.proc.wait() != 0:
+            raise OSError(f"flac exited with status {self.proc.returncode}")
+
+
+class Recorder:
+    def __init__(self, path, channels, samplerate, fmt="wav"):
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown recording format: {fmt}")
+        self.path = path
+        self.channels = int(channels)
+        self.samplerate = int(samplerate)
+        self.fmt = fmt
+        self.ring = RingBuffer(int(RECORD_BUFFER_SECONDS * samplerate), self.channels)
+        self.batch = np.zeros((int(WRITE_BATCH_SECONDS * samplerate), self.channels), dtype=np.float32)
+        if fmt == "flac":
+            self.writer = FlacWriter(path, self.channels, self.samplerate, self.batch.shape[0])
+        else:
+            self.writer = WavWriter(path, self.channels, self.samplerate, rf64=(fmt == "rf64"))
+        self.lost_frames = 0  # read from the ring but not written (disk error)
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # ---- audio thread ----
+    def push(self, block):
+        self.ring.write(block)
+
+    # ---- writer thread ----
+    def _drain(self):
+        while self.ring.fill:
+            block = self.batch[:min(self.ring.fill, self.batch.shape[0])]
+            self.ring.read_into(block)
+            if self.error is not None:
+                self.lost_frames += block.shape[0]
+                continue
+            try:
+                self.writer.write(block)
+            except OSError as e:
+                # keep draining so the counters stay exact, but stop writing
+                print("Recording write failed:", e)
+                self.error = e
+                self.lost_frames += block.shape[0]
+
+    def _run(self):
+        while not self._stop.wait(WRITE_INTERVAL):
+            self._drain()
+
+    def close(self):
+        """Stop after writing everything still buffered, finalize the header
+        and return stats()."""
+        self._stop.set()
+        self._thread.join()
+        self._drain()
+        try:
+            self.writer.close()
+        except OSError as e:
+            print("Recording close failed:", e)
+            self.error = self.error or e
+        return self.stats()
+
+    def stats(self):
+        # every frame pushed is exactly one of: written, dropped (ring full), lost, pending
+        return {
+            "path": self.path,
+            "format": self.fmt,
+            "frames_written": self.writer.frames,
+            "seconds": self.writer.frames / self.samplerate,
+            "overruns": self.ring.overruns,
+            "dropped_frames": self.ring.dropped_frames,
+            "lost_frames": self.lost_frames,
+            "pending_frames": self.ring.fill,
+            "error": str(self.error) if self.error else None,
+        }
@@ -0,0 +1,155 @@
+# resampler.py
+# Asynchronous sample-rate conversion for the separate-stream fallback.
+#
+# The input callback fills a RingBuffer at the input device's clock, the
+# output callback pulls from it at the output device's clock. Resampler
+# converts whatever it pulls with a time-varying ratio (windowed-sinc,
+# polyphase table with linear interpolation between phases, one vectorized
+# gather + batched matmul per block), and DriftController steers that ratio from
+# the ring fill level so latency stays bounded however far the clocks drift.
+import math
+import numpy as np
+
+SRC_TAPS = 32       # kernel length, in input samples
+SRC_PHASES = 256    # polyphase table resolution
+MAX_CORRECTION = 0.01  # the controller never moves the ratio more than ±1 %
+
+
+class Resampler:
+    def __init__(self, channels, ratio, max_frames, taps=SRC_TAPS, phases=SRC_PHASES):
+        """`ratio` is input_rate / output_rate (input frames consumed per output
+        frame); `max_frames` is the largest output block expected."""
+        self.channels = int(channels)
+        self.ratio = float(ratio)
+        self.taps = int(taps)
+        self.half = self.taps // 2
+        self.phases = int(phases)
+
+        # kernel table: row p holds the taps for a fractional delay of p/phases,
+        # tap k reads input sample floor(pos) - half + 1 + k
+        cutoff = 0.97 * min(1.0, 1.0 / (self.ratio * (1 + MAX_CORRECTION)))
+        frac = np.arange(self.phases + 1)[:, None] / self.phases
+        d = (np.arange(self.taps)[None, :] - self.half + 1) - frac
+        window = np.kaiser(2 * self.half + 1, 8.0)
+        w = np.interp(d, np.arange(-self.half, self.half + 1), window, left=0.0, right=0.0)
+        table = cutoff * np.sinc(cutoff * d) * w
+        table /= table.sum(axis=1, keepdims=True)  # unity DC gain on every phase
+        table = table.astype(np.float32)
+        # (phase, [taps, next phase - taps]) so one batched matmul against
+        # [1, frac] interpolates between neighbouring phases
+        self.table = np.stack((table[:-1], np.diff(table, axis=0)), axis=1)
+        # [idx, 1] @ this = the input indices under each kernel
+        # (float64: BLAS matmul, then one cast to integer indices)
+        self.tap_index = np.stack((np.ones(self.taps),
+                                   np.arange(self.taps) - self.half + 1.0))
+
+        # input history: `avail` frames starting at work[0], next output at `t`
+        self.work = None
+        self.avail = self.taps
+        self.t = float(self.half - 1)
+        self._allocate(int(max_frames))
+
+    def _allocate(self, max_frames):
+        self.max_frames = max_frames
+        max_in = int(math.ceil(max_frames * self.ratio * (1 + MAX_CORRECTION))) + 2 * self.taps + 2
+        work = np.zeros((max_in, self.channels), dtype=np.float32)
+        if self.work is not None:
+            work[:self.avail] = self.work[:self.avail]
+        self.work = work
+        self._ramp = np.arange(max_frames, dtype=np.float64)
+        self._pos = np.zeros(max_frames, dtype=np.float64)
+        self._floor = np.zeros(max_frames, dtype=np.float64)
+        self._idx = np.ones((max_frames, 2), dtype=np.float64)
+        self._phase = np.zeros(max_frames, dtype=np.intp)
+        self._weights = np.ones((max_frames, 1, 2), dtype=np.float32)
+        self._taps2 = np.zeros((max_frames, 2, self.taps), dtype=np.float32)
+        self._coef = np.zeros((max_frames, 1, self.taps), dtype=np.float32)
+        self._win_f = np.zeros((max_frames, self.taps), dtype=np.float64)
+        self._win = np.zeros((max_frames, self.taps), dtype=np.intp)
+        self._gather = np.zeros((max_frames, self.taps, self.channels), dtype=np.float32)
+
+    def process(self, ring, out, step=None):
+        """Fill `out` (frames x channels) with resampled audio pulled from
+        `ring`. `step` is the instantaneous ratio (defaults to the nominal one)."""
+        n = out.shape[0]
+        if n > self.max_frames:
+            self._allocate(n)
+        step = self.ratio if step is None else step
+
+        # pull just enough input to cover the last output sample's kernel
+        need = int(math.floor(self.t + (n - 1) * step)) + self.half + 1
+        if need > self.avail:
+            ring.read_into(self.work[self.avail:need])
+            self.avail = need
+
+        # every op below writes into preallocated memory; broadcasting ufuncs
+        # are avoided on purpose, NumPy allocates iterator buffers for them
+        pos = self._pos[:n]
+        np.multiply(self._ramp[:n], step, out=pos)
+        pos += self.t
+        fl = self._floor[:n]
+        np.floor(pos, out=fl)
+        idx = self._idx[:n]
+        np.copyto(idx[:, 0], fl)
+        # fractional part -> phase index + interpolation weight
+        np.subtract(pos, fl, out=pos)
+        pos *= self.phases
+        np.floor(pos, out=fl)
+        phase = self._phase[:n]
+        np.copyto(phase, fl, casting='unsafe')
+        np.subtract(pos, fl, out=pos)
+        weights = self._weights[:n]
+        np.copyto(weights[:, 0, 1], pos, casting='same_kind')
+
+        taps2 = self._taps2[:n]
+        np.take(self.table, phase, axis=0, out=taps2, mode='clip')
+        coef = self._coef[:n]
+        np.matmul(weights, taps2, out=coef)
+
+        win_f = self._win_f[:n]
+        np.matmul(idx, self.tap_index, out=win_f)
+        win = self._win[:n]
+        np.copyto(win, win_f, casting='unsafe')
+        gather = self._gather[:n]
+        np.take(self.work, win, axis=0, out=gather, mode='clip')
+        np.matmul(coef, gather, out=out[:, None, :])
+
+        # drop consumed history, keep what the next kernel still needs
+        t_next = self.t + n * step
+        shift = int(math.floor(t_next)) - (self.half - 1)
+        keep = self.avail - shift
+        self.work[:keep] = self.work[shift:self.avail]
+        self.avail = keep
+        self.t = t_next - shift
+
+
+class DriftController:
+    """PI loop turning the ring fill level into a resampling ratio."""
+
+    def __init__(self, ratio, target_fill, capacity, kp=0.02, ki=0.0005, smoothing=0.05):
+        self.ratio = float(ratio)
+        self.target = float(target_fill)
+        self.capacity = float(capacity)
+        self.kp = kp
+        self.ki = ki
+        self.smoothing = smoothing
+        self.fill = float(target_fill)
+        self.integral = 0.0
+        self.correction = 0.0
+        self.primed = False
+
+    def update(self, fill):
+        # don't start consuming until the ring holds the target latency
+        if not self.primed:
+            if fill < self.target:
+                return None
+            self.primed = True
+        self.fill += self.smoothing * (fill - self.fill)
+        err = (self.fill - self.target) / self.capacity
+        self.integral = max(-MAX_CORRECTION, min(MAX_CORRECTION, self.integral + self.ki * err))
+        self.correction = max(-MAX_CORRECTION, min(MAX_CORRECTION, self.kp * err + self.integral))
+        # ring too full -> consume a bit faster, too empty -> a bit slower
+        return self.ratio * (1.0 + self.correction)
+
+    def ppm(self):
+        return self.correction * 1e6
@@ -0,0 +1,89 @@
+# ringbuffer.py
+# Fixed-capacity single-producer / single-consumer ring of audio frames.
+#
+# The producer (input callback) only ever advances the write counter and the
+# consumer (output callback) only ever advances the read counter, so no lock
+# is needed: each side reads the other's counter, which is a single atomic
+# attribute load under the GIL. Storage is allocated once; write() and
+# read_into() copy in place and never allocate sample memory.
+import numpy as np
+
+
+class RingBuffer:
+    def __init__(self, capacity, channels, dtype=np.float32):
+        self.capacity = int(capacity)
+        self.channels = int(channels)
+        self.buffer = np.zeros((self.capacity, self.channels), dtype=dtype)
+        # monotonic frame counters (never wrapped, Python ints don't overflow)
+        self._written = 0
+        self._read = 0
+        # counters exposed for the UI / logs
+        self.overruns = 0        # writes that did not fit entirely
+        self.underruns = 0       # reads that could not be satisfied entirely
+        self.dropped_frames = 0  # frames thrown away by overruns
+        self.missing_frames = 0  # frames replaced by silence on underruns
+
+    @property
+    def fill(self):
+        # frames currently queued
+        return self._written - self._read
+
+    @property
+    def free(self):
+        return self.capacity - self.fill
+
+    def fill_ratio(self):
+        return self.fill / self.capacity
+
+    def write(self, block):
+        """Append frames (producer side). Returns the number of frames stored;
+        frames that don't fit are dropped and counted as an overrun."""
+        if block.ndim == 1:
+            block = block.reshape(-1, 1)
+        n = block.shape[0]
+        room = self.capacity - (self._written - self._read)
+        if n > room:
+            self.overruns += 1
+            self.dropped_frames += n - room
+            n = room
+        if n <= 0:
+            return 0
+        start = self._written % self.capacity
+        first = min(n, self.capacity - start)
+        self.buffer[start:start + first] = block[:first]
+        if n > first:
+            self.buffer[:n - first] = block[first:n]
+        self._written += n
+        return n
+
+    def read_into(self, out):
+        """Fill `out` (frames x channels) with queued frames (consumer side).
+        Missing frames are zeroed and counted as an underrun. Returns the
+        number of real frames copied."""
+        if out.ndim == 1:
+            out = out.reshape(-1, 1)
+        n = out.shape[0]
+        avail = self._written - self._read
+        got = min(n, avail)
+        if got > 0:
+            start = self._read % self.capacity
+            first = min(got, self.capacity - start)
+            out[:first] = self.buffer[start:start + first]
+            if got > first:
+                out[first:got] = self.buffer[:got - first]
+            self._read += got
+        if got < n:
+            out[got:] = 0
+            self.underruns += 1
+            self.missing_frames += n - got
+        return got
+
+    def stats(self):
+        return {
+            "fill": self.fill,
+            "capacity": self.capacity,
+            "overruns": self.overruns,
+            "underruns": self.underruns,
+            "dropped_frames": self.dropped_frames,
+            "missing_frames": self.missing_frames,
+        }
@@ -0,0 +1,78 @@
+# routing.py
+# Channel routing worked out once when a stream opens, so the audio
+# callbacks only run in-place NumPy operations on preallocated memory.
+#
+# Routing is an (in_ch, out_ch) gain matrix: every block is one matrix
+# multiply, out = in @ (matrix * volume), for any number of channels.
+import numpy as np
+
+
+def default_matrix(in_ch, out_ch):
+    """Historical routing: mono input goes to every output, otherwise input
+    channel c feeds output c and the extra inputs / outputs are left out."""
+    m = np.zeros((in_ch, out_ch), dtype=np.float32)
+    if in_ch == 1:
+        m[0, :] = 1.0
+    else:
+        n = min(in_ch, out_ch)
+        m[np.arange(n), np.arange(n)] = 1.0
+    return m
+
+
+def parse_routes(text, in_ch, out_ch):
+    """Matrix from a spec like "0:0,1:1,0:2:0.5" (input:output[:gain] pairs,
+    0-based channel indices, linear gain). Raises ValueError on a bad spec."""
+    m = np.zeros((in_ch, out_ch), dtype=np.float32)
+    for item in text.replace(" ", "").split(","):
+        if not item:
+            continue
+        parts = item.split(":")
+        if len(parts) not in (2, 3):
+            raise ValueError(f"route '{item}': expected in:out[:gain]")
+        i, o = int(parts[0]), int(parts[1])
+        gain = float(parts[2]) if len(parts) == 3 else 1.0
+        if not (0 <= i < in_ch and 0 <= o < out_ch):
+            raise ValueError(f"route '{item}': channels are 0..{in_ch - 1} -> 0..{out_ch - 1}")
+        m[i, o] = gain
+    return m
+
+
+class RoutingPlan:
+    def __init__(self, in_ch, out_ch, max_frames, matrix=None):
+        self.in_ch = int(in_ch)
+        self.out_ch = int(out_ch)
+        # scratch block for callbacks that need an intermediate buffer
+        # (e.g. the fallback output callback reading from the ring)
+        self.scratch = np.zeros((int(max_frames), self.in_ch), dtype=np.float32)
+        self.set_matrix(default_matrix(self.in_ch, self.out_ch) if matrix is None else matrix)
+
+    def set_matrix(self, matrix):
+        # callable while the stream runs: the callback picks up the new
+        # (matrix, gains) pair on its next block, never half of each
+        matrix = np.array(matrix, dtype=np.float32)
+        if matrix.shape != (self.in_ch, self.out_ch):
+            raise ValueError(f"routing matrix must be {self.in_ch}x{self.out_ch}, got {matrix.shape}")
+        identity = self.in_ch == self.out_ch and np.array_equal(matrix, np.eye(self.in_ch))
+        self._state = (matrix, np.empty_like(matrix), identity)
+
+    @property
+    def matrix(self):
+        return self._state[0]
+
+    @property
+    def identity(self):
+        # every input channel goes to the same output at unity gain
+        return self._state[2]
+
+    def block(self, frames):
+        # view on the scratch buffer, grown only if the host changes block size
+        if frames > self.scratch.shape[0]:
+            self.scratch = np.zeros((frames, self.in_ch), dtype=np.float32)
+        return self.scratch[:frames]
+
+    def apply(self, src, dst, gain):
+        # write (src @ matrix) * gain into dst without temporaries:
+        # the volume is folded into the small gain matrix, then one BLAS matmul
+        matrix, gains, _ = self._state
+        np.multiply(matrix, gain, out=gains)
+        np.matmul(src, gains, out=dst)
@@ -0,0 +1,70 @@
+# sampleformat.py
+# Native integer sample formats for raw streams (sd.RawStream and co.):
+# the callbacks get the device's bytes and look at them through
+# np.frombuffer views instead of having PortAudio convert every sample to
+# float32 and back. 24-bit interfaces deliver through int32 (left-justified),
+# so int32 covers them; packed 3-byte int24 is not supported.
+import numpy as np
+
+FLOAT = "float32"
+# format -> (numpy dtype, full scale)
+FORMATS = {
+    "int16": (np.dtype(np.int16), 2.0 ** 15),
+    "int32": (np.dtype(np.int32), 2.0 ** 31),
+}
+AUTO = "auto"
+AUTO_ORDER = ("int32", "int16")  # first one the devices accept wins
+# largest float32 values that still fit, for the float -> int conversion
+_LIMITS = {
+    "int16": (np.float32(-32768.0), np.float32(32767.0)),
+    "int32": (np.float32(-2147483648.0), np.float32(2147483520.0)),
+}
+# float32 scalars: a Python float would be converted on every call
+_TO_FLOAT = {fmt: np.float32(1.0 / full) for fmt, (_, full) in FORMATS.items()}
+_FROM_FLOAT = {fmt: np.float32(full) for fmt, (_, full) in FORMATS.items()}
+
+
+def dtype(fmt):
+    return FORMATS[fmt][0]
+
+
+def view(buffer, fmt, channels):
+    # (frames x channels) array over a raw callback buffer, no copy
+    return np.frombuffer(buffer, dtype=FORMATS[fmt][0]).reshape(-1, channels)
+
+
+def to_float(src, dst, fmt):
+    # integer frames -> float32 in -1..1, into a preallocated array: a plain
+    # cast, then an in-place scale (a mixed-type multiply allocates a cast buffer)
+    np.copyto(dst, src, casting="unsafe")
+    dst *= _TO_FLOAT[fmt]
+
+
+def from_float(src, dst, fmt):
+    """float32 frames -> integers, saturating. `src` is scaled, clipped and
+    rounded in place, then cast straight into `dst` (no temporary)."""
+    src *= _FROM_FLOAT[fmt]
+    lo, hi = _LIMITS[fmt]
+    np.maximum(src, lo, out=src)
+    np.minimum(src, hi, out=src)
+    np.rint(src, out=src)
+    np.copyto(dst, src, casting="unsafe")
+
+
+def choose(sd, fmt, in_id, in_ch, out_id=None, out_ch=None, samplerate=None):
+    """Resolve `fmt` ('auto' or a FORMATS key) to a format the devices take,
+    or None if none of them does. Backends without check_*_settings are
+    assumed to accept any format."""
+    candidates = AUTO_ORDER if fmt == AUTO else (fmt,)
+    for name in candidates:
+        try:
+            check = getattr(sd, "check_input_settings", None)
+            if check is not None:
+                check(device=in_id, channels=in_ch, dtype=name, samplerate=samplerate)
+            check = getattr(sd, "check_output_settings", None)
+            if check is not None and out_id is not None:
+                check(device=out_id, channels=out_ch, dtype=name, samplerate=samplerate)
+        except Exception:
+            continue
+        return name
+    return None
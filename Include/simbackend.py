@@ -0,0 +1,363 @@
+# simbackend.py
+# Simulated, sounddevice-compatible audio backend for machines without a
+# sound card (CI, benchmarks). Pass a SimulatedBackend wherever the engine
+# expects the sounddevice module:
+#
+#     engine = AudioEngine(backend=SimulatedBackend(signal="sine"))
+#
+# Streams either run on a thread at real (speed=1.0) or accelerated
+# (speed=N) block cadence, or are driven by hand with tick() (speed=None).
+# signal="loopback" stands in for a cable from output 1 to input 1: what the
+# streams play comes back on the first input channel one block plus
+# `loop_frames` later, e.g. for latency.py.
+import abc
+import time
+import tracemalloc
+import threading
+import types
+from collections import deque
+import numpy as np
+
+import sampleformat
+from ringbuffer import RingBuffer
+from wavfile import MappedWav
+
+CALLBACK_HISTORY = 100000
+LOOP_FRAMES = 240        # loopback: converter + cable delay, in frames
+LOOP_CAPACITY = 1 << 18  # loopback ring, frames
+
+DEFAULT_DEVICES = [
+    {'name': 'Sim Input', 'max_input_channels': 2, 'max_output_channels': 0,
+     'default_samplerate': 48000.0},
+    {'name': 'Sim Output', 'max_input_channels': 0, 'max_output_channels': 2,
+     'default_samplerate': 48000.0},
+    {'name': 'Sim Duplex', 'max_input_channels': 2, 'max_output_channels': 2,
+     'default_samplerate': 48000.0},
+]
+
+
+class CallbackFlags:
+    # same attribute names as sounddevice.CallbackFlags
+    def __init__(self):
+        self.input_underflow = False
+        self.input_overflow = False
+        self.output_underflow = False
+        self.output_overflow = False
+        self.priming_output = False
+
+    def __bool__(self):
+        return (self.input_underflow or self.input_overflow or self.output_underflow
+                or self.output_overflow or self.priming_output)
+
+    def __repr__(self):
+        names = [n for n in ('input_underflow', 'input_overflow', 'output_underflow',
+                             'output_overflow', 'priming_output') if getattr(self, n)]
+        return f"<CallbackFlags: {', '.join(names)}>"
+
+
+class SignalSource:
+    """Endless test signal written in place into (frames, channels) buffers:
+    'sine', 'noise', 'silence', 'loopback' (read from `loop`, a mono ring) or
+    the path of a PCM WAV file (looped)."""
+
+    def __init__(self, kind, samplerate, channels, freq=1000.0, amplitude=0.25, seed=0, loop=None):
+        self.kind = kind
+        self.loop = loop
+        self.samplerate = samplerate
+        self.channels = channels
+        self.freq = freq
+        self.amplitude = amplitude
+        self.pos = 0
+        self.rng = np.random.default_rng(seed)
+        self.data = None
+        if kind not in ("sine", "noise", "silence", "loopback"):
+            self.data = read_wav(kind)
+
+    def fill(self, out):
+        n = out.shape[0]
+        if self.kind == "sine":
+            t = (self.pos + np.arange(n)) * (2 * np.pi * self.freq / self.samplerate)
+            out[:] = (self.amplitude * np.sin(t))[:, None]
+        elif self.kind == "noise":
+            out[:] = self.rng.standard_normal(out.shape, dtype=np.float32) * (self.amplitude / 2)
+        elif self.kind == "silence":
+            out.fill(0)
+        elif self.kind == "loopback":
+            out.fill(0)
+            self.loop.read_into(out[:, :1])
+        else:
+            idx = (self.pos + np.arange(n)) % self.data.shape[0]
+            src = self.data[idx]
+            for c in range(out.shape[1]):
+                out[:, c] = src[:, c % src.shape[1]]
+        self.pos += n
+
+
+def read_wav(path):
+    # WAV (PCM, float or RF64) -> float32 (frames, channels) in [-1, 1)
+    return MappedWav(path).read()
+
+
+class _SimStream(abc.ABC):
+    _has_input = True
+    _has_output = True
+
+    def __init__(self, backend, device=None, channels=None, samplerate=None,
+                 blocksize=None, dtype='float32', callback=None, latency=None, **kwargs):
+        self.backend = backend
+        self.device = device
+        self.samplerate = float(samplerate or 48000)
+        self.blocksize = int(blocksize or 512)
+        self.dtype = dtype
+        self.callback = callback
+        if isinstance(channels, (tuple, list)):
+            in_ch, out_ch = channels
+        else:
+            in_ch = out_ch = channels or 2
+        self.channels = channels
+        self.latency = latency if isinstance(latency, (int, float)) else self.blocksize / self.samplerate
+        self.in_buf = np.zeros((self.blocksize, in_ch), dtype=np.float32) if self._has_input else None
+        self.out_buf = np.zeros((self.blocksize, out_ch), dtype=np.float32) if self._has_output else None
+        self.source = (SignalSource(backend.signal, self.samplerate, in_ch, loop=backend.loop)
+                       if self._has_input else None)
+        self.active = False
+        self.closed = False
+        self.frames_done = 0
+        self.callback_ns = deque(maxlen=CALLBACK_HISTORY)  # recent callback durations, in ns
+        self.callback_alloc = deque(maxlen=CALLBACK_HISTORY)  # peak bytes allocated, when tracing
+        self.callback_net = deque(maxlen=CALLBACK_HISTORY)  # bytes still allocated after it, when tracing
+        self.xruns = 0
+        self._late = False
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def deadline(self):
+        return self.blocksize / self.samplerate
+
+    @property
+    def cpu_load(self):
+        if not self.callback_ns:
+            return 0.0
+        return min(1.0, self.callback_ns[-1] / 1e9 / self.deadline)
+
+    def _prepare(self):
+        # input ready in in_buf, before the timed callback
+        pass
+
+    @abc.abstractmethod
+    def _call(self, status, time_info):
+        # one callback with the stream's own signature
+        pass
+
+    def _played(self):
+        # the output block as float32, after the callback
+        return self.out_buf
+
+    def tick(self):
+        """Run one callback. Returns its duration in ns."""
+        status = CallbackFlags()
+        if self._late:
+            # previous callback missed its deadline: report it like PortAudio would
+            if self._has_input:
+                status.input_overflow = True
+            if self._has_output:
+                status.output_underflow = True
+            self.xruns += 1
+            self._late = False
+        now = self.frames_done / self.samplerate
+        time_info = types.SimpleNamespace(currentTime=now, inputBufferAdcTime=now,
+                                          outputBufferDacTime=now + self.latency)
+        if self.source is not None:
+            self.source.fill(self.in_buf)
+            self._prepare()
+        tracing = tracemalloc.is_tracing()
+        t0 = time.perf_counter_ns()
+        if tracing:
+            base = tracemalloc.get_traced_memory()[0]
+            # read again so `base` counts its own int object: net is exactly the callback's
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self._call(status, time_info)
+        if tracing:
+            # peak: transient allocations; net: what the callback kept
+            current, peak = tracemalloc.get_traced_memory()
+        dt = time.perf_counter_ns() - t0
+        if tracing:
+            self.callback_alloc.append(peak - base)
+            self.callback_net.append(current - base)
+        self.callback_ns.append(dt)
+        if self._has_output and self.backend.loop is not None:
+            self.backend.loop.write(self._played()[:, :1])
+        if dt > self.deadline * 1e9:
+            self._late = True
+        self.frames_done += self.blocksize
+        return dt
+
+    def _run(self):
+        period = self.deadline / self.backend.speed
+        next_t = time.perf_counter()
+        while not self._stop.is_set():
+            self.tick()
+            next_t += period
+            delay = next_t - time.perf_counter()
+            if delay > 0:
+                self._stop.wait(delay)
+            elif delay < -period:
+                # fell behind by more than a block: drop the backlog
+                self._late = True
+                next_t = time.perf_counter()
+
+    def start(self):
+        if self.backend.fail_start:
+            raise RuntimeError("simulated start failure")
+        self.active = True
+        if self.backend.speed is not None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self.active = False
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def close(self):
+        self.stop()
+        self.closed = True
+        if self in self.backend.streams:
+            self.backend.streams.remove(self)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _SimDuplexStream(_SimStream):
+    def _call(self, status, time_info):
+        self.callback(self.in_buf, self.out_buf, self.blocksize, time_info, status)
+
+
+class _SimInputStream(_SimStream):
+    _has_output = False
+
+    def _call(self, status, time_info):
+        self.callback(self.in_buf, self.blocksize, time_info, status)
+
+
+class _SimOutputStream(_SimStream):
+    _has_input = False
+
+    def _call(self, status, time_info):
+        self.callback(self.out_buf, self.blocksize, time_info, status)
+
+
+class _SimRawStream(_SimStream):
+    """Raw streams (RawStream and co.): the callback gets writable byte
+    buffers in the integer format `dtype` instead of float32 arrays."""
+
+    def __init__(self, backend, **kwargs):
+        super().__init__(backend, **kwargs)
+        self.fmt = self.dtype
+        self.in_raw = np.zeros(self.in_buf.shape, dtype=sampleformat.dtype(self.fmt)) if self._has_input else None
+        self.out_raw = np.zeros(self.out_buf.shape, dtype=sampleformat.dtype(self.fmt)) if self._has_output else None
+        self.in_mem = memoryview(self.in_raw).cast('B') if self._has_input else None
+        self.out_mem = memoryview(self.out_raw).cast('B') if self._has_output else None
+
+    def _prepare(self):
+        sampleformat.from_float(self.in_buf.copy(), self.in_raw, self.fmt)
+
+    def _played(self):
+        sampleformat.to_float(self.out_raw, self.out_buf, self.fmt)
+        return self.out_buf
+
+
+class _SimRawDuplexStream(_SimRawStream):
+    def _call(self, status, time_info):
+        self.callback(self.in_mem, self.out_mem, self.blocksize, time_info, status)
+
+
+class _SimRawInputStream(_SimRawStream):
+    _has_output = False
+
+    def _call(self, status, time_info):
+        self.callback(self.in_mem, self.blocksize, time_info, status)
+
+
+class _SimRawOutputStream(_SimRawStream):
+    _has_input = False
+
+    def _call(self, status, time_info):
+        self.callback(self.out_mem, self.blocksize, time_info, status)
+
+
+class SimulatedBackend:
+    def __init__(self, devices=None, signal="sine", speed=None, duplex=True, fail_start=False,
+                 loop_frames=LOOP_FRAMES):
+        """`signal`: 'sine', 'noise', 'silence' or a WAV path fed to every input,
+        or 'loopback' (output 1 back into input 1 after `loop_frames`).
+        `speed`: None = manual tick(), 1.0 = real time, N = N times faster.
+        `duplex=False` makes full-duplex Stream creation fail (fallback path)."""
+        self.device_list = [dict(d) for d in (devices or DEFAULT_DEVICES)]
+        self.signal = signal
+        self.loop_frames = loop_frames
+        self.loop = RingBuffer(LOOP_CAPACITY, 1) if signal == "loopback" else None
+        self.speed = speed
+        self.duplex = duplex
+        self.fail_start = fail_start
+        self.streams = []
+        self.CallbackFlags = CallbackFlags
+
+    def query_devices(self, device=None, kind=None):
+        if device is None:
+            return [dict(d) for d in self.device_list]
+        d = self.device_list[device]
+        if kind == 'input' and d['max_input_channels'] <= 0:
+            raise ValueError(f"device {device} has no input channels")
+        if kind == 'output' and d['max_output_channels'] <= 0:
+            raise ValueError(f"device {device} has no output channels")
+        return dict(d)
+
+    def _open(self, cls, **kwargs):
+        if self.loop is not None and not self.streams:
+            # first stream of a new session: the cable's delay, plus the block
+            # an input reads before anything was played
+            self.loop = RingBuffer(LOOP_CAPACITY, 1)
+            self.loop.write(np.zeros((self.loop_frames + int(kwargs.get("blocksize") or 512), 1),
+                                     dtype=np.float32))
+        stream = cls(self, **kwargs)
+        self.streams.append(stream)
+        return stream
+
+    def Stream(self, **kwargs):
+        if not self.duplex:
+            raise RuntimeError("simulated device pair does not support full-duplex")
+        return self._open(_SimDuplexStream, **kwargs)
+
+    def InputStream(self, **kwargs):
+        return self._open(_SimInputStream, **kwargs)
+
+    def OutputStream(self, **kwargs):
+        return self._open(_SimOutputStream, **kwargs)
+
+    def RawStream(self, **kwargs):
+        if not self.duplex:
+            raise RuntimeError("simulated device pair does not support full-duplex")
+        return self._open(_SimRawDuplexStream, **kwargs)
+
+    def RawInputStream(self, **kwargs):
+        return self._open(_SimRawInputStream, **kwargs)
+
+    def RawOutputStream(self, **kwargs):
+        return self._open(_SimRawOutputStream, **kwargs)
+
+    def tick(self):
+        # manual mode: run one callback on every open stream
+        for s in list(self.streams):
+            if s.active:
+                s.tick()
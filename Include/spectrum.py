@@ -0,0 +1,118 @@
+# spectrum.py
+# Spectrum / spectrogram analysis of the input tap, on the analysis worker.
+#
+# Overlapping Hann frames are cut from a contiguous history buffer (a strided
+# view, no copy), windowed and transformed together with one batched rfft,
+# averaged in power over the channels, then folded into log-spaced bands
+# through a precomputed sparse (bin index, weight, band start) mapping.
+# Each frame becomes one spectrogram row, handed to the GUI through a ring.
+import math
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from ringbuffer import RingBuffer
+
+FFT_SIZE = 4096
+HOP = 1024               # 75 % overlap
+BANDS_PER_OCTAVE = 12
+F_MIN = 20.0
+F_MAX = 20000.0
+DB_FLOOR = -120.0        # power floor of the dB conversion
+SPECTRO_ROWS = 512       # rows buffered for the GUI (several seconds)
+PROCESS_HOPS = 8         # most hops handled per process() call
+
+
+def band_map(fft_size, samplerate, bands_per_octave=BANDS_PER_OCTAVE, fmin=F_MIN, fmax=F_MAX):
+    """Sparse bins -> log bands mapping: (centre freqs, bin idx, weight, band starts).
+    Band b is sum(weight * power[idx]) over idx[starts[b]:starts[b+1]]."""
+    fmax = min(fmax, samplerate / 2.0)
+    n = int(math.floor(bands_per_octave * math.log2(fmax / fmin)))
+    edges = fmin * 2.0 ** (np.arange(n + 1) / bands_per_octave)
+    bin_hz = samplerate / fft_size
+    lo_all, hi_all = edges[:-1] / bin_hz, edges[1:] / bin_hz  # in bins
+    idx, weight, starts = [], [], []
+    for lo, hi in zip(lo_all, hi_all):
+        starts.append(len(idx))
+        # bin i covers [i - 0.5, i + 0.5); weight = how much of it lies in the band
+        bins = np.arange(int(math.floor(lo + 0.5)), int(math.ceil(hi + 0.5)))
+        w = np.minimum(bins + 0.5, hi) - np.maximum(bins - 0.5, lo)
+        keep = w > 0
+        bins, w = bins[keep], w[keep]
+        # bands narrower than a bin read that bin's power instead of a sliver of it
+        w /= min(w.sum(), 1.0)
+        idx.extend(bins)
+        weight.extend(w)
+    centres = np.sqrt(edges[:-1] * edges[1:])
+    return (centres, np.asarray(idx, dtype=np.intp),
+            np.asarray(weight, dtype=np.float32), np.asarray(starts, dtype=np.intp))
+
+
+class SpectrumAnalyzer:
+    def __init__(self, channels, samplerate, fft_size=FFT_SIZE, hop=HOP,
+                 bands_per_octave=BANDS_PER_OCTAVE):
+        self.channels = int(channels)
+        self.samplerate = float(samplerate)
+        self.fft_size = int(fft_size)
+        self.hop = int(hop)
+        self.ring = RingBuffer(max(int(samplerate), 4 * self.fft_size), self.channels)
+        # history + the frames read in one call, contiguous so frames are views
+        self.work = np.zeros((self.fft_size + PROCESS_HOPS * self.hop, self.channels), dtype=np.float32)
+        self.have = 0
+        self.window = np.hanning(self.fft_size).astype(np.float32)
+        # full-scale sine -> 0 dB in its band (one-sided power sum of a Hann frame)
+        self.scale = 4.0 / (self.fft_size * float(np.sum(self.window.astype(np.float64) ** 2)))
+        self.freqs, self._idx, self._weight, self._starts = band_map(
+            self.fft_size, samplerate, bands_per_octave)
+        self.bands = len(self.freqs)
+        self._frames = np.zeros((PROCESS_HOPS, self.channels, self.fft_size), dtype=np.float32)
+        self.rows = RingBuffer(SPECTRO_ROWS, self.bands)
+        self._rows_out = np.zeros((SPECTRO_ROWS, self.bands), dtype=np.float32)
+        # latest row, replaced as a whole for readers on other threads
+        self.spectrum = np.full(self.bands, DB_FLOOR, dtype=np.float32)
+
+    # ---- audio thread ----
+    def push(self, block):
+        self.ring.write(block)
+
+    # ---- analysis thread ----
+    def process(self):
+        """Turn whatever hops are available into spectrogram rows. Returns the
+        number of frames consumed from the ring (0 = nothing to do)."""
+        room = self.work.shape[0] - self.have
+        n = min(self.ring.fill, room)
+        if n == 0:
+            return 0
+        self.ring.read_into(self.work[self.have:self.have + n])
+        self.have += n
+        if self.have < self.fft_size:
+            return n
+        # a full work buffer holds one frame more than _frames: left for the next call
+        count = min((self.have - self.fft_size) // self.hop + 1, PROCESS_HOPS)
+        # (count, channels, fft) strided view over work, then one windowed copy
+        view = sliding_window_view(self.work[:self.have], self.fft_size, axis=0)[::self.hop][:count]
+        frames = self._frames[:count]
+        np.multiply(view, self.window, out=frames)
+        spec = np.fft.rfft(frames, axis=-1)
+        power = (spec.real ** 2 + spec.imag ** 2).mean(axis=1)  # (count, bins)
+        bands = np.add.reduceat(power[:, self._idx] * self._weight, self._starts, axis=1)
+        bands *= self.scale
+        rows = 10.0 * np.log10(np.maximum(bands, 10.0 ** (DB_FLOOR / 10.0)))
+        rows = rows.astype(np.float32)
+        self.rows.write(rows)
+        self.spectrum = rows[-1]
+
+        used = count * self.hop
+        self.work[:self.have - used] = self.work[used:self.have]
+        self.have -= used
+        return n
+
+    # ---- GUI thread ----
+    def read_rows(self):
+        """Spectrogram rows (oldest first, dB per band) added since the last
+        call, or None."""
+        n = self.rows.fill
+        if n == 0:
+            return None
+        out = self._rows_out[:n]
+        self.rows.read_into(out)
+        return out
@@ -0,0 +1,96 @@
+# spectrumview.py
+# Spectrum curve + scrolling spectrogram (waterfall) for SpectrumAnalyzer rows.
+#
+# The waterfall lives in a persistent NumPy uint32 array wrapped by a QImage
+# (no copy): a new row is one colormap lookup written into the next line of
+# a circular buffer, and painting is two drawImage calls, whatever the
+# number of bands.
+import numpy as np
+from PyQt6.QtWidgets import QWidget
+from PyQt6.QtCore import Qt, QRectF, QPointF
+from PyQt6.QtGui import QPainter, QPen, QColor, QImage, QPolygonF
+
+DB_MIN = -100.0   # bottom of the colour scale / curve
+DB_MAX = 0.0
+HISTORY = 300     # waterfall rows (~6 s at 48 kHz / 1024 hop)
+CURVE_SHARE = 0.35  # part of the height used by the spectrum curve
+F_REF = 1000.0    # placeholder band until setBands() gets the analyzer's bands
+FREQ_TICKS = (50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+def _colormap():
+    # black -> blue -> magenta -> orange -> yellow -> white, as 0xFFRRGGBB
+    stops = np.array([0.0, 0.25, 0.5, 0.7, 0.85, 1.0])
+    rgb = np.array([(0, 0, 0), (20, 20, 140), (160, 30, 150), (240, 110, 30),
+                    (250, 220, 40), (255, 255, 255)], dtype=np.float64)
+    x = np.linspace(0.0, 1.0, 256)
+    r, g, b = (np.interp(x, stops, rgb[:, i]).astype(np.uint32) for i in range(3))
+    return (0xFF000000 | (r << 16) | (g << 8) | b).astype(np.uint32)
+
+
+class SpectrumView(QWidget):
+    def __init__(self, history=HISTORY):
+        super().__init__()
+        self.setMinimumSize(250, 150)
+        self.history = int(history)
+        self.lut = _colormap()
+        self.setBands(np.array([F_REF]))
+
+    def setBands(self, freqs):
+        self.freqs = np.asarray(freqs, dtype=np.float64)
+        bands = len(self.freqs)
+        # waterfall memory, newest row at self.row - 1; the QImage shares it
+        self.pixels = np.full((self.history, bands), self.lut[0], dtype=np.uint32)
+        self.image = QImage(self.pixels.data, bands, self.history, bands * 4, QImage.Format.Format_RGB32)
+        self.row = 0
+        self.spectrum = np.full(bands, DB_MIN, dtype=np.float32)
+        self.update()
+
+    def addRows(self, rows):
+        """Append spectrogram rows (n x bands, dB); the last one also becomes the curve."""
+        rows = rows[-self.history:]
+        level = (rows - DB_MIN) * (255.0 / (DB_MAX - DB_MIN))
+        idx = np.clip(level, 0, 255).astype(np.uint8)
+        for r in idx:
+            self.pixels[self.row] = self.lut[r]
+            self.row = (self.row + 1) % self.history
+        self.spectrum = rows[-1].copy()
+        self.update()
+
+    def _x(self, freq):
+        # band centres are log spaced: position by band index
+        return np.interp(np.log(freq), np.log(self.freqs), np.arange(len(self.freqs)))
+
+    def paintEvent(self, event):
+        w, h = self.width(), self.height()
+        curve_h = int(h * CURVE_SHARE)
+        bands = len(self.freqs)
+        painter = QPainter(self)
+        painter.fillRect(0, 0, w, curve_h, QColor(20, 20, 20))
+
+        # waterfall, newest row on top: [row-1 .. 0] then [history-1 .. row]
+        fall_h = h - curve_h
+        scale = fall_h / self.history
+        painter.save()
+        painter.translate(0, curve_h + fall_h)
+        painter.scale(w / bands, -scale)
+        older = self.history - self.row
+        painter.drawImage(QRectF(0, older, bands, self.row), self.image, QRectF(0, 0, bands, self.row))
+        painter.drawImage(QRectF(0, 0, bands, older), self.image, QRectF(0, self.row, bands, older))
+        painter.restore()
+
+        # spectrum curve, one polyline
+        xs = (np.arange(bands) + 0.5) * (w / bands)
+        level = np.clip((self.spectrum - DB_MIN) / (DB_MAX - DB_MIN), 0.0, 1.0)
+        ys = curve_h - level * (curve_h - 2)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(QPen(QColor("orange"), 1.5))
+        painter.drawPolyline(QPolygonF([QPointF(x, y) for x, y in zip(xs, ys)]))
+
+        # frequency ticks
+        painter.setPen(QPen(Qt.GlobalColor.white, 1))
+        for f in FREQ_TICKS:
+            if self.freqs[0] <= f <= self.freqs[-1]:
+                x = int((self._x(f) + 0.5) * (w / bands))
+                painter.drawLine(x, curve_h - 4, x, curve_h)
+                painter.drawText(x + 2, 12, f"{f // 1000}k" if f >= 1000 else str(f))
@@ -0,0 +1,190 @@
+# tuning.py
+# Automatic block-size / latency tuning. The tuner opens the selected device
+# pair with ever larger block sizes, each with the profile's stream
+# latencies from the shortest up, watches the callback status flags and
+# the callback load for a short trial each, and keeps the first setting
+# that runs cleanly under the profile's load budget, with the latency the
+# streams then report. Results are remembered per device pair and profile
+# in a small JSON file.
+#
+#     python tuning.py -i 3 -o 5 --profile balanced
+import os
+import sys
+import json
+import time
+import argparse
+
+from engine import AudioEngine, EngineError, BLOCKSIZE
+
+PROFILES = {
+    # candidate block sizes (tried in order), stream latencies tried for each
+    # block size (PortAudio hints or seconds, shortest first; the first one
+    # is the default before tuning), max callback load
+    "lowest": {"label": "Latence minimale", "blocksizes": (32, 64, 128, 256, 512, 1024, 2048),
+               "latencies": ("low", "high"), "max_load": 0.7},
+    "balanced": {"label": "Équilibré", "blocksizes": (128, 256, 512, 1024, 2048),
+                 "latencies": ("low", "high"), "max_load": 0.5},
+    "safe": {"label": "Sûr", "blocksizes": (512, 1024, 2048, 4096),
+             "latencies": ("high",), "max_load": 0.3},
+}
+DEFAULT_PROFILE = "balanced"
+TRIAL_SECONDS = 3.0
+WARMUP_SECONDS = 0.5  # ignored at the start of each trial (stream priming)
+TUNING_FILE = os.path.join(os.path.expanduser("~"), ".config", "audio-monitor", "tuning.json")
+
+
+class TuningStore:
+    """Tuned settings keyed by device names (indices change between boots)."""
+
+    def __init__(self, path=TUNING_FILE):
+        self.path = path
+        try:
+            with open(path) as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+
+    @staticmethod
+    def key(in_name, out_name, profile):
+        return f"{in_name} -> {out_name or '(monitor only)'} [{profile}]"
+
+    def get(self, in_name, out_name, profile):
+        return self.data.get(self.key(in_name, out_name, profile))
+
+    def put(self, in_name, out_name, profile, result):
+        self.data[self.key(in_name, out_name, profile)] = result
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+def apply_stored(engine, in_id, out_id, profile=DEFAULT_PROFILE, store=None):
+    """Configure `engine` with the remembered setting for this device pair,
+    or the profile's safest default. Returns the stored result or None;
+    raises EngineError if a device index is unknown."""
+    store = store or TuningStore()
+    out_name = engine.device_name(out_id) if out_id is not None else None
+    result = store.get(engine.device_name(in_id), out_name, profile)
+    if result is not None:
+        engine.blocksize = result["blocksize"]
+        engine.latency = result["latency"]
+    else:
+        engine.blocksize = BLOCKSIZE
+        engine.latency = PROFILES[profile]["latencies"][0]
+    return result
+
+
+class BlockSizeTuner:
+    """Non-blocking tuner: call start() then poll() regularly (GUI timer or a
+    sleep loop) until poll() returns the result dict."""
+
+    def __init__(self, engine, in_id, out_id=None, profile=DEFAULT_PROFILE,
+                 monitor_only=False, trial_seconds=TRIAL_SECONDS, store=None, clock=time.monotonic):
+        self.engine = engine
+        self.in_id = in_id
+        self.out_id = None if monitor_only else out_id
+        self.profile = profile
+        self.settings = PROFILES[profile]
+        self.trial_seconds = trial_seconds
+        self.store = store or TuningStore()
+        self.clock = clock
+        self.candidates = [(b, lat) for b in self.settings["blocksizes"] for lat in self.settings["latencies"]]
+        self.current = None          # block size on trial
+        self.current_latency = None  # its stream latency
+        self.mode = None
+        self.result = None
+        self.trials = []  # (blocksize, latency, xruns, max_load, accepted) for every trial
+
+    def start(self):
+        self._next_trial()
+
+    def _next_trial(self):
+        if not self.candidates:
+            # nothing ran cleanly: settle on the largest, slowest setting we tried
+            if self.trials:
+                self._finish(*self.trials[-1][:2])
+            else:
+                self._finish(self.settings["blocksizes"][-1], self.settings["latencies"][-1])
+            return
+        self.current, self.current_latency = self.candidates.pop(0)
+        self.engine.blocksize = self.current
+        self.engine.latency = self.current_latency
+        try:
+            self.mode = self.engine.start(self.in_id, self.out_id)
+        except EngineError as e:
+            print(f"Tuning: blocksize {self.current} latency {self.current_latency} failed to open: {e}")
+            self.trials.append((self.current, self.current_latency, None, None, False))
+            self._next_trial()
+            return
+        self.t0 = self.clock()
+        self.engine.health.dsp_load()  # start a fresh load window
+        self.warm = False
+        self.max_load = 0.0
+
+    def poll(self):
+        if self.result is not None:
+            return self.result
+        elapsed = self.clock() - self.t0
+        if not self.warm:
+            if elapsed >= WARMUP_SECONDS:
+                self.xruns_base = self.engine.health.xruns()
+                self.warm = True
+            return None
+        self.max_load = max(self.max_load, self.engine.health.dsp_load())
+        if elapsed < self.trial_seconds:
+            return None
+        xruns = self.engine.health.xruns() - self.xruns_base
+        ok = xruns == 0 and self.max_load <= self.settings["max_load"]
+        self.trials.append((self.current, self.current_latency, xruns, self.max_load, ok))
+        print(f"Tuning: blocksize {self.current} latency {self.current_latency}: xruns={xruns} "
+              f"load={self.max_load:.0%} -> {'ok' if ok else 'rejected'}")
+        if ok:
+            self._finish(self.current, self.current_latency, self.engine.reported_latency())
+        else:
+            self._next_trial()
+        return self.result
+
+    def progress(self):
+        done = len(self.trials)
+        return done, done + len(self.candidates) + (0 if self.result else 1)
+
+    def _finish(self, blocksize, latency, reported=(None, None)):
+        self.engine.stop()
+        self.engine.blocksize = blocksize
+        self.engine.latency = latency
+        # latency: the setting passed to the streams; reported: what they said they got (s)
+        self.result = {"blocksize": blocksize, "latency": latency, "reported_latency": list(reported),
+                       "profile": self.profile, "tuned_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+        try:
+            out_name = self.engine.device_name(self.out_id) if self.out_id is not None else None
+            self.store.put(self.engine.device_name(self.in_id), out_name, self.profile, self.result)
+        except EngineError as e:
+            # the device went away during the trials: keep the result, do not remember it
+            print("Tuning result not saved:", e)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find the smallest clean block size for a device pair.")
+    parser.add_argument("-i", "--input", type=int, required=True, help="input device index")
+    parser.add_argument("-o", "--output", type=int, help="output device index (omit for monitor only)")
+    parser.add_argument("-p", "--profile", choices=list(PROFILES), default=DEFAULT_PROFILE)
+    parser.add_argument("--trial", type=float, default=TRIAL_SECONDS, help="seconds per setting tried")
+    args = parser.parse_args(argv)
+
+    engine = AudioEngine()
+    tuner = BlockSizeTuner(engine, args.input, args.output, args.profile, trial_seconds=args.trial)
+    tuner.start()
+    while tuner.poll() is None:
+        time.sleep(0.1)
+    r = tuner.result
+    reported = ", ".join(f"{name} {x * 1000:.1f} ms" for name, x in zip(("input", "output"), r["reported_latency"])
+                         if x is not None)
+    print(f"Selected blocksize={r['blocksize']} latency={r['latency']}"
+          + (f" (reported: {reported})" if reported else "") + f" (saved to {tuner.store.path})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
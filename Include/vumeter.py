@@ -0,0 +1,318 @@
+# vumeter.py
+import math
+import numpy as np
+from PyQt6.QtWidgets import QWidget
+from PyQt6.QtCore import Qt, QPoint, QRect, pyqtSlot, pyqtSignal
+from PyQt6.QtGui import QPainter, QPen, QColor, QPixmap, QLinearGradient
+
+NEEDLE_MARGIN = 3  # extra pixels around a needle's bounding box (pen + antialiasing)
+BAR_GAP = 2        # pixels between two bars of a MeterBank
+BANK_MARGIN = 8    # around the bars; the channel labels go below
+LABEL_HEIGHT = 14
+HOLD_COLOR = QColor("yellow")  # peak-hold marks
+CLIP_COLOR = QColor("red")     # latched clip lights
+LAMP_SIZE = 10                 # clip light of a dial
+
+
+# --- VU-mètre stéréo (balistique calculée par metering / ballistics) ---
+class StereoVuMeter(QWidget):
+    # a click on the meter asks to clear the clip lights
+    clipReset = pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        self.level_l = 0.0
+        self.level_r = 0.0
+        self.hold = (0.0, 0.0)
+        self.clip = (False, False)
+        self.setMinimumSize(250, 150)
+        # static dial face, rendered once per (size, device pixel ratio)
+        self._face = None
+        self._face_key = None
+
+    @pyqtSlot(float, float)
+    def setLevels(self, l, r):
+        # the needles already carry their ballistics: shown as they are
+        old_l, old_r = self._needle_rects()
+        self.level_l = max(0.0, min(l, 1.0))
+        self.level_r = max(0.0, min(r, 1.0))
+        new_l, new_r = self._needle_rects()
+        # only repaint what the needles swept, and nothing if they didn't move
+        if new_l != old_l:
+            self.update(old_l.united(new_l))
+        if new_r != old_r:
+            self.update(old_r.united(new_r))
+
+    def setHold(self, hold_l, hold_r, clip_l, clip_r):
+        # peak-hold marks on the scale and latched clip lights
+        old = self._hold_rects()
+        hold = (max(0.0, min(hold_l, 1.0)), max(0.0, min(hold_r, 1.0)))
+        moved = [self._hold_tip(c, h) != self._hold_tip(c, o)
+                 for c, h, o in zip(self._geometry()[1:], hold, self.hold)]
+        clip = (bool(clip_l), bool(clip_r))
+        lit = [c != o for c, o in zip(clip, self.clip)]
+        self.hold, self.clip = hold, clip
+        for rect_old, rect_new, lamp, m, changed in zip(old, self._hold_rects(), self._lamp_rects(), moved, lit):
+            if m:
+                self.update(rect_old.united(rect_new))
+            if changed:
+                self.update(lamp)
+
+    def mousePressEvent(self, event):
+        self.clipReset.emit()
+        super().mousePressEvent(event)
+
+    def resizeEvent(self, event):
+        self._face = None
+        super().resizeEvent(event)
+
+    def _geometry(self):
+        w, h = self.width(), self.height()
+        radius = min(w//4, h//2) - 20
+        center_y = h // 2
+        return radius, (w//4, center_y), (3*w//4, center_y)
+
+    def _needle_tip(self, center, radius, level):
+        rad = math.radians(135 - level * 90)
+        x = center[0] + (radius - 15) * math.cos(rad)
+        y = center[1] - (radius - 15) * math.sin(rad)
+        return int(x), int(y)
+
+    def _hold_tip(self, center, level):
+        # outer end of a peak-hold mark (a tick across the arc)
+        radius = self._geometry()[0]
+        rad = math.radians(135 - level * 90)
+        return (int(center[0] + (radius + 6) * math.cos(rad)),
+                int(center[1] - (radius + 6) * math.sin(rad)),
+                int(center[0] + (radius - 12) * math.cos(rad)),
+                int(center[1] - (radius - 12) * math.sin(rad)))
+
+    def _hold_rects(self):
+        rects = []
+        for center, level in zip(self._geometry()[1:], self.hold):
+            x1, y1, x2, y2 = self._hold_tip(center, level)
+            rect = QRect(QPoint(x1, y1), QPoint(x2, y2)).normalized()
+            rects.append(rect.adjusted(-NEEDLE_MARGIN, -NEEDLE_MARGIN, NEEDLE_MARGIN, NEEDLE_MARGIN))
+        return rects
+
+    def _lamp_rects(self):
+        # clip light above the right end of each dial
+        radius, center_l, center_r = self._geometry()
+        return [QRect(int(c[0] + 0.6 * radius), c[1] - radius - LAMP_SIZE, LAMP_SIZE, LAMP_SIZE)
+                for c in (center_l, center_r)]
+
+    def _needle_rects(self):
+        radius, center_l, center_r = self._geometry()
+        rects = []
+        for center, level in ((center_l, self.level_l), (center_r, self.level_r)):
+            tip = self._needle_tip(center, radius, level)
+            rect = QRect(QPoint(*center), QPoint(*tip)).normalized()
+            rects.append(rect.adjusted(-NEEDLE_MARGIN, -NEEDLE_MARGIN,
+                                       NEEDLE_MARGIN, NEEDLE_MARGIN))
+        return rects
+
+    def _render_face(self):
+        dpr = self.devicePixelRatioF()
+        face = QPixmap(int(self.width() * dpr), int(self.height() * dpr))
+        face.setDevicePixelRatio(dpr)
+        face.fill(Qt.GlobalColor.transparent)
+
+        painter = QPainter(face)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        radius, center_l, center_r = self._geometry()
+
+        for center in (center_l, center_r):
+            painter.setPen(QPen(Qt.GlobalColor.white, 2))
+            painter.drawArc(center[0]-radius, center[1]-radius,
+                            2*radius, 2*radius, 45*16, 90*16)
+
+            # colored arc segments on the right: red (last 2 ticks), orange (next tick)
+            seg_step = 9  # degrees between ticks
+            red_start = 45
+            orange_start = red_start + seg_step
+            painter.setPen(QPen(QColor("red"), 2))
+            painter.drawArc(center[0]-radius, center[1]-radius,
+                            2*radius, 2*radius, int(red_start*16), int(seg_step*16))
+            painter.setPen(QPen(QColor("orange"), 2))
+            painter.drawArc(center[0]-radius, center[1]-radius,
+                            2*radius, 2*radius, int(orange_start*16), int(seg_step*16))
+
+            for i in range(0, 11):
+                angle = 135- i*9
+                rad = math.radians(angle)
+                x1 = center[0] + (radius-10)*math.cos(rad)
+                y1 = center[1] - (radius-10)*math.sin(rad)
+                x2 = center[0] + radius*math.cos(rad)
+                y2 = center[1] - radius*math.sin(rad)
+                if i >= 9:
+                    painter.setPen(QPen(QColor("red"), 2))
+                elif i == 8:
+                    painter.setPen(QPen(QColor("orange"), 2))
+                else:
+                    painter.setPen(QPen(Qt.GlobalColor.white, 2))
+                painter.drawLine(int(x1), int(y1), int(x2), int(y2))
+            painter.drawText(center[0]-5, center[1]+radius+15, "L" if center==center_l else "R")
+        painter.end()
+        return face
+
+    def paintEvent(self, event):
+        key = (self.width(), self.height(), self.devicePixelRatioF())
+        if self._face is None or self._face_key != key:
+            self._face = self._render_face()
+            self._face_key = key
+
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setClipRegion(event.region())
+        painter.drawPixmap(0, 0, self._face)
+
+        # aiguilles
+        radius, center_l, center_r = self._geometry()
+        painter.setPen(QPen(QColor("red"), 3))
+        for center, level in ((center_l, self.level_l), (center_r, self.level_r)):
+            x, y = self._needle_tip(center, radius, level)
+            painter.drawLine(center[0], center[1], x, y)
+        painter.setPen(QPen(HOLD_COLOR, 2))
+        for center, level in zip((center_l, center_r), self.hold):
+            if level > 0.0:
+                painter.drawLine(*self._hold_tip(center, level))
+        painter.setPen(QPen(Qt.GlobalColor.white, 1))
+        for lamp, clip in zip(self._lamp_rects(), self.clip):
+            painter.setBrush(CLIP_COLOR if clip else QColor(40, 40, 40))
+            painter.drawEllipse(lamp.adjusted(1, 1, -1, -1))
+
+
+# --- banc de barres, une par canal (8, 16, 32 canaux...) ---
+class MeterBank(QWidget):
+    """Bar meter for any number of channels. The unlit and lit faces are
+    rendered once per size into pixmaps; a repaint only blits the part of
+    each bar whose height changed."""
+    clipReset = pyqtSignal()
+
+    def __init__(self, channels=2):
+        super().__init__()
+        self.setMinimumSize(250, 150)
+        self._faces = None
+        self._face_key = None
+        self.setChannels(channels)
+
+    def setChannels(self, channels):
+        self.channels = max(1, int(channels))
+        self.levels = np.zeros(self.channels, dtype=np.float32)
+        self._heights = np.zeros(self.channels, dtype=np.intp)
+        self._holds = np.zeros(self.channels, dtype=np.intp)
+        self.clip = np.zeros(self.channels, dtype=bool)
+        self._faces = None
+        self.update()
+
+    def setLevels(self, levels):
+        # the levels already carry their ballistics: shown as they are
+        levels = np.clip(np.asarray(levels, dtype=np.float32)[:self.channels], 0.0, 1.0)
+        self.levels[:len(levels)] = levels
+        top, height = self._bar_span()
+        heights = (self.levels * height).astype(np.intp)
+        changed = np.flatnonzero(heights != self._heights)
+        for c in changed:
+            # only the strip between the old and the new bar top
+            lo, hi = sorted((self._heights[c], heights[c]))
+            x, w = self._bar_x(c)
+            self.update(x, top + height - hi, w, hi - lo + 1)
+        self._heights = heights
+
+    def setHold(self, holds, clips):
+        # peak-hold line per bar and latched clip lights above the bars
+        top, height = self._bar_span()
+        holds = np.clip(np.asarray(holds, dtype=np.float32)[:self.channels], 0.0, 1.0)
+        heights = self._holds.copy()
+        heights[:len(holds)] = (holds * height).astype(np.intp)
+        clip = self.clip.copy()
+        clip[:len(clips)] = np.asarray(clips, dtype=bool)[:self.channels]
+        for c in np.flatnonzero(heights != self._holds):
+            x, w = self._bar_x(c)
+            for h in (self._holds[c], heights[c]):
+                self.update(x, top + height - h - 1, w, 3)
+        for c in np.flatnonzero(clip != self.clip):
+            x, w = self._bar_x(c)
+            self.update(x, 0, w, top)
+        self._holds, self.clip = heights, clip
+
+    def mousePressEvent(self, event):
+        self.clipReset.emit()
+        super().mousePressEvent(event)
+
+    def resizeEvent(self, event):
+        self._faces = None
+        super().resizeEvent(event)
+
+    def _bar_span(self):
+        top = BANK_MARGIN
+        return top, max(1, self.height() - top - BANK_MARGIN - LABEL_HEIGHT)
+
+    def _bar_x(self, c):
+        pitch = (self.width() - 2 * BANK_MARGIN) / self.channels
+        x = BANK_MARGIN + int(c * pitch)
+        return x, max(1, int((c + 1) * pitch) - int(c * pitch) - BAR_GAP)
+
+    def _render_faces(self):
+        dpr = self.devicePixelRatioF()
+        top, height = self._bar_span()
+        faces = []
+        for lit in (False, True):
+            face = QPixmap(int(self.width() * dpr), int(self.height() * dpr))
+            face.setDevicePixelRatio(dpr)
+            face.fill(Qt.GlobalColor.transparent)
+            painter = QPainter(face)
+            if lit:
+                grad = QLinearGradient(0, top + height, 0, top)
+                grad.setColorAt(0.0, QColor("green"))
+                grad.setColorAt(0.7, QColor("yellow"))
+                grad.setColorAt(0.8, QColor("orange"))
+                grad.setColorAt(0.9, QColor("red"))
+                brush = grad
+            else:
+                brush = QColor(40, 40, 40)
+            for c in range(self.channels):
+                x, w = self._bar_x(c)
+                painter.fillRect(x, top, w, height, brush)
+                if not lit:
+                    painter.setPen(QPen(Qt.GlobalColor.white, 1))
+                    painter.drawText(QRect(x - BAR_GAP, top + height, w + 2 * BAR_GAP, LABEL_HEIGHT),
+                                     Qt.AlignmentFlag.AlignCenter, str(c + 1))
+            if not lit:
+                # scale: a tick every 10 %, the last two in red like the dial
+                for i in range(11):
+                    y = top + height - int(i * height / 10)
+                    painter.setPen(QPen(QColor("red") if i >= 9 else Qt.GlobalColor.white, 1))
+                    painter.drawLine(1, y, BANK_MARGIN - 3, y)
+            painter.end()
+            faces.append(face)
+        return faces
+
+    def paintEvent(self, event):
+        key = (self.width(), self.height(), self.devicePixelRatioF(), self.channels)
+        if self._faces is None or self._face_key != key:
+            self._faces = self._render_faces()
+            self._face_key = key
+        unlit, lit = self._faces
+
+        painter = QPainter(self)
+        painter.setClipRegion(event.region())
+        painter.drawPixmap(0, 0, unlit)
+        top, height = self._bar_span()
+        dpr = self.devicePixelRatioF()
+        for c in range(self.channels):
+            h = int(self._heights[c])
+            if h <= 0:
+                continue
+            x, w = self._bar_x(c)
+            target = QRect(x, top + height - h, w, h)
+            if not event.region().intersects(target):
+                continue
+            source = QRect(int(x * dpr), int((top + height - h) * dpr), int(w * dpr), int(h * dpr))
+            painter.drawPixmap(target, lit, source)
+        for c in range(self.channels):
+            x, w = self._bar_x(c)
+            if self._holds[c] > 0:
+                painter.fillRect(x, top + height - int(self._holds[c]) - 1, w, 2, HOLD_COLOR)
+            if self.clip[c]:
+                painter.fillRect(x, 1, w, top - 3, CLIP_COLOR)
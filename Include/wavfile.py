@@ -0,0 +1,86 @@
+# wavfile.py
+# Memory-mapped WAV / RF64 reader. The sample data is an np.memmap over the
+# file, so hours of audio cost no RAM until a chunk is converted to float32.
+# Handles 8/16/24/32-bit PCM, 32/64-bit float, WAVE_FORMAT_EXTENSIBLE and the
+# RF64 files written by recorder.py.
+import struct
+import numpy as np
+
+_PCM, _FLOAT, _EXTENSIBLE = 1, 3, 0xFFFE
+
+
+class MappedWav:
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, "rb") as f:
+            head = f.read(12)
+            if len(head) < 12:
+                raise ValueError(f"{self.path}: not a WAV file")
+            riff, _, wave = struct.unpack("<4sI4s", head)
+            if riff not in (b"RIFF", b"RF64") or wave != b"WAVE":
+                raise ValueError(f"{self.path}: not a WAV file")
+            data_size64 = None
+            fmt = None
+            while True:
+                head = f.read(8)
+                if len(head) < 8:
+                    raise ValueError(f"{self.path}: no data chunk")
+                cid, size = struct.unpack("<4sI", head)
+                if cid == b"ds64":
+                    body = f.read(size)
+                    data_size64 = struct.unpack("<Q", body[8:16])[0]
+                elif cid == b"fmt ":
+                    fmt = f.read(size)
+                elif cid == b"data":
+                    offset = f.tell()
+                    if size == 0xFFFFFFFF and data_size64 is not None:
+                        size = data_size64
+                    break
+                else:
+                    f.seek(size, 1)
+                if size % 2:
+                    f.seek(1, 1)  # chunks are word aligned
+            f.seek(0, 2)
+            size = min(size, f.tell() - offset)  # unfinished recordings: trust the file length
+        if fmt is None:
+            raise ValueError(f"{self.path}: no fmt chunk")
+        tag, self.channels, self.samplerate, _, align, self.bits = struct.unpack("<HHIIHH", fmt[:16])
+        if tag == _EXTENSIBLE:
+            tag = struct.unpack("<H", fmt[24:26])[0]
+        self.is_float = tag == _FLOAT
+        if tag not in (_PCM, _FLOAT):
+            raise ValueError(f"{self.path}: unsupported WAV format tag {tag:#x}")
+        self.frames = size // align
+        width = self.bits // 8
+        if self.is_float:
+            dtype = {4: "<f4", 8: "<f8"}[width]
+            shape = (self.frames, self.channels)
+        elif width == 3:
+            dtype, shape = np.uint8, (self.frames, self.channels, 3)
+        else:
+            dtype = {1: np.uint8, 2: "<i2", 4: "<i4"}[width]
+            shape = (self.frames, self.channels)
+        self.raw = np.memmap(self.path, dtype=dtype, mode="r", offset=offset, shape=shape) \
+            if self.frames else np.zeros(shape, dtype=dtype)
+
+    @property
+    def duration(self):
+        return self.frames / self.samplerate
+
+    def read(self, start=0, stop=None):
+        """Frames [start, stop) as float32 (frames, channels) in [-1, 1)."""
+        raw = self.raw[start:stop]
+        if self.is_float:
+            return raw.astype(np.float32)
+        if raw.ndim == 3:
+            b = raw.astype(np.int32)
+            return ((b[..., 0] << 8 | b[..., 1] << 16 | b[..., 2] << 24) >> 8).astype(np.float32) / 8388608
+        if raw.dtype == np.uint8:
+            return (raw.astype(np.float32) - 128) / 128
+        scale = 32768 if raw.dtype.itemsize == 2 else 2147483648
+        return raw.astype(np.float32) / scale
+
+    def chunks(self, frames):
+        # (start frame, float32 block) covering the whole file
+        for start in range(0, self.frames, frames):
+            yield start, self.read(start, start + frames)
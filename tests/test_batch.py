@@ -0,0 +1,81 @@
+# Batch check: results come back from the cache while a file is unchanged,
+# are recomputed when its content changes, and the cache stays bounded.
+import os
+
+import numpy as np
+import pytest
+
+import batch
+from recorder import WavWriter
+
+SR = 48000
+
+
+def write(path, level, seconds=2):
+    t = np.arange(seconds * SR) / SR
+    audio = np.repeat((level * np.sin(2 * np.pi * 1000 * t))[:, None], 2, axis=1).astype(np.float32)
+    w = WavWriter(str(path), 2, SR)
+    w.write(audio)
+    w.close()
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "transfers"
+    root.mkdir()
+    write(root / "a.wav", 0.5)
+    write(root / "b.wav", 0.25)
+    return root
+
+
+def run(root, cache):
+    results, stats = batch.run_batch([str(root)], jobs=2, cache=cache)
+    cache.save()
+    return {os.path.basename(r["file"]): r for r in results}, stats
+
+
+def test_unchanged_files_come_from_the_cache(tree, tmp_path):
+    path = str(tmp_path / "cache.json")
+    first, stats = run(tree, batch.ResultCache(path))
+    assert stats["analysed"] == 2 and stats["cached"] == 0
+    again, stats = run(tree, batch.ResultCache(path))
+    assert stats["analysed"] == 0 and stats["cached"] == 2
+    assert again == first
+    assert first["a.wav"]["peak_dbfs"] == pytest.approx([-6.02, -6.02], abs=0.01)
+
+
+def test_changed_content_is_analysed_again(tree, tmp_path):
+    path = str(tmp_path / "cache.json")
+    run(tree, batch.ResultCache(path))
+    st = os.stat(tree / "a.wav")
+    write(tree / "a.wav", 0.125)
+    os.utime(tree / "a.wav", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    res, stats = run(tree, batch.ResultCache(path))
+    assert stats["analysed"] == 1 and stats["cached"] == 1
+    assert res["a.wav"]["peak_dbfs"] == pytest.approx([-18.06, -18.06], abs=0.01)
+    # the old result went with the old content: one entry per file
+    cache = batch.ResultCache(path)
+    assert len(cache.files) == 2 and len(cache.results) == 2
+
+
+def test_forgotten_files_leave_the_cache(tree, tmp_path):
+    path = str(tmp_path / "cache.json")
+    now = [1000.0]
+    run(tree, batch.ResultCache(path, max_age=100, clock=lambda: now[0]))
+    os.remove(tree / "b.wav")
+    now[0] += 50
+    run(tree, batch.ResultCache(path, max_age=100, clock=lambda: now[0]))
+    assert len(batch.ResultCache(path).files) == 2  # b.wav not seen, but not old yet
+    now[0] += 60
+    run(tree, batch.ResultCache(path, max_age=100, clock=lambda: now[0]))
+    cache = batch.ResultCache(path)
+    assert list(cache.files) == [str(tree / "a.wav")]
+    assert len(cache.results) == 1
+
+
+def test_unreadable_file_is_listed(tree, tmp_path):
+    (tree / "bad.wav").write_bytes(b"junk")
+    res, stats = run(tree, batch.ResultCache(str(tmp_path / "cache.json")))
+    assert sorted(res) == ["a.wav", "b.wav"]
+    assert stats["failed"] == 1
+    assert stats["failures"][0]["file"].endswith("bad.wav")
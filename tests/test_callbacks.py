@@ -0,0 +1,43 @@
+# The audio callbacks must not allocate: every path is driven through the
+# simulated backend for a few hundred blocks with tracemalloc on (bench.py).
+import pytest
+
+from bench import run_case
+from engine import FULL_DUPLEX, FALLBACK, MONITOR_ONLY
+
+BLOCKS = 400
+
+
+@pytest.mark.parametrize("mode", [MONITOR_ONLY, FULL_DUPLEX, FALLBACK])
+@pytest.mark.parametrize("channels", [1, 2])
+def test_callbacks_keep_no_memory(mode, channels):
+    for r in run_case(mode, 256, channels, 48000, blocks=50, alloc_blocks=BLOCKS):
+        assert r["net_bytes"] < 1.0, r
+
+
+@pytest.mark.parametrize("mode", [MONITOR_ONLY, FULL_DUPLEX])
+@pytest.mark.parametrize("fmt", ["int16", "int32"])
+def test_raw_callbacks_keep_no_memory(mode, fmt):
+    # the integer <-> float32 conversions work in preallocated buffers: what
+    # they allocate (view objects) does not grow with the block size
+    peak = {}
+    for blocksize in (64, 1024):
+        for r in run_case(mode, blocksize, 2, 48000, blocks=50, alloc_blocks=BLOCKS, fmt=fmt):
+            assert r["format"] == fmt
+            assert r["net_bytes"] < 1.0, r
+            peak[blocksize] = r["alloc_bytes"]
+    assert peak[1024] < peak[64] + 256, peak
+
+
+@pytest.mark.parametrize("mode", [FULL_DUPLEX, FALLBACK])
+def test_dsp_odd_blocksize_keeps_no_memory(mode):
+    # 100 frames is not a whole number of filter chunks (biquad.CHUNK): the
+    # short last chunk must not cost more than a whole one (it used to cost
+    # ~1.4 kB more per block, stepping sample by sample)
+    peak = {}
+    for blocksize in (96, 100):
+        for r in run_case(mode, blocksize, 2, 48000, blocks=50, alloc_blocks=BLOCKS, dsp=("riaa", "rumble")):
+            assert r["net_bytes"] < 1.0, r
+            peak[blocksize, r["callback"]] = r["alloc_bytes"]
+    for (blocksize, name), alloc in peak.items():
+        assert alloc <= peak[96, name] + 256, peak
@@ -0,0 +1,50 @@
+# Device catalogue: PortAudio is only re-initialized on an explicit rescan.
+from catalog import DeviceCatalog
+
+
+class _Backend:
+    __version__ = "0.4.6"
+
+    def __init__(self):
+        self.reinits = 0
+
+    def query_devices(self):
+        return [{"name": "card", "hostapi": 0, "max_input_channels": 2,
+                 "max_output_channels": 2, "default_samplerate": 48000.0}]
+
+    def _terminate(self):
+        pass
+
+    def _initialize(self):
+        self.reinits += 1
+
+
+def _catalog(idle=True, version="0.4.6"):
+    sd = _Backend()
+    sd.__version__ = version
+    catalog = DeviceCatalog(lambda: sd, idle=lambda: idle)
+    catalog._refresh()  # the background thread is not started
+    return catalog, sd
+
+
+def test_refresh_only_requeries():
+    catalog, sd = _catalog()
+    catalog._refresh()
+    assert sd.reinits == 0
+    assert catalog.devices[0]["name"] == "card"
+
+
+def test_rescan_reinitializes_once_when_idle():
+    catalog, sd = _catalog()
+    catalog._rescan = True
+    catalog._refresh()
+    catalog._refresh()
+    assert sd.reinits == 1
+
+
+def test_rescan_skipped_while_streaming_or_unknown_version():
+    for idle, version in ((False, "0.4.6"), (True, "1.0.0"), (True, "dev")):
+        catalog, sd = _catalog(idle, version)
+        catalog._rescan = True
+        catalog._refresh()
+        assert sd.reinits == 0
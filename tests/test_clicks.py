@@ -0,0 +1,46 @@
+# Click detector: a clean tone is not a click, a click in it is.
+import numpy as np
+
+from clicks import ClickDetector, CLICK, DROPOUT
+
+SR = 48000
+
+
+def _tone(seconds=2.0, channels=2):
+    # starts at full amplitude: nothing before the first sample to step from
+    t = np.arange(int(seconds * SR)) / SR
+    return np.repeat(0.5 * np.cos(2 * np.pi * 440 * t)[:, None], channels, axis=1).astype(np.float32)
+
+
+def _run(audio, block=512):
+    detector = ClickDetector(audio.shape[1], SR)
+    for start in range(0, len(audio), block):
+        detector.push(audio[start:start + block])
+        while detector.process():
+            pass
+    return detector
+
+
+def test_clean_tone_logs_nothing():
+    detector = _run(_tone())
+    assert detector.log.count == 0, detector.log.events()
+
+
+def test_click_in_tone():
+    audio = _tone()
+    at = SR // 2 + 100
+    audio[at, 1] += 0.3
+    events = _run(audio).log.events()
+    assert len(events) == 1
+    assert events[0]["kind"] == CLICK and events[0]["channel"] == 1
+    assert abs(events[0]["time"] - at / SR) < 0.001
+
+
+def test_dropout_in_tone():
+    audio = _tone()
+    at = SR
+    audio[at:at + SR // 100] = 0.0  # 10 ms
+    events = _run(audio).log.events()
+    assert sorted(events["channel"]) == [0, 1]
+    assert (events["kind"] == DROPOUT).all()
+    assert np.allclose(events["duration"], 10.0)
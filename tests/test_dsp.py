@@ -0,0 +1,41 @@
+# DSP chain: the RIAA fit is done once per sample rate, and the stage
+# interface is enforced.
+import numpy as np
+import pytest
+
+import dsp
+
+
+def test_riaa_fit_once_per_rate():
+    dsp._riaa_fit.cache_clear()
+    first = dsp.riaa(44100)
+    stage = dsp.RiaaStage()
+    for _ in range(3):
+        stage.configure(2, 44100, 256)
+    info = dsp._riaa_fit.cache_info()
+    assert info.misses == 1 and info.hits == 3
+    # callers get their own list
+    first[0][0] = 0.0
+    assert dsp.riaa(44100)[0][0] != 0.0
+    assert dsp.riaa(48000) != dsp.riaa(44100)
+
+
+def test_riaa_is_0_db_at_1_khz():
+    b0, b1, b2, a1, a2 = dsp.riaa(48000)[0]
+    z = np.exp(-2j * np.pi * dsp.RIAA_REF_HZ / 48000)
+    h = (b0 + b1 * z + b2 * z * z) / (1 + a1 * z + a2 * z * z)
+    assert abs(h) == pytest.approx(1.0, abs=1e-6)
+
+
+def test_stages_must_implement_process():
+    with pytest.raises(TypeError):
+        dsp.Stage()
+    with pytest.raises(TypeError):
+        dsp.BiquadStage()
+
+    class Incomplete(dsp.BiquadStage):
+        def process(self, block):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,53 @@
+# Both front ends are the same MonitorWindow: same controls, same stream
+# lifecycle; only debug.py has the spectrum view.
+import os
+import time
+
+import pytest
+
+pytest.importorskip("PyQt6.QtWidgets")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import engine
+import simbackend
+from PyQt6.QtWidgets import QApplication, QWidget
+
+from engine import FULL_DUPLEX, MONITOR_ONLY, MIX
+
+
+def _windows(monkeypatch, speed):
+    monkeypatch.setattr(engine, "_sounddevice", lambda: simbackend.SimulatedBackend(speed=speed))
+    import main
+    import debug
+    return main.VinylMonitor(), debug.MonitorApp()
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+def test_same_controls(app, monkeypatch):
+    a, b = _windows(monkeypatch, None)
+    names = lambda w: {k for k, v in vars(w).items() if isinstance(v, QWidget) and k != "spectro"}
+    assert names(a) == names(b)
+    assert a.spectro is None and b.spectro is not None
+    a.close(); b.close()
+
+
+def test_start_modes(app, monkeypatch):
+    for w in _windows(monkeypatch, 4.0):
+        deadline = time.monotonic() + 10
+        while w._devices_version == 0 and time.monotonic() < deadline:
+            app.processEvents()
+            time.sleep(0.02)
+        assert w.input_box.count() == 2 and w.input2_box.count() == 3
+        for setup, mode in ((lambda: None, FULL_DUPLEX),
+                            (lambda: w.monitor_only.setChecked(True), MONITOR_ONLY),
+                            (lambda: (w.monitor_only.setChecked(False), w.input2_box.setCurrentIndex(1)), MIX)):
+            setup()
+            w.toggle_stream()
+            assert w.engine.mode == mode, w.status.text()
+            w.toggle_stream()
+            assert not w.engine.running
+        w.close()
@@ -0,0 +1,67 @@
+# Latency probe: the cross-correlation finds a known delay, and a run on the
+# simulated loopback recovers the cable delay through the whole engine path.
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+import latency
+from engine import AudioEngine
+from latency import LatencyTest, analyze, mls
+from simbackend import SimulatedBackend
+
+SR = 48000
+BLOCK = 256
+
+
+def test_analyze_finds_a_known_delay():
+    ref = (mls(12) * latency.PROBE_LEVEL).astype(np.float32)
+    lead, delay = 1000, 357
+    capture = np.zeros((lead + delay + ref.size + 2000, 2), dtype=np.float32)
+    capture[lead + delay:lead + delay + ref.size, 1] = ref * 0.5
+    capture += np.random.default_rng(0).normal(0, 1e-3, capture.shape).astype(np.float32)
+    result = analyze(capture, ref, lead, SR)
+    assert result["channel"] == 1
+    assert result["latency_frames"] == pytest.approx(delay, abs=0.5)
+    assert abs(result["drift_ppm"]) < 50
+
+
+def test_analyze_without_loopback():
+    ref = mls(12).astype(np.float32)
+    capture = np.random.default_rng(1).normal(0, 0.1, (20000, 2)).astype(np.float32)
+    assert analyze(capture, ref, 1000, SR) is None
+
+
+def run_probe(loop_frames, fallback):
+    backend = SimulatedBackend(signal="loopback", speed=None, loop_frames=loop_frames)
+    engine = AudioEngine(backend=backend, blocksize=BLOCK, analyzers=False)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            probe = LatencyTest(engine, 2, 2, runs=2, fallback=fallback)
+            probe.start()
+            while probe.poll() is None:
+                backend.tick()
+    finally:
+        engine.stop()
+        engine.catalog.stop()
+    result = probe.result
+    assert not result["failed"]
+    return [run["latency_frames"] for run in result["runs"]]
+
+
+@pytest.mark.parametrize("loop_frames", [1000, 3000])
+def test_full_duplex_recovers_the_loopback(loop_frames):
+    # one block to play out, then the cable
+    for frames in run_probe(loop_frames, fallback=False):
+        assert frames == pytest.approx(loop_frames + BLOCK, abs=1)
+
+
+def test_fallback_follows_the_loopback():
+    # separate streams add their own buffering on top, but the cable delay
+    # still comes through one for one
+    short = run_probe(1000, fallback=True)
+    long = run_probe(3000, fallback=True)
+    for a, b in zip(short, long):
+        assert b - a == pytest.approx(2000, abs=2)
+        assert a > 1000 + BLOCK
@@ -0,0 +1,45 @@
+# EBU R128 loudness (EBU Tech 3341 / 3342 style cases) and true peak.
+import numpy as np
+import pytest
+
+from loudness import LoudnessMeter
+
+SR = 48000
+
+
+def _sine(dbfs, seconds, freq=1000.0, channels=2, phase=0.0):
+    t = np.arange(int(seconds * SR)) / SR
+    x = 10 ** (dbfs / 20) * np.sin(2 * np.pi * freq * t + phase)
+    return np.repeat(x[:, None], channels, axis=1).astype(np.float32)
+
+
+def _measure(*parts):
+    meter = LoudnessMeter(2, SR)
+    meter.feed(np.concatenate(parts))
+    return meter.readings
+
+
+def test_reference_tone():
+    # 1 kHz at -23 dBFS on both channels reads -23 LUFS
+    r = _measure(_sine(-23, 20))
+    for key in ("momentary", "short_term", "integrated"):
+        assert r[key] == pytest.approx(-23.0, abs=0.1), key
+
+
+def test_gating_ignores_quiet_passages():
+    # 20 s at -60 LUFS: above the absolute gate, below the relative one
+    r = _measure(_sine(-23, 20), _sine(-60, 20), np.zeros((10 * SR, 2), dtype=np.float32))
+    assert r["integrated"] == pytest.approx(-23.0, abs=0.1)
+
+
+def test_loudness_range():
+    # Tech 3342: 20 s at -20 then 20 s at -30 dBFS gives 10 LU
+    r = _measure(_sine(-20, 20), _sine(-30, 20))
+    assert r["lra"] == pytest.approx(10.0, abs=1.0)
+
+
+def test_true_peak_between_samples():
+    # fs/4 at 45 degrees: every sample is 3 dB under the waveform's peak
+    x = _sine(-6.0, 2, freq=SR / 4, phase=np.pi / 4)
+    assert 20 * np.log10(np.abs(x).max()) == pytest.approx(-9.0, abs=0.1)
+    assert _measure(x)["true_peak"] == pytest.approx(-6.0, abs=0.3)
@@ -0,0 +1,76 @@
+# Mixer bus: sources summed with their gains, the bus played on every output
+# at the master volume times the output's own gain.
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from engine import AudioEngine, MIX
+from recorder import WavWriter
+from simbackend import SimulatedBackend
+
+SR = 48000
+BLOCK = 256
+LEVEL = 0.25
+
+
+def db(x):
+    return 10.0 ** (x / 20.0)
+
+
+@pytest.fixture
+def dc_backend(tmp_path):
+    # a constant signal: it comes through the resamplers unchanged
+    path = tmp_path / "dc.wav"
+    w = WavWriter(str(path), 2, SR)
+    w.write(np.full((SR, 2), LEVEL, dtype=np.float32))
+    w.close()
+    return SimulatedBackend(signal=str(path), speed=None)
+
+
+def run_mix(backend, sources, outputs, volume=1.0, ticks=200):
+    engine = AudioEngine(backend=backend, blocksize=BLOCK, analyzers=False)
+    engine.volume = volume
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert engine.start_mix(sources, outputs) == MIX
+            for _ in range(ticks):
+                backend.tick()
+        mixer = engine.mixer
+        levels = [o.stream.out_buf.copy() for o in mixer.outputs]
+        stats = mixer.stats()
+        return levels, stats
+    finally:
+        engine.stop()
+        engine.catalog.stop()
+
+
+def test_sources_are_summed_with_their_gains(dc_backend):
+    (out,), stats = run_mix(dc_backend, [0, (2, -6.0)], [1])
+    assert out == pytest.approx(LEVEL * (1.0 + db(-6.0)), abs=1e-3)
+    assert stats[0]["underruns"] == 0 and stats[0]["overruns"] == 0
+
+
+def test_outputs_take_volume_and_their_own_gain(dc_backend):
+    (first, second), _ = run_mix(dc_backend, [0, (2, 0.0)], [1, (2, -12.0)], volume=0.5)
+    bus = LEVEL * 2.0
+    assert first == pytest.approx(bus * 0.5, abs=1e-3)
+    assert second == pytest.approx(bus * 0.5 * db(-12.0), abs=1e-3)
+
+
+def test_source_gain_change_reaches_the_bus(dc_backend):
+    engine = AudioEngine(backend=dc_backend, blocksize=BLOCK, analyzers=False)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine.start_mix([0, 2], [1])
+            for _ in range(100):
+                dc_backend.tick()
+            engine.mixer.set_source_gain(1, -120.0)
+            for _ in range(20):
+                dc_backend.tick()
+        out = engine.mixer.outputs[0].stream.out_buf
+        assert out == pytest.approx(LEVEL, abs=1e-3)
+    finally:
+        engine.stop()
+        engine.catalog.stop()
@@ -0,0 +1,40 @@
+# Multi-device workers: spawned without re-importing the GUI's main module,
+# and they publish into the shared grid.
+import os
+import subprocess
+import sys
+import textwrap
+
+INCLUDE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Include")
+
+# stands in for main.py / debug.py: Qt imported, a trace of every import
+GUI = textwrap.dedent('''
+    import os, sys, time, functools
+    with open(os.environ["MARK"], "a") as f:
+        f.write(__name__ + "\\n")
+    import PyQt6.QtWidgets
+    from multidevice import MultiDeviceMonitor, STATE, RUNNING
+    from simbackend import SimulatedBackend
+
+    if __name__ == "__main__":
+        m = MultiDeviceMonitor([0, 2], backend=functools.partial(SimulatedBackend, speed=1.0))
+        m.start()
+        for _ in range(100):
+            time.sleep(0.1)
+            if (m.read()[:, STATE] == RUNNING).all():
+                break
+        print("running", int((m.read()[:, STATE] == RUNNING).sum()), m.poll_errors())
+        m.stop()
+''')
+
+
+def test_workers_do_not_import_the_gui(tmp_path):
+    script = tmp_path / "gui.py"
+    script.write_text(GUI)
+    mark = tmp_path / "imports"
+    env = dict(os.environ, MARK=str(mark), PYTHONPATH=INCLUDE, QT_QPA_PLATFORM="offscreen")
+    out = subprocess.run([sys.executable, str(script)], cwd=tmp_path, env=env,
+                         capture_output=True, text=True, timeout=60)
+    assert out.returncode == 0, out.stderr
+    assert "running 2 []" in out.stdout
+    assert mark.read_text().split() == ["__main__"]
@@ -0,0 +1,50 @@
+# WebSocket client frames: masked pings are echoed, oversized frames refused.
+import asyncio
+import os
+import struct
+
+from netfeed import LevelFeed, WS_MAX_FRAME
+
+
+class _Writer:
+    def __init__(self):
+        self.data = b""
+
+    def write(self, data):
+        self.data += data
+
+
+def _frame(opcode, payload, mask=b"\x12\x34\x56\x78"):
+    n = len(payload)
+    head = bytes((0x80 | opcode,))
+    if n < 126:
+        head += bytes((0x80 | n,))
+    elif n < 65536:
+        head += bytes((0x80 | 126,)) + struct.pack(">H", n)
+    else:
+        head += bytes((0x80 | 127,)) + struct.pack(">Q", n)
+    return head + mask + bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+
+def _read(data):
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        writer = _Writer()
+        await LevelFeed._ws_read(None, reader, writer)
+        return writer.data
+    return asyncio.run(run())
+
+
+def test_masked_ping_is_echoed():
+    payload = os.urandom(101)
+    assert _read(_frame(0x9, payload)) == bytes((0x8A, len(payload))) + payload
+
+
+def test_oversized_frame_closes_with_1009():
+    # only the header is sent: the payload must not be waited for
+    head = _frame(0x2, b"")[:1] + bytes((0x80 | 127,)) + struct.pack(">Q", 1 << 40)
+    assert _read(head) == b"\x88\x02" + struct.pack(">H", 1009)
+    big = _frame(0x2, bytes(WS_MAX_FRAME + 1))
+    assert _read(big + _frame(0x9, b"x")) == b"\x88\x02" + struct.pack(">H", 1009)
@@ -0,0 +1,91 @@
+# Recording: float WAV headers, the RF64 switch (with a small threshold
+# instead of 4 GiB) and FLAC, each read back and compared.
+import struct
+import subprocess
+
+import numpy as np
+import pytest
+
+import recorder
+from recorder import Recorder, WavWriter, flac_available
+from wavfile import MappedWav
+
+SR = 48000
+
+
+def _noise(frames, channels, seed=0):
+    return np.random.default_rng(seed).uniform(-0.9, 0.9, (frames, channels)).astype(np.float32)
+
+
+def _chunks(path):
+    # header and {chunk id: body} of a RIFF / RF64 file
+    data = open(path, "rb").read()
+    chunks, pos = {}, 12
+    while pos + 8 <= len(data):
+        cid, size = struct.unpack("<4sI", data[pos:pos + 8])
+        if size == 0xFFFFFFFF:  # RF64 data chunk: runs to the end of the file
+            size = len(data) - pos - 8
+        chunks[cid] = data[pos + 8:pos + 8 + size]
+        pos += 8 + size + size % 2
+    return data[:12], chunks
+
+
+def _write(path, audio, **kwargs):
+    w = WavWriter(str(path), audio.shape[1], SR, **kwargs)
+    for start in range(0, len(audio), 1000):
+        w.write(audio[start:start + 1000])
+    w.close()
+
+
+@pytest.mark.parametrize("channels, tag", [(2, 3), (6, 0xFFFE)])
+def test_wav_header(tmp_path, channels, tag):
+    audio = _noise(4321, channels)
+    path = tmp_path / "take.wav"
+    _write(path, audio)
+    head, chunks = _chunks(path)
+    riff, size, wave = struct.unpack("<4sI4s", head)
+    assert (riff, wave, size) == (b"RIFF", b"WAVE", path.stat().st_size - 8)
+    fmt_tag, ch, sr, rate, align, bits = struct.unpack("<HHIIHH", chunks[b"fmt "][:16])
+    assert (fmt_tag, ch, sr, rate, align, bits) == (tag, channels, SR, SR * channels * 4, channels * 4, 32)
+    assert struct.unpack("<I", chunks[b"fact"])[0] == 4321
+    assert len(chunks[b"data"]) == audio.nbytes
+    np.testing.assert_array_equal(MappedWav(path).read(), audio)
+
+
+def test_rf64_switch(tmp_path, monkeypatch):
+    monkeypatch.setattr(recorder, "RF64_THRESHOLD", 10000)  # instead of 4 GiB
+    audio = _noise(5000, 2)  # 40 kB of data
+    path = tmp_path / "long.wav"
+    _write(path, audio)
+    head, chunks = _chunks(path)
+    assert struct.unpack("<4sI4s", head) == (b"RF64", 0xFFFFFFFF, b"WAVE")
+    riff, data, frames = struct.unpack("<QQQ", chunks[b"ds64"][:24])
+    assert (riff, data, frames) == (path.stat().st_size - 8, audio.nbytes, 5000)
+    wav = MappedWav(path)
+    assert wav.frames == 5000
+    np.testing.assert_array_equal(wav.read(), audio)
+
+    # under the threshold the same header stays plain RIFF
+    _write(path, audio[:1000])
+    assert _chunks(path)[0][:4] == b"RIFF"
+
+
+def test_recorder_writes_every_frame(tmp_path):
+    audio = _noise(SR, 2)
+    rec = Recorder(str(tmp_path / "rec.wav"), 2, SR)
+    for start in range(0, SR, 480):
+        rec.push(audio[start:start + 480])
+    st = rec.close()
+    assert (st["frames_written"], st["dropped_frames"], st["lost_frames"], st["error"]) == (SR, 0, 0, None)
+    np.testing.assert_array_equal(MappedWav(st["path"]).read(), audio)
+
+
+@pytest.mark.skipif(not flac_available(), reason="needs the flac command")
+def test_flac_roundtrip(tmp_path):
+    audio = _noise(SR // 2, 2)
+    rec = Recorder(str(tmp_path / "rec.flac"), 2, SR, fmt="flac")
+    rec.push(audio)
+    assert rec.close()["frames_written"] == len(audio)
+    subprocess.run(["flac", "--silent", "-d", "-o", str(tmp_path / "dec.wav"), str(tmp_path / "rec.flac")],
+                   check=True)
+    np.testing.assert_allclose(MappedWav(tmp_path / "dec.wav").read(), audio, atol=2 / 8388608)
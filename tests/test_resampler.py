@@ -0,0 +1,65 @@
+# Fallback resampling: the nominal ratio converts a tone cleanly, and the
+# drift controller finds the clock offset between two simulated devices.
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from engine import AudioEngine, FALLBACK
+from resampler import Resampler
+from ringbuffer import RingBuffer
+from simbackend import SimulatedBackend
+
+SR_IN, SR_OUT = 48000, 44100
+
+
+def test_ratio_converts_a_tone():
+    f = 1000.0
+    ring = RingBuffer(SR_IN, 1)
+    ring.write(np.sin(2 * np.pi * f * np.arange(SR_IN) / SR_IN).astype(np.float32))
+    src = Resampler(1, SR_IN / SR_OUT, 256)
+    out = np.zeros((256 * 100, 1), dtype=np.float32)
+    for i in range(100):
+        src.process(ring, out[i * 256:(i + 1) * 256])
+    # input consumed at the ratio (plus at most one kernel of look-ahead)
+    assert abs((SR_IN - ring.fill) - out.shape[0] * SR_IN / SR_OUT) < src.taps
+    # still a 1 kHz sine at the output rate, nothing else above -80 dB
+    y = out[1000:, 0].astype(np.float64)
+    t = np.arange(1000, out.shape[0]) / SR_OUT
+    basis = np.stack([np.sin(2 * np.pi * f * t), np.cos(2 * np.pi * f * t)], axis=1)
+    coef = np.linalg.lstsq(basis, y, rcond=None)[0]
+    assert np.hypot(*coef) == pytest.approx(1.0, abs=1e-3)
+    assert np.std(y - basis @ coef) < 1e-4
+
+
+@pytest.mark.parametrize("ppm", [-500, 0, 500])
+def test_drift_converges(ppm, seconds=40.0, blocksize=256):
+    # the input clock runs `ppm` fast: the two streams are ticked on a shared
+    # virtual timeline, each at its own (drifting) rate
+    devices = [
+        {'name': 'In', 'max_input_channels': 2, 'max_output_channels': 0, 'default_samplerate': float(SR_IN)},
+        {'name': 'Out', 'max_input_channels': 0, 'max_output_channels': 2, 'default_samplerate': float(SR_OUT)},
+    ]
+    backend = SimulatedBackend(devices=devices, signal="sine", speed=None, duplex=False)
+    engine = AudioEngine(backend=backend, blocksize=blocksize, analyzers=False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert engine.start(0, 1) == FALLBACK
+    ins, outs = backend.streams
+    t_in = t_out = 0.0
+    corrections = []
+    while t_out < seconds:
+        if t_in <= t_out:
+            ins.tick()
+            t_in += blocksize / (SR_IN * (1 + ppm * 1e-6))
+        else:
+            outs.tick()
+            t_out += blocksize / SR_OUT
+            if t_out > seconds / 2:
+                corrections.append(engine.drift.ppm())
+    ring = engine.ring
+    assert ring.underruns == ring.overruns == 0
+    assert np.mean(corrections) == pytest.approx(ppm, abs=50)
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.stop()
+    engine.catalog.stop()
@@ -0,0 +1,45 @@
+# SPSC ring: frames come out in order across the wrap-around, overruns and
+# underruns are counted exactly.
+import numpy as np
+
+from ringbuffer import RingBuffer
+
+
+def _frames(start, n, channels=2):
+    # frame i holds i on every channel: order is easy to check
+    return np.repeat(np.arange(start, start + n, dtype=np.float32)[:, None], channels, axis=1)
+
+
+def test_wrap_around_keeps_order():
+    ring = RingBuffer(10, 2)
+    out = np.empty((7, 2), dtype=np.float32)
+    pos = 0
+    for _ in range(20):  # 7-frame blocks through a 10-frame ring: every split position
+        assert ring.write(_frames(pos, 7)) == 7
+        assert ring.read_into(out) == 7
+        np.testing.assert_array_equal(out, _frames(pos, 7))
+        pos += 7
+    assert ring.fill == 0
+    assert ring.stats()["overruns"] == ring.stats()["underruns"] == 0
+
+
+def test_overrun_drops_the_excess():
+    ring = RingBuffer(10, 2)
+    assert ring.write(_frames(0, 6)) == 6
+    assert ring.write(_frames(6, 6)) == 4  # only 4 free
+    assert ring.write(_frames(12, 3)) == 0  # full
+    st = ring.stats()
+    assert (st["fill"], st["overruns"], st["dropped_frames"]) == (10, 2, 5)
+    out = np.empty((10, 2), dtype=np.float32)
+    ring.read_into(out)
+    np.testing.assert_array_equal(out, _frames(0, 10))  # the oldest frames are kept
+
+
+def test_underrun_pads_with_silence():
+    ring = RingBuffer(8, 1)
+    ring.write(np.ones(3, dtype=np.float32))
+    out = np.full((5, 1), 7.0, dtype=np.float32)
+    assert ring.read_into(out) == 3
+    np.testing.assert_array_equal(out[:, 0], [1, 1, 1, 0, 0])
+    st = ring.stats()
+    assert (st["underruns"], st["missing_frames"], st["fill"]) == (1, 2, 0)
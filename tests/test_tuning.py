@@ -0,0 +1,47 @@
+# Stored tuning: an unknown device index is an EngineError, not a crash.
+import pytest
+
+from engine import AudioEngine, EngineError, main
+from simbackend import SimulatedBackend
+from tuning import TuningStore, apply_stored
+
+ENGINES = []
+
+
+@pytest.fixture(autouse=True)
+def _stop_catalogs():
+    # no enumeration thread left running into the allocation tests
+    yield
+    while ENGINES:
+        ENGINES.pop().catalog.stop()
+
+
+def _engine():
+    devices = [
+        {'name': 'Sim In', 'max_input_channels': 2, 'max_output_channels': 0, 'default_samplerate': 48000.0},
+        {'name': 'Sim Out', 'max_input_channels': 0, 'max_output_channels': 2, 'default_samplerate': 48000.0},
+    ]
+    engine = AudioEngine(backend=SimulatedBackend(devices=devices, speed=None))
+    ENGINES.append(engine)
+    return engine
+
+
+def test_stored_setting_applied(tmp_path):
+    engine = _engine()
+    store = TuningStore(str(tmp_path / "tuning.json"))
+    store.put("Sim In", "Sim Out", "balanced", {"blocksize": 512, "latency": "high"})
+    assert apply_stored(engine, 0, 1, "balanced", store) is not None
+    assert (engine.blocksize, engine.latency) == (512, "high")
+
+
+@pytest.mark.parametrize("in_id, out_id", [(7, 1), (0, 7), (-1, None)])
+def test_unknown_device_raises_engine_error(tmp_path, in_id, out_id):
+    store = TuningStore(str(tmp_path / "tuning.json"))
+    with pytest.raises(EngineError):
+        apply_stored(_engine(), in_id, out_id, "balanced", store)
+
+
+def test_cli_unknown_device(monkeypatch, capsys):
+    monkeypatch.setattr("engine.AudioEngine", lambda: _engine())
+    assert main(["-i", "7"]) == 1
+    assert "Erreur périphérique" in capsys.readouterr().err